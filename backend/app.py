@@ -1,4 +1,4 @@
-from flask import Flask, jsonify , request
+from flask import Flask, jsonify , request, Response, stream_with_context
 from flask_cors import CORS
 from flask_jwt_extended import JWTManager, jwt_required, get_jwt_identity
 import os
@@ -9,6 +9,12 @@ from services.caregiverService import CaregiverController
 from services.messagingService import MessagingController
 from services.notificationService import NotificationController
 from services.reminderService import ReminderController
+from services.eventService import EventController, sse_event
+from services.schedulerService import SchedulerController, init_scheduler
+from services.waitlistService import WaitlistController
+from services.doctorService import DoctorController
+from services.cache import get_all_metrics
+from services.requestCache import get_user, get_current_user
 from dotenv import load_dotenv
 import os
 from services.chatgpt import ChatGPTAPIService
@@ -38,6 +44,9 @@ jwt = JWTManager(app)
 from services.db import init_db
 db =init_db(app)  # Initialize with our Flask app
 
+# Background jobs (reminders, notification fan-out, cleanup) run on their own threads
+init_scheduler(app)
+
 chatgpt = ChatGPTAPIService(api_key , db=db)
 
 
@@ -50,6 +59,23 @@ def chat():
     else:
         return jsonify({"error": "Invalid token format"}), 401
     query = data.get('query')
+    if data.get('stream') or request.args.get('stream'):
+        # Progress, model tokens and the final result as server-sent events
+        events = chatgpt.coordinator_stream(patient_query=query, token=token)
+
+        def stream():
+            # Closing the events on disconnect cancels the run
+            try:
+                for event_type, payload in events:
+                    yield sse_event(event_type, payload)
+            finally:
+                events.close()
+
+        return Response(
+            stream_with_context(stream()),
+            mimetype='text/event-stream',
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+        )
     return chatgpt.coordinator(patient_query=query, token=token)
     
 # Endpoint to get current user's ID
@@ -112,9 +138,9 @@ def user_identity_lookup(user):
 
 @jwt.user_lookup_loader
 def user_lookup_callback(_jwt_header, jwt_data):
-    from models.user import User  # Local import to avoid circular imports
+    # Goes through the request cache so controllers reuse this record via get_current_user()
     identity = jwt_data["sub"]
-    return User.query.get(int(identity))  # Convert back to integer when querying
+    return get_user(identity)
 
 
 # Authentication routes
@@ -144,31 +170,8 @@ def get_current_user_id():
 @jwt_required(optional=True)
 def get_doctors():
     """Get a list of all doctors"""
-    from models.user import User
-    from models.doctor import Doctor
-    from models.user import UserRole
-    from flask import jsonify
-    
     try:
-        # Query all doctors
-        doctors = Doctor.query.all()
-        
-        # Format the response
-        result = []
-        for doctor in doctors:
-            user = User.query.filter_by(user_id=doctor.doctor_id).first()
-            if user:
-                result.append({
-                    'id': doctor.doctor_id,
-                    'first_name': user.first_name,
-                    'last_name': user.last_name,
-                    'email': user.email,
-                    "specialty": doctor.specialty.name,
-                    "description": doctor.description,
-                    
-                })
-        
-        return jsonify(result)
+        return DoctorController.get_doctors()
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -196,6 +199,12 @@ def get_doctor_availability_range_route():
     """Get available appointment slots for a doctor across a date range (week/month view)"""
     return AppointmentController.get_doctor_availability_range()
 
+@app.route('/appointments/availability-batch', methods=['POST'])
+@jwt_required()
+def get_batch_availability_route():
+    """Get availability bitmaps for several doctors (or a specialty) across a date range"""
+    return AppointmentController.get_batch_availability()
+
 @app.route('/appointments/set-availability', methods=['POST'])
 @jwt_required()
 def set_doctor_availability_route():
@@ -264,15 +273,118 @@ def get_unread_message_count_route():
     """Get the count of unread messages"""
     return MessagingController.get_unread_message_count()
 
+@app.route('/events/ticket', methods=['POST'])
+@jwt_required()
+def event_ticket_route():
+    """Short-lived ticket for opening the event stream"""
+    return EventController.issue_stream_ticket()
+
+@app.route('/events/stream', methods=['GET'])
+def event_stream_route():
+    """Server-sent events for new messages and unread counts (ticket in query string)"""
+    return EventController.stream_events()
+
+@app.route('/messages/conversations', methods=['GET'])
+@jwt_required()
+def get_conversations_route():
+    """Get the current user's conversations, most recent first"""
+    return MessagingController.get_conversations()
+
+@app.route('/metrics/cache', methods=['GET'])
+@jwt_required()
+def cache_metrics_route():
+    """Hit rate and drift statistics of the in-process caches"""
+    return jsonify(get_all_metrics()), 200
+
+@app.route('/metrics/ai', methods=['GET'])
+@jwt_required()
+def ai_metrics_route():
+    """Share of AI chat queries routed locally versus classified by the model"""
+    return jsonify(chatgpt.intent_router.metrics()), 200
+
+# Background job routes
+@app.route('/admin/jobs', methods=['GET'])
+@jwt_required()
+def jobs_overview_route():
+    """Queue depth, job latency and recent failures of the background scheduler"""
+    return SchedulerController.get_jobs_overview()
+
+# Reminder routes
+@app.route('/reminders/schedule', methods=['POST'])
+@jwt_required()
+def schedule_reminders_route():
+    """Send the appointment reminders that are due now (the scheduler also does this every 15 minutes)"""
+    return ReminderController.schedule_appointment_reminders()
+
+@app.route('/reminders/notify-availability', methods=['POST'])
+@jwt_required()
+def notify_availability_route():
+    """Queue notifications about an opening in a doctor's schedule"""
+    return ReminderController.notify_cancellation_availabilities()
+
+# Waitlist routes
+@app.route('/waitlist', methods=['POST'])
+@jwt_required()
+def join_waitlist_route():
+    """Join a doctor's waitlist for a date"""
+    return WaitlistController.join_waitlist()
+
+@app.route('/waitlist', methods=['GET'])
+@jwt_required()
+def get_waitlist_route():
+    """The current patient's waitlist entries, or a doctor's queue for a date (staff)"""
+    return WaitlistController.get_waitlist()
+
+@app.route('/waitlist/<int:entry_id>/accept', methods=['POST'])
+@jwt_required()
+def accept_waitlist_offer_route(entry_id):
+    """Book the slot offered to a waitlist entry"""
+    return WaitlistController.accept_offer(entry_id)
+
+@app.route('/waitlist/<int:entry_id>/decline', methods=['POST'])
+@jwt_required()
+def decline_waitlist_offer_route(entry_id):
+    """Turn down the slot offered to a waitlist entry"""
+    return WaitlistController.decline_offer(entry_id)
+
+@app.route('/waitlist/<int:entry_id>', methods=['DELETE'])
+@jwt_required()
+def leave_waitlist_route(entry_id):
+    """Leave a waitlist"""
+    return WaitlistController.leave_waitlist(entry_id)
+
+# Notification routes
+@app.route('/notifications', methods=['GET'])
+@jwt_required()
+def get_user_notifications_route():
+    """Get a page of the current user's notifications, newest first (keyset paging, read/status filters)"""
+    return NotificationController.get_user_notifications()
+
+@app.route('/notifications/unread-count', methods=['GET'])
+@jwt_required()
+def get_unread_notification_count_route():
+    """Get the current user's unread notification count (cached, for badges)"""
+    return NotificationController.get_unread_notification_count()
+
+@app.route('/notifications/mark-read/<int:notification_id>', methods=['POST'])
+@jwt_required()
+def mark_notification_read_route(notification_id):
+    """Mark a notification as read"""
+    return NotificationController.mark_notification_read(notification_id)
+
+@app.route('/notifications/mark-all-read', methods=['POST'])
+@jwt_required()
+def mark_all_notifications_read_route():
+    """Mark all of the current user's notifications as read"""
+    return NotificationController.mark_all_notifications_read()
+
 # User profile route
 @app.route('/user/profile', methods=['GET'])
 @jwt_required()
 def user_profile():
     """Return profile info for current user"""
     from flask import jsonify
-    from models.user import User
-    user_id = get_jwt_identity()
-    user = User.query.get(int(user_id))
+    user = get_current_user()
     if not user:
         return jsonify({'error': 'User not found'}), 404
     return jsonify({
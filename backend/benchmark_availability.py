@@ -0,0 +1,110 @@
+# Compares the per-day availability loop against the slot-index availability engine
+# Usage: python benchmark_availability.py [days] [appointments_per_day]
+import os
+import sys
+import time as timer
+from datetime import datetime, timedelta, time, date
+
+# Run against a throwaway in-memory database unless one is supplied explicitly
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from flask import Flask
+from sqlalchemy import event
+from services.db import db, init_db
+from models import User, UserRole, Doctor, Patient, Appointment
+from services.availabilityService import AvailabilityService
+
+
+def legacy_day_slots(day_slots, booked_hours):
+    formatted_slots = []
+    for slot in day_slots:
+        start_hour = int(slot[0:2])
+        end_hour = int(slot[3:5])
+        display_hour = start_hour if start_hour <= 12 else start_hour - 12
+        if display_hour == 0:
+            display_hour = 12
+        am_pm = "PM" if start_hour >= 12 else "AM"
+        formatted_slots.append({
+            "time": f"{display_hour}:00 {am_pm}",
+            "is_booked": start_hour in booked_hours,
+            "start": f"{start_hour:02d}:00",
+            "end": f"{end_hour:02d}:00"
+        })
+    return formatted_slots
+
+
+def legacy_availability_range(doctor, start_date, end_date):
+    """The original one-query-per-day loop from get_doctor_availability_range"""
+    availability_by_date = {}
+    current_date = start_date
+    while current_date <= end_date:
+        day_slots = doctor.availability.get(current_date.strftime("%A").lower(), []) if doctor.availability else []
+        if day_slots:
+            day_start = datetime.combine(current_date, time(0, 0, 0))
+            day_end = datetime.combine(current_date, time(23, 59, 59))
+            booked_appointments = Appointment.query.filter(
+                Appointment.doctor_id == doctor.doctor_id,
+                Appointment.date_time >= day_start,
+                Appointment.date_time <= day_end
+            ).all()
+            booked_hours = set(appt.date_time.hour for appt in booked_appointments)
+            availability_by_date[current_date.isoformat()] = legacy_day_slots(day_slots, booked_hours)
+        current_date += timedelta(days=1)
+    return availability_by_date
+
+
+def seed(days, per_day):
+    doctor_user = User(email="bench.doctor@nabad.com", password_hash="x", first_name="Bench",
+                       last_name="Doctor", role=UserRole.DOCTOR)
+    patient_user = User(email="bench.patient@nabad.com", password_hash="x", first_name="Bench",
+                        last_name="Patient", role=UserRole.PATIENT)
+    db.session.add_all([doctor_user, patient_user])
+    db.session.flush()
+
+    doctor = Doctor(doctor_id=doctor_user.user_id, specialty=UserRole.DOCTOR)
+    patient = Patient(patient_id=patient_user.user_id)
+    db.session.add_all([doctor, patient])
+
+    start_date = date.today()
+    for day in range(days):
+        for hour in range(9, 9 + per_day):
+            db.session.add(Appointment(
+                patient_id=patient.patient_id,
+                doctor_id=doctor.doctor_id,
+                date_time=datetime.combine(start_date + timedelta(days=day), time(hour, 0))
+            ))
+    db.session.commit()
+    return doctor, start_date, start_date + timedelta(days=days - 1)
+
+
+def measure(label, func, *args, runs=20):
+    statements = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(db.engine, "before_cursor_execute", count)
+    started = timer.perf_counter()
+    for _ in range(runs):
+        db.session.expire_all()
+        result = func(*args)
+    elapsed = (timer.perf_counter() - started) / runs
+    event.remove(db.engine, "before_cursor_execute", count)
+
+    print(f"{label:<10} queries/call: {len(statements) / runs:>6.1f}   latency: {elapsed * 1000:>8.2f} ms")
+    return result
+
+
+if __name__ == "__main__":
+    days = int(sys.argv[1]) if len(sys.argv) > 1 else 31
+    per_day = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+
+    app = Flask(__name__)
+    init_db(app)
+
+    with app.app_context():
+        doctor, start_date, end_date = seed(days, per_day)
+        print(f"Availability for {days} days, {per_day} appointments per day")
+        legacy = measure("legacy", legacy_availability_range, doctor, start_date, end_date)
+        engine = measure("engine", AvailabilityService.get_availability_range, doctor, start_date, end_date)
+        print("Results match" if legacy == engine else "Results DIFFER")
@@ -0,0 +1,61 @@
+# Check of the coordinator's local intent routing on known phrasings
+# Run the checks (exits non-zero on failure):
+#     python check_intent_router.py
+# Every case is a patient query and the intent the router must decide locally,
+# or None when the query has to go to the model. Add phrasings that were
+# misrouted in production here before changing the rules.
+import sys
+
+from services.intentRouter import IntentRouter, BOOK, RECOMMEND, CANCEL, RESCHEDULE
+
+
+CASES = [
+    # Clear requests stay on the fast path
+    ("I want to book an appointment with a cardiologist", BOOK),
+    ("Can I schedule a check-up next week?", BOOK),
+    ("Please cancel my appointment on Friday", CANCEL),
+    ("I need to reschedule my visit", RESCHEDULE),
+    ("Can you move my appointment to next week?", RESCHEDULE),
+    ("Which specialist should I see for back pain?", RECOMMEND),
+    # Not being able to come is not a cancellation
+    ("I can't make my appointment on Tuesday, can you move it to Thursday?", RESCHEDULE),
+    ("I won't be able to come on Monday, could we do Wednesday", RESCHEDULE),
+    ("I can't make my appointment tomorrow", None),
+    ("I cannot attend on Monday", None),
+    # Two days named alongside a cancel is a reschedule in disguise
+    ("Cancel Tuesday and book me Thursday instead", None),
+    ("cancel my 2025-03-04 appointment, 2025-03-06 works", None),
+    # A cancel next to rebooking, keeping it or a second clause is not a plain cancel
+    ("Please cancel my appointment and rebook it for Thursday", None),
+    ("I was told to cancel but I would rather keep it", None),
+    ("Cancel my visit and re-book me with Dr. Lee", None),
+    ("Should I cancel or keep my appointment?", None),
+    ("Cancel my appointment instead of moving it", None),
+    # "suggest" about a time is not a doctor recommendation
+    ("Please suggest a new time for my appointment", None),
+    # Negations and compound requests go to the model
+    ("Don't cancel my appointment", None),
+    ("Book a dermatologist and then cancel my other visit", None),
+    ("", None),
+]
+
+
+def run_checks():
+    """Returns the queries that were routed differently than expected"""
+    router = IntentRouter()
+    failures = []
+    for query, expected in CASES:
+        routed = router.route(query)
+        problem = routed != expected
+        print(f"{'FAIL' if problem else 'ok':<5} {query!r} -> {routed}{f' (expected {expected})' if problem else ''}")
+        if problem:
+            failures.append(query)
+    return failures
+
+
+if __name__ == "__main__":
+    failures = run_checks()
+    if failures:
+        print(f"Failed: {len(failures)} of {len(CASES)} queries misrouted")
+        sys.exit(1)
+    print("Intent router routes every known phrasing as expected")
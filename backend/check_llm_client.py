@@ -0,0 +1,202 @@
+# Local stub of the chat-completions API and a behaviour check for LLMClient
+# Serve the stub for manual runs of the backend:
+#     python check_llm_client.py --serve 8089
+#     OPENAI_BASE_URL=http://127.0.0.1:8089/v1 python app.py
+# Run the checks (exits non-zero on failure):
+#     python check_llm_client.py
+# Requests whose last message contains "[delay=<seconds>]" or "[status=<code>]"
+# are answered slowly or with that error status, to exercise timeouts and retries.
+# Requests with "stream": true are answered as server-sent events, one word per chunk.
+import asyncio
+import json
+import re
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from services.llmClient import LLMClient, LLMError
+
+
+class StubChatHandler(BaseHTTPRequestHandler):
+    """Answers POST /v1/chat/completions with a completion echoing the last message"""
+    protocol_version = "HTTP/1.1"
+    calls = 0
+    in_flight = 0
+    max_in_flight = 0
+    failures_left = {}
+    lock = threading.Lock()
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        content = body.get("messages", [{}])[-1].get("content", "")
+
+        cls = StubChatHandler
+        with cls.lock:
+            cls.calls += 1
+            cls.in_flight += 1
+            cls.max_in_flight = max(cls.max_in_flight, cls.in_flight)
+        try:
+            delay = re.search(r"\[delay=([\d.]+)\]", content)
+            if delay:
+                time.sleep(float(delay.group(1)))
+
+            # "[status=503x2]" fails twice with 503 and then succeeds
+            status = re.search(r"\[status=(\d+)(?:x(\d+))?\]", content)
+            if status:
+                with cls.lock:
+                    left = cls.failures_left.setdefault(content, int(status.group(2) or 1_000_000))
+                    cls.failures_left[content] = left - 1
+                if left > 0:
+                    return self._reply(int(status.group(1)), {"error": {"message": "stub failure"}})
+
+            if body.get("stream"):
+                return self._stream_reply(f"echo: {content}")
+
+            self._reply(200, {
+                "id": "chatcmpl-stub",
+                "object": "chat.completion",
+                "model": body.get("model"),
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": f"echo: {content}"},
+                    "finish_reason": "stop"
+                }]
+            })
+        finally:
+            with cls.lock:
+                cls.in_flight -= 1
+
+    def _reply(self, status, payload):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _stream_reply(self, text):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        for i, word in enumerate(text.split(" ")):
+            chunk = {"choices": [{"index": 0, "delta": {"content": word if i == 0 else " " + word}}]}
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+            self.wfile.flush()
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.close_connection = True
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_stub(port=0):
+    """Start the stub in a background thread and return the server"""
+    server = ThreadingHTTPServer(("127.0.0.1", port), StubChatHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def message(text):
+    return [{"role": "user", "content": text}]
+
+
+def run_checks(base_url):
+    """Each check returns None on success or a failure description"""
+    client = LLMClient("stub-key", base_url=base_url, read_timeout=2, deadline_seconds=5,
+                       max_retries=2, max_concurrency=4, backoff_base=0.05, backoff_cap=0.2)
+
+    def plain_call():
+        reply = client.chat(message("hello"))
+        if reply["choices"][0]["message"]["content"] != "echo: hello":
+            return f"unexpected reply {reply}"
+
+    def retries_transient_errors():
+        before = StubChatHandler.calls
+        client.chat(message("[status=503x2] flaky"))
+        if StubChatHandler.calls - before != 3:
+            return f"expected 3 attempts, saw {StubChatHandler.calls - before}"
+
+    def gives_up_after_max_retries():
+        before = StubChatHandler.calls
+        try:
+            client.chat(message("[status=500] broken"))
+            return "expected LLMError"
+        except LLMError:
+            pass
+        if StubChatHandler.calls - before != 3:
+            return f"expected 3 attempts, saw {StubChatHandler.calls - before}"
+
+    def does_not_retry_client_errors():
+        before = StubChatHandler.calls
+        try:
+            client.chat(message("[status=400] bad request"))
+            return "expected LLMError"
+        except LLMError:
+            pass
+        if StubChatHandler.calls - before != 1:
+            return f"expected 1 attempt, saw {StubChatHandler.calls - before}"
+
+    def honours_deadline():
+        started = time.monotonic()
+        try:
+            client.chat(message("[delay=3] slow"), deadline_seconds=1)
+            return "expected LLMError"
+        except LLMError:
+            pass
+        elapsed = time.monotonic() - started
+        if elapsed > 1.5:
+            return f"call took {elapsed:.2f}s with a 1s deadline"
+
+    def limits_concurrency():
+        StubChatHandler.max_in_flight = 0
+        with ThreadPoolExecutor(max_workers=12) as pool:
+            list(pool.map(lambda i: client.chat(message(f"[delay=0.2] parallel {i}")), range(12)))
+        if StubChatHandler.max_in_flight > 4:
+            return f"{StubChatHandler.max_in_flight} requests in flight with a limit of 4"
+
+    def async_interface():
+        async def gather():
+            return await asyncio.gather(*(client.achat(message(f"async {i}")) for i in range(4)))
+        replies = asyncio.run(gather())
+        if [r["choices"][0]["message"]["content"] for r in replies] != [f"echo: async {i}" for i in range(4)]:
+            return "async replies out of order or wrong"
+
+    def streams_tokens():
+        pieces = list(client.stream_chat(message("[status=503x1] stream me please")))
+        if len(pieces) < 2 or "".join(pieces) != "echo: [status=503x1] stream me please":
+            return f"unexpected stream {pieces}"
+
+    # honours_deadline runs last: the stub keeps sleeping on the abandoned request
+    checks = [plain_call, retries_transient_errors, gives_up_after_max_retries,
+              does_not_retry_client_errors, limits_concurrency, async_interface, streams_tokens,
+              honours_deadline]
+    failures = []
+    for check in checks:
+        try:
+            problem = check()
+        except Exception as e:
+            problem = f"raised {e!r}"
+        print(f"{'FAIL' if problem else 'ok':<5} {check.__name__}{': ' + problem if problem else ''}")
+        if problem:
+            failures.append(check.__name__)
+    client.close()
+    return failures
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 2 and sys.argv[1] == "--serve":
+        server = ThreadingHTTPServer(("127.0.0.1", int(sys.argv[2])), StubChatHandler)
+        print(f"Stub chat-completions API on http://127.0.0.1:{sys.argv[2]}/v1")
+        server.serve_forever()
+
+    server = start_stub()
+    failures = run_checks(f"http://127.0.0.1:{server.server_address[1]}/v1")
+    server.shutdown()
+
+    if failures:
+        print(f"Failed: {', '.join(failures)}")
+        sys.exit(1)
+    print("LLM client behaves as expected")
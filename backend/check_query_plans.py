@@ -0,0 +1,146 @@
+# Query-plan regression check for the hot query paths
+# Migrates the database, EXPLAINs each hot ORM query and exits non-zero if any of
+# them falls back to a sequential scan.
+# Usage: DATABASE_URL=postgresql://... python check_query_plans.py
+import os
+import sys
+from datetime import datetime, timedelta, date
+
+# Run against a throwaway in-memory database unless one is supplied explicitly
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from flask import Flask
+from sqlalchemy import or_, desc, func
+from services.db import db, init_db
+from models import Appointment, Message, Notification, Referral, DoctorSlotIndex, ConversationSummary, WaitlistEntry
+from services.reminderService import ReminderService
+
+
+def hot_queries():
+    """The ORM queries issued on every request, with representative parameters"""
+    now = datetime(2025, 5, 1, 9, 0)
+    return {
+        "availability bookings range": db.session.query(Appointment.doctor_id, Appointment.date_time).filter(
+            Appointment.doctor_id.in_([1, 2]),
+            Appointment.date_time >= now,
+            Appointment.date_time < now + timedelta(days=31)
+        ),
+        "booking conflict": db.session.query(Appointment).filter(
+            Appointment.doctor_id == 1,
+            Appointment.date_time > now - timedelta(minutes=Appointment.MAX_DURATION_MINUTES),
+            Appointment.date_time < now + timedelta(hours=1),
+            Appointment.end_time > now
+        ),
+        "patient appointments": db.session.query(Appointment).filter(
+            Appointment.patient_id == 1,
+            Appointment.date_time >= now
+        ).order_by(Appointment.date_time),
+        "conversation messages": db.session.query(Message).filter(
+            or_(
+                (Message.sender_id == 1) & (Message.receiver_id == 2),
+                (Message.sender_id == 2) & (Message.receiver_id == 1)
+            )
+        ).order_by(Message.timestamp.asc()),
+        "unread message count": db.session.query(func.count(Message.message_id)).filter(
+            Message.receiver_id == 1,
+            Message.is_read == False
+        ),
+        "user notifications": db.session.query(Notification).filter(
+            Notification.user_id == 1,
+            Notification.before_position(now, 100)
+        ).order_by(desc(Notification.scheduled_time), desc(Notification.notification_id)).limit(51),
+        "unread notifications": db.session.query(Notification).filter(
+            Notification.user_id == 1,
+            Notification.is_read == False
+        ).order_by(desc(Notification.scheduled_time), desc(Notification.notification_id)).limit(51),
+        "notifications by status": db.session.query(Notification).filter(
+            Notification.user_id == 1,
+            Notification.status == "reminder"
+        ).order_by(desc(Notification.scheduled_time), desc(Notification.notification_id)).limit(51),
+        "unread notification count": db.session.query(func.count(Notification.notification_id)).filter(
+            Notification.user_id == 1,
+            Notification.is_read == False
+        ),
+        "specialist referrals": db.session.query(Referral).filter(
+            Referral.specialist_id == 1,
+            Referral.status == "pending",
+            Referral.priority == "high"
+        ),
+        "slot index read": db.session.query(DoctorSlotIndex).filter(
+            DoctorSlotIndex.doctor_id.in_([1, 2]),
+            DoctorSlotIndex.date >= date(2025, 5, 1),
+            DoctorSlotIndex.date <= date(2025, 5, 31)
+        ),
+        "conversation inbox (low side)": ConversationSummary.inbox_side(1, True, (now, 2)).limit(51),
+        "conversation inbox (high side)": ConversationSummary.inbox_side(1, False, (now, 2)).limit(51),
+        "due reminders": ReminderService.due_reminders_query(now),
+        "availability fan-out targets": ReminderService.availability_targets_query(1, now),
+        "waitlist queue head": db.session.query(WaitlistEntry).filter(
+            WaitlistEntry.doctor_id == 1,
+            WaitlistEntry.date == date(2025, 5, 1),
+            WaitlistEntry.status == "waiting"
+        ).order_by(*WaitlistEntry.queue_order()).limit(10),
+        "waitlist hold check": db.session.query(WaitlistEntry).filter(
+            WaitlistEntry.doctor_id == 1,
+            WaitlistEntry.offered_slot > now - timedelta(minutes=Appointment.MAX_DURATION_MINUTES),
+            WaitlistEntry.offered_slot < now + timedelta(hours=1),
+            WaitlistEntry.status == "offered",
+            WaitlistEntry.offer_expires_at > now
+        ),
+    }
+
+
+def explain(connection, query):
+    """Return the plan lines of a query on the connection's dialect"""
+    # ORM queries expose their SELECT as .statement; Core selects are used as they are
+    statement = getattr(query, "statement", query)
+    compiled = statement.compile(dialect=connection.dialect, compile_kwargs={"render_postcompile": True})
+    statement = str(compiled)
+    params = compiled.params
+
+    if connection.dialect.name == "postgresql":
+        # Empty tables make a sequential scan the cheapest plan; rule that out so
+        # only a missing index can produce one
+        connection.exec_driver_sql("SET enable_seqscan = off")
+        # psycopg2 expects a mapping for named parameters
+        rows = connection.exec_driver_sql("EXPLAIN " + statement, params).fetchall()
+        return [row[0] for row in rows]
+
+    # SQLite uses positional parameters in compile order
+    positional = tuple(params[name] for name in compiled.positiontup)
+    rows = connection.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, positional).fetchall()
+    return [row[-1] for row in rows]
+
+
+def is_full_scan(line):
+    """True if a plan line reads a whole table instead of going through an index"""
+    if "Seq Scan" in line:
+        return True
+    # SQLite reports "SCAN <table>" for full scans and "SCAN <table> USING INDEX" otherwise.
+    # Reading the rows of a subquery (already narrowed by its own plan) is not a table scan.
+    line = line.strip()
+    if line.startswith(("SCAN anon_", "SCAN (subquery")):
+        return False
+    return line.startswith("SCAN ") and "USING" not in line
+
+
+if __name__ == "__main__":
+    app = Flask(__name__)
+    init_db(app)
+
+    failures = []
+    with app.app_context():
+        with db.engine.connect() as connection:
+            for name, query in hot_queries().items():
+                plan = explain(connection, query)
+                scans = [line for line in plan if is_full_scan(line)]
+                print(f"{'FAIL' if scans else 'ok':<5} {name}")
+                for line in plan:
+                    print(f"        {line}")
+                if scans:
+                    failures.append(name)
+
+    if failures:
+        print(f"Sequential scans in: {', '.join(failures)}")
+        sys.exit(1)
+    print("All hot queries use an index")
@@ -0,0 +1,51 @@
+import os
+import sys
+from alembic import context
+from sqlalchemy import create_engine
+
+# Make the backend packages importable when running the alembic CLI from backend/
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.db import db, DEFAULT_DATABASE_URL
+import models  # Registers every model on db.metadata
+
+config = context.config
+target_metadata = db.metadata
+
+
+def database_url():
+    return config.get_main_option("sqlalchemy.url") or os.environ.get('DATABASE_URL', DEFAULT_DATABASE_URL)
+
+
+def run_migrations_offline():
+    """Emit the migration SQL without connecting to a database"""
+    context.configure(
+        url=database_url(),
+        target_metadata=target_metadata,
+        literal_binds=True,
+        render_as_batch=True
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online():
+    """Run the migrations on the app's connection (init_db) or a fresh engine (CLI)"""
+    connection = config.attributes.get("connection")
+    if connection is not None:
+        context.configure(connection=connection, target_metadata=target_metadata, render_as_batch=True)
+        with context.begin_transaction():
+            context.run_migrations()
+        return
+
+    engine = create_engine(database_url())
+    with engine.connect() as connection:
+        context.configure(connection=connection, target_metadata=target_metadata, render_as_batch=True)
+        with context.begin_transaction():
+            context.run_migrations()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
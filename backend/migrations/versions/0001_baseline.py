@@ -0,0 +1,163 @@
+"""Baseline schema (the tables db.create_all() used to create)
+
+Revision ID: 0001_baseline
+Revises:
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0001_baseline'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+USER_ROLES = ('PATIENT', 'DOCTOR', 'NURSE', 'SURGEON', 'THERAPIST', 'RECEPTIONIST', 'CAREGIVER')
+
+
+def upgrade():
+    bind = op.get_bind()
+
+    # userrole is shared by users.role and doctors.specialty, so create the type once
+    user_role = sa.Enum(*USER_ROLES, name='userrole')
+    user_role.create(bind, checkfirst=True)
+    if bind.dialect.name == 'postgresql':
+        from sqlalchemy.dialects import postgresql
+        user_role = postgresql.ENUM(*USER_ROLES, name='userrole', create_type=False)
+
+    op.create_table('users',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('email', sa.String(length=255), nullable=False),
+    sa.Column('password_hash', sa.String(length=255), nullable=False),
+    sa.Column('first_name', sa.String(length=50), nullable=False),
+    sa.Column('last_name', sa.String(length=50), nullable=False),
+    sa.Column('role', user_role, nullable=False),
+    sa.Column('phone', sa.String(length=20), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('user_id'),
+    sa.UniqueConstraint('email')
+    )
+    op.create_table('doctors',
+    sa.Column('doctor_id', sa.Integer(), nullable=False),
+    sa.Column('specialty', user_role, nullable=False),
+    sa.Column('availability', sa.JSON(), nullable=True),
+    sa.Column('description', sa.String(length=255), nullable=True),
+    sa.ForeignKeyConstraint(['doctor_id'], ['users.user_id'], ),
+    sa.PrimaryKeyConstraint('doctor_id')
+    )
+    # patients <-> insurance reference each other; the patients side is added after both exist
+    op.create_table('patients',
+    sa.Column('patient_id', sa.Integer(), nullable=False),
+    sa.Column('date_of_birth', sa.DateTime(), nullable=True),
+    sa.Column('emergency_contact_name', sa.String(length=100), nullable=True),
+    sa.Column('emergency_contact_phone', sa.String(length=20), nullable=True),
+    sa.Column('doctor_id', sa.Integer(), nullable=True),
+    sa.Column('bill', sa.Integer(), nullable=True),
+    sa.Column('insurance_id', sa.Integer(), nullable=True),
+    sa.Column('caregiver_id', sa.Integer(), nullable=True),
+    sa.Column('needs_caregiver', sa.Boolean(), nullable=True),
+    sa.ForeignKeyConstraint(['caregiver_id'], ['users.user_id'], ),
+    sa.ForeignKeyConstraint(['doctor_id'], ['doctors.doctor_id'], ),
+    sa.ForeignKeyConstraint(['patient_id'], ['users.user_id'], ),
+    sa.PrimaryKeyConstraint('patient_id')
+    )
+    op.create_table('insurance',
+    sa.Column('patient_id', sa.Integer(), nullable=False),
+    sa.Column('coverage_type', sa.Enum('LIMITED', 'STANDARD', 'PREMIUM', 'NONE', name='insurancecoverage'), nullable=False),
+    sa.Column('provider_name', sa.String(length=100), nullable=True),
+    sa.Column('policy_number', sa.String(length=50), nullable=True),
+    sa.Column('group_number', sa.String(length=50), nullable=True),
+    sa.Column('policy_holder_name', sa.String(length=100), nullable=True),
+    sa.Column('coverage_start_date', sa.Date(), nullable=True),
+    sa.Column('coverage_end_date', sa.Date(), nullable=True),
+    sa.Column('front_card_image', sa.Text(), nullable=True),
+    sa.Column('back_card_image', sa.Text(), nullable=True),
+    sa.ForeignKeyConstraint(['patient_id'], ['patients.patient_id'], ),
+    sa.PrimaryKeyConstraint('patient_id')
+    )
+    if bind.dialect.name != 'sqlite':
+        op.create_foreign_key('patients_insurance_id_fkey', 'patients', 'insurance', ['insurance_id'], ['patient_id'])
+
+    op.create_table('messages',
+    sa.Column('message_id', sa.Integer(), nullable=False),
+    sa.Column('sender_id', sa.Integer(), nullable=False),
+    sa.Column('receiver_id', sa.Integer(), nullable=False),
+    sa.Column('content', sa.String(), nullable=False),
+    sa.Column('timestamp', sa.DateTime(), nullable=True),
+    sa.Column('is_read', sa.Boolean(), nullable=True),
+    sa.ForeignKeyConstraint(['receiver_id'], ['users.user_id'], ),
+    sa.ForeignKeyConstraint(['sender_id'], ['users.user_id'], ),
+    sa.PrimaryKeyConstraint('message_id')
+    )
+    op.create_table('appointments',
+    sa.Column('appointment_id', sa.Integer(), nullable=False),
+    sa.Column('patient_id', sa.Integer(), nullable=False),
+    sa.Column('doctor_id', sa.Integer(), nullable=False),
+    sa.Column('date_time', sa.DateTime(), nullable=False),
+    sa.Column('type', sa.Enum('REGULAR', 'RECURRING', 'EMERGENCY', name='appointmenttype'), nullable=False),
+    sa.Column('recurrence_pattern', sa.Enum('NONE', 'WEEKLY', 'BIWEEKLY', 'MONTHLY', name='recurrencepattern'), nullable=False),
+    sa.Column('base_cost', sa.Float(), nullable=True),
+    sa.Column('insurance_verified', sa.Boolean(), nullable=True),
+    sa.Column('insurance_coverage_amount', sa.Float(), nullable=True),
+    sa.Column('patient_responsibility', sa.Float(), nullable=True),
+    sa.ForeignKeyConstraint(['doctor_id'], ['doctors.doctor_id'], ),
+    sa.ForeignKeyConstraint(['patient_id'], ['patients.patient_id'], ),
+    sa.PrimaryKeyConstraint('appointment_id')
+    )
+    op.create_table('medical_records',
+    sa.Column('record_id', sa.Integer(), nullable=False),
+    sa.Column('patient_id', sa.Integer(), nullable=False),
+    sa.Column('description', sa.String(), nullable=False),
+    sa.Column('doctor_id', sa.Integer(), nullable=False),
+    sa.Column('perscription', sa.String(), nullable=True),
+    sa.ForeignKeyConstraint(['doctor_id'], ['doctors.doctor_id'], ),
+    sa.ForeignKeyConstraint(['patient_id'], ['patients.patient_id'], ),
+    sa.PrimaryKeyConstraint('record_id')
+    )
+    op.create_table('notifications',
+    sa.Column('notification_id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('appointment_id', sa.Integer(), nullable=True),
+    sa.Column('message', sa.String(), nullable=False),
+    sa.Column('scheduled_time', sa.DateTime(), nullable=False),
+    sa.Column('is_read', sa.Boolean(), nullable=True),
+    sa.Column('status', sa.String(), nullable=True),
+    sa.ForeignKeyConstraint(['appointment_id'], ['appointments.appointment_id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.user_id'], ),
+    sa.PrimaryKeyConstraint('notification_id')
+    )
+    op.create_table('referrals',
+    sa.Column('referral_id', sa.Integer(), nullable=False),
+    sa.Column('patient_id', sa.Integer(), nullable=False),
+    sa.Column('referring_doctor_id', sa.Integer(), nullable=False),
+    sa.Column('specialist_id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('reason', sa.Text(), nullable=False),
+    sa.Column('notes', sa.Text(), nullable=True),
+    sa.Column('status', sa.String(length=20), nullable=True),
+    sa.Column('priority', sa.String(length=20), nullable=True),
+    sa.Column('appointment_id', sa.Integer(), nullable=True),
+    sa.Column('is_read', sa.Boolean(), nullable=True),
+    sa.ForeignKeyConstraint(['appointment_id'], ['appointments.appointment_id'], ),
+    sa.ForeignKeyConstraint(['patient_id'], ['patients.patient_id'], ),
+    sa.ForeignKeyConstraint(['referring_doctor_id'], ['doctors.doctor_id'], ),
+    sa.ForeignKeyConstraint(['specialist_id'], ['doctors.doctor_id'], ),
+    sa.PrimaryKeyConstraint('referral_id')
+    )
+
+
+def downgrade():
+    bind = op.get_bind()
+    op.drop_table('referrals')
+    op.drop_table('notifications')
+    op.drop_table('medical_records')
+    op.drop_table('appointments')
+    op.drop_table('messages')
+    if bind.dialect.name != 'sqlite':
+        op.drop_constraint('patients_insurance_id_fkey', 'patients', type_='foreignkey')
+    op.drop_table('insurance')
+    op.drop_table('patients')
+    op.drop_table('doctors')
+    op.drop_table('users')
+    for enum_name in ('recurrencepattern', 'appointmenttype', 'insurancecoverage', 'userrole'):
+        sa.Enum(name=enum_name).drop(bind, checkfirst=True)
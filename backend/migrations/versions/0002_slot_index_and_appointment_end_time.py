@@ -0,0 +1,114 @@
+"""Doctor slot index and appointment end times with double-booking constraints
+
+Revision ID: 0002_slot_index_end_time
+Revises: 0001_baseline
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0002_slot_index_end_time'
+down_revision = '0001_baseline'
+branch_labels = None
+depends_on = None
+
+
+# Appointments removed to make room for the constraints are kept here for follow-up
+CONFLICTS_TABLE = 'appointment_conflicts_0002'
+
+
+def resolve_conflicts(bind):
+    """
+    Bookings made before this revision were never checked for conflicts, so a
+    doctor can have duplicate or overlapping appointments that would make the
+    constraints below fail. Per doctor the oldest booking (lowest id) is kept;
+    every appointment overlapping a kept one is copied to CONFLICTS_TABLE,
+    unlinked from its notifications and referrals, and removed. Each removal
+    is printed so the patients can be contacted.
+    """
+    appointments = sa.table('appointments',
+        sa.column('appointment_id', sa.Integer()),
+        sa.column('patient_id', sa.Integer()),
+        sa.column('doctor_id', sa.Integer()),
+        sa.column('date_time', sa.DateTime()),
+        sa.column('end_time', sa.DateTime())
+    )
+    rows = bind.execute(
+        sa.select(appointments).order_by(appointments.c.doctor_id, appointments.c.appointment_id)
+    ).all()
+
+    kept = {}
+    conflicts = []
+    for row in rows:
+        doctor_kept = kept.setdefault(row.doctor_id, [])
+        clash = next((other for other in doctor_kept
+                      if other.date_time < row.end_time and row.date_time < other.end_time), None)
+        if clash is None:
+            doctor_kept.append(row)
+        else:
+            conflicts.append((row, clash))
+    if not conflicts:
+        return
+
+    ids = [row.appointment_id for row, _ in conflicts]
+    id_list = ", ".join(str(appointment_id) for appointment_id in ids)
+    op.execute(f"CREATE TABLE {CONFLICTS_TABLE} AS SELECT * FROM appointments WHERE appointment_id IN ({id_list})")
+    op.execute(f"UPDATE notifications SET appointment_id = NULL WHERE appointment_id IN ({id_list})")
+    op.execute(f"UPDATE referrals SET appointment_id = NULL WHERE appointment_id IN ({id_list})")
+    op.execute(f"DELETE FROM appointments WHERE appointment_id IN ({id_list})")
+    for row, clash in conflicts:
+        print(
+            f"Removed appointment {row.appointment_id} (patient {row.patient_id}, doctor {row.doctor_id}, "
+            f"{row.date_time}): overlaps appointment {clash.appointment_id}; a copy is in {CONFLICTS_TABLE}"
+        )
+
+
+def upgrade():
+    bind = op.get_bind()
+
+    op.create_table('doctor_slot_index',
+    sa.Column('doctor_id', sa.Integer(), nullable=False),
+    sa.Column('date', sa.Date(), nullable=False),
+    sa.Column('template_mask', sa.BigInteger(), nullable=False),
+    sa.Column('booked_mask', sa.BigInteger(), nullable=False),
+    sa.ForeignKeyConstraint(['doctor_id'], ['doctors.doctor_id'], ),
+    sa.PrimaryKeyConstraint('doctor_id', 'date')
+    )
+
+    with op.batch_alter_table('appointments') as batch_op:
+        batch_op.add_column(sa.Column('duration_minutes', sa.Integer(), nullable=False, server_default='60'))
+        batch_op.add_column(sa.Column('end_time', sa.DateTime(), nullable=True))
+
+    # Existing appointments were all treated as one hour long
+    if bind.dialect.name == 'postgresql':
+        op.execute("UPDATE appointments SET end_time = date_time + duration_minutes * interval '1 minute'")
+    elif bind.dialect.name == 'sqlite':
+        op.execute("UPDATE appointments SET end_time = datetime(date_time, '+' || duration_minutes || ' minutes')")
+    else:
+        op.execute("UPDATE appointments SET end_time = DATE_ADD(date_time, INTERVAL duration_minutes MINUTE)")
+
+    resolve_conflicts(bind)
+
+    with op.batch_alter_table('appointments') as batch_op:
+        batch_op.alter_column('end_time', existing_type=sa.DateTime(), nullable=False)
+        batch_op.create_unique_constraint('uq_appointments_doctor_start', ['doctor_id', 'date_time'])
+
+    if bind.dialect.name == 'postgresql':
+        op.execute("CREATE EXTENSION IF NOT EXISTS btree_gist")
+        op.execute(
+            "ALTER TABLE appointments ADD CONSTRAINT ex_appointments_doctor_overlap "
+            "EXCLUDE USING gist (doctor_id WITH =, tsrange(date_time, end_time) WITH &&)"
+        )
+
+
+def downgrade():
+    bind = op.get_bind()
+    if bind.dialect.name == 'postgresql':
+        op.execute("ALTER TABLE appointments DROP CONSTRAINT ex_appointments_doctor_overlap")
+
+    with op.batch_alter_table('appointments') as batch_op:
+        batch_op.drop_constraint('uq_appointments_doctor_start', type_='unique')
+        batch_op.drop_column('end_time')
+        batch_op.drop_column('duration_minutes')
+
+    op.drop_table('doctor_slot_index')
@@ -0,0 +1,30 @@
+"""Composite indexes for the hot query paths
+
+Revision ID: 0003_hot_path_indexes
+Revises: 0002_slot_index_end_time
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0003_hot_path_indexes'
+down_revision = '0002_slot_index_end_time'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # appointments(doctor_id, date_time) is already covered by uq_appointments_doctor_start
+    op.create_index('ix_appointments_patient_date', 'appointments', ['patient_id', 'date_time'])
+    op.create_index('ix_messages_sender_receiver_time', 'messages', ['sender_id', 'receiver_id', 'timestamp'])
+    op.create_index('ix_messages_receiver_unread', 'messages', ['receiver_id', 'is_read'])
+    op.create_index('ix_notifications_user_time', 'notifications', ['user_id', 'scheduled_time'])
+    op.create_index('ix_referrals_specialist_status_priority', 'referrals', ['specialist_id', 'status', 'priority'])
+
+
+def downgrade():
+    op.drop_index('ix_referrals_specialist_status_priority', table_name='referrals')
+    op.drop_index('ix_notifications_user_time', table_name='notifications')
+    op.drop_index('ix_messages_receiver_unread', table_name='messages')
+    op.drop_index('ix_messages_sender_receiver_time', table_name='messages')
+    op.drop_index('ix_appointments_patient_date', table_name='appointments')
@@ -0,0 +1,73 @@
+"""Conversation summary table for the messaging inbox
+
+Revision ID: 0004_conversation_summaries
+Revises: 0003_hot_path_indexes
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0004_conversation_summaries'
+down_revision = '0003_hot_path_indexes'
+branch_labels = None
+depends_on = None
+
+PREVIEW_LENGTH = 50
+
+
+def upgrade():
+    summaries = op.create_table('conversation_summaries',
+    sa.Column('user_low_id', sa.Integer(), nullable=False),
+    sa.Column('user_high_id', sa.Integer(), nullable=False),
+    sa.Column('last_message_id', sa.Integer(), nullable=True),
+    sa.Column('last_sender_id', sa.Integer(), nullable=True),
+    sa.Column('last_message_preview', sa.String(length=60), nullable=True),
+    sa.Column('last_message_at', sa.DateTime(), nullable=True),
+    sa.Column('unread_low', sa.Integer(), nullable=False),
+    sa.Column('unread_high', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['last_message_id'], ['messages.message_id'], ),
+    sa.ForeignKeyConstraint(['last_sender_id'], ['users.user_id'], ),
+    sa.ForeignKeyConstraint(['user_high_id'], ['users.user_id'], ),
+    sa.ForeignKeyConstraint(['user_low_id'], ['users.user_id'], ),
+    sa.PrimaryKeyConstraint('user_low_id', 'user_high_id')
+    )
+    op.create_index('ix_conversation_summaries_low_time', 'conversation_summaries', ['user_low_id', 'last_message_at'])
+    op.create_index('ix_conversation_summaries_high_time', 'conversation_summaries', ['user_high_id', 'last_message_at'])
+
+    # Build a row per pair from the existing messages
+    messages = sa.table('messages',
+        sa.column('message_id', sa.Integer),
+        sa.column('sender_id', sa.Integer),
+        sa.column('receiver_id', sa.Integer),
+        sa.column('content', sa.String),
+        sa.column('timestamp', sa.DateTime),
+        sa.column('is_read', sa.Boolean)
+    )
+    rows = {}
+    result = op.get_bind().execute(sa.select(messages).order_by(messages.c.message_id))
+    for message in result:
+        low, high = sorted((message.sender_id, message.receiver_id))
+        row = rows.setdefault((low, high), {
+            "user_low_id": low,
+            "user_high_id": high,
+            "unread_low": 0,
+            "unread_high": 0
+        })
+        content = message.content or ''
+        row.update({
+            "last_message_id": message.message_id,
+            "last_sender_id": message.sender_id,
+            "last_message_preview": content[:PREVIEW_LENGTH] + ('...' if len(content) > PREVIEW_LENGTH else ''),
+            "last_message_at": message.timestamp
+        })
+        if not message.is_read:
+            row["unread_low" if message.receiver_id == low else "unread_high"] += 1
+
+    if rows:
+        op.bulk_insert(summaries, list(rows.values()))
+
+
+def downgrade():
+    op.drop_index('ix_conversation_summaries_high_time', table_name='conversation_summaries')
+    op.drop_index('ix_conversation_summaries_low_time', table_name='conversation_summaries')
+    op.drop_table('conversation_summaries')
@@ -0,0 +1,31 @@
+"""Reminder ledger and start-time index for the reminder scan
+
+Revision ID: 0005_appointment_reminders
+Revises: 0004_conversation_summaries
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0005_appointment_reminders'
+down_revision = '0004_conversation_summaries'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('appointment_reminders',
+    sa.Column('appointment_id', sa.Integer(), nullable=False),
+    sa.Column('kind', sa.String(length=16), nullable=False),
+    sa.Column('appointment_time', sa.DateTime(), nullable=False),
+    sa.Column('sent_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['appointment_id'], ['appointments.appointment_id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('appointment_id', 'kind', 'appointment_time')
+    )
+    # The reminder scan selects appointments of every doctor by start time
+    op.create_index('ix_appointments_date_time', 'appointments', ['date_time'])
+
+
+def downgrade():
+    op.drop_index('ix_appointments_date_time', table_name='appointments')
+    op.drop_table('appointment_reminders')
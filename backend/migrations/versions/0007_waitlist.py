@@ -0,0 +1,43 @@
+"""Waitlist of patients waiting for an opening with a doctor
+
+Revision ID: 0007_waitlist
+Revises: 0006_scheduled_jobs
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0007_waitlist'
+down_revision = '0006_scheduled_jobs'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('waitlist_entries',
+    sa.Column('entry_id', sa.Integer(), nullable=False),
+    sa.Column('patient_id', sa.Integer(), nullable=False),
+    sa.Column('doctor_id', sa.Integer(), nullable=False),
+    sa.Column('date', sa.Date(), nullable=False),
+    sa.Column('priority', sa.Integer(), nullable=False),
+    sa.Column('requested_at', sa.DateTime(), nullable=False),
+    sa.Column('status', sa.String(length=16), nullable=False),
+    sa.Column('offered_slot', sa.DateTime(), nullable=True),
+    sa.Column('offered_duration_minutes', sa.Integer(), nullable=True),
+    sa.Column('offer_expires_at', sa.DateTime(), nullable=True),
+    sa.Column('appointment_id', sa.Integer(), nullable=True),
+    sa.ForeignKeyConstraint(['patient_id'], ['patients.patient_id'], ),
+    sa.ForeignKeyConstraint(['doctor_id'], ['doctors.doctor_id'], ),
+    sa.ForeignKeyConstraint(['appointment_id'], ['appointments.appointment_id'], ondelete='SET NULL'),
+    sa.PrimaryKeyConstraint('entry_id')
+    )
+    op.create_index('ix_waitlist_entries_queue', 'waitlist_entries', ['doctor_id', 'date', 'status'])
+    op.create_index('ix_waitlist_entries_patient', 'waitlist_entries', ['patient_id', 'status'])
+    op.create_index('ix_waitlist_entries_offered_slot', 'waitlist_entries', ['doctor_id', 'offered_slot'])
+
+
+def downgrade():
+    op.drop_index('ix_waitlist_entries_offered_slot', table_name='waitlist_entries')
+    op.drop_index('ix_waitlist_entries_patient', table_name='waitlist_entries')
+    op.drop_index('ix_waitlist_entries_queue', table_name='waitlist_entries')
+    op.drop_table('waitlist_entries')
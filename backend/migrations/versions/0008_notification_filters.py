@@ -0,0 +1,23 @@
+"""Indexes for filtered notification listings and the unread count
+
+Revision ID: 0008_notification_filters
+Revises: 0007_waitlist
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0008_notification_filters'
+down_revision = '0007_waitlist'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_notifications_user_read_time', 'notifications', ['user_id', 'is_read', 'scheduled_time'])
+    op.create_index('ix_notifications_user_status_time', 'notifications', ['user_id', 'status', 'scheduled_time'])
+
+
+def downgrade():
+    op.drop_index('ix_notifications_user_status_time', table_name='notifications')
+    op.drop_index('ix_notifications_user_read_time', table_name='notifications')
@@ -0,0 +1,29 @@
+"""One scheduled row per recurring job
+
+Revision ID: 0009_unique_recurring_jobs
+Revises: 0008_notification_filters
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0009_unique_recurring_jobs'
+down_revision = '0008_notification_filters'
+branch_labels = None
+depends_on = None
+
+RECURRING_SCHEDULED = "interval_seconds IS NOT NULL AND status IN ('pending', 'running')"
+
+
+def upgrade():
+    # Workers starting together could each have created the recurring jobs; keep the oldest row
+    op.execute(
+        f"DELETE FROM scheduled_jobs WHERE {RECURRING_SCHEDULED} AND job_id NOT IN ("
+        f"SELECT MIN(job_id) FROM scheduled_jobs WHERE {RECURRING_SCHEDULED} GROUP BY name)"
+    )
+    op.create_index('uq_scheduled_jobs_recurring_name', 'scheduled_jobs', ['name'], unique=True,
+                    postgresql_where=sa.text(RECURRING_SCHEDULED), sqlite_where=sa.text(RECURRING_SCHEDULED))
+
+
+def downgrade():
+    op.drop_index('uq_scheduled_jobs_recurring_name', table_name='scheduled_jobs')
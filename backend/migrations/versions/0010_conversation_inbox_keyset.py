@@ -0,0 +1,29 @@
+"""Add the partner column to the inbox indexes for keyset paging
+
+Revision ID: 0010_conversation_inbox_keyset
+Revises: 0009_unique_recurring_jobs
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0010_conversation_inbox_keyset'
+down_revision = '0009_unique_recurring_jobs'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.drop_index('ix_conversation_summaries_high_time', table_name='conversation_summaries')
+    op.drop_index('ix_conversation_summaries_low_time', table_name='conversation_summaries')
+    op.create_index('ix_conversation_summaries_low_time', 'conversation_summaries',
+                    ['user_low_id', 'last_message_at', 'user_high_id'])
+    op.create_index('ix_conversation_summaries_high_time', 'conversation_summaries',
+                    ['user_high_id', 'last_message_at', 'user_low_id'])
+
+
+def downgrade():
+    op.drop_index('ix_conversation_summaries_high_time', table_name='conversation_summaries')
+    op.drop_index('ix_conversation_summaries_low_time', table_name='conversation_summaries')
+    op.create_index('ix_conversation_summaries_low_time', 'conversation_summaries', ['user_low_id', 'last_message_at'])
+    op.create_index('ix_conversation_summaries_high_time', 'conversation_summaries', ['user_high_id', 'last_message_at'])
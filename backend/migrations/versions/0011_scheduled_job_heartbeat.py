@@ -0,0 +1,25 @@
+"""Heartbeat column for the leases of running jobs
+
+Revision ID: 0011_scheduled_job_heartbeat
+Revises: 0010_conversation_inbox_keyset
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0011_scheduled_job_heartbeat'
+down_revision = '0010_conversation_inbox_keyset'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('scheduled_jobs') as batch_op:
+        batch_op.add_column(sa.Column('heartbeat_at', sa.DateTime(), nullable=True))
+    # Jobs running across the upgrade keep the lease they had under started_at
+    op.execute("UPDATE scheduled_jobs SET heartbeat_at = started_at WHERE status = 'running'")
+
+
+def downgrade():
+    with op.batch_alter_table('scheduled_jobs') as batch_op:
+        batch_op.drop_column('heartbeat_at')
@@ -8,6 +8,11 @@ from .insurance import Insurance , InsuranceCoverage
 from .message import Message
 from .notification import Notification
 from .referral import Referral
+from .slot_index import DoctorSlotIndex
+from .conversation import ConversationSummary
+from .reminder import AppointmentReminder
+from .job import ScheduledJob
+from .waitlist import WaitlistEntry
 
 #  what gets imported with "from models import *"
 __all__ = [
@@ -26,5 +31,10 @@ __all__ = [
     'Message',
     'Notification',
     'Referral',
+    'DoctorSlotIndex',
+    'ConversationSummary',
+    'AppointmentReminder',
+    'ScheduledJob',
+    'WaitlistEntry',
 
 ]
\ No newline at end of file
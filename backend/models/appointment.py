@@ -1,5 +1,6 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Enum, Text, Float, Boolean
-from sqlalchemy.orm import relationship
+from datetime import datetime, timedelta
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Enum, Text, Float, Boolean, UniqueConstraint, Index, event
+from sqlalchemy.orm import relationship, joinedload
 from .base import *
 
 
@@ -23,6 +24,8 @@ class Appointment(Base):
     patient_id = Column(Integer, ForeignKey('patients.patient_id'), nullable=False)
     doctor_id = Column(Integer, ForeignKey('doctors.doctor_id'), nullable=False)
     date_time = Column(DateTime, nullable=False)
+    duration_minutes = Column(Integer, nullable=False, default=60)
+    end_time = Column(DateTime, nullable=False)  # date_time + duration_minutes, kept in sync on flush
     type = Column(Enum(AppointmentType), nullable=False, default=AppointmentType.REGULAR)
     recurrence_pattern = Column(Enum(RecurrencePattern), nullable=False, default=RecurrencePattern.NONE)
     
@@ -37,6 +40,103 @@ class Appointment(Base):
     notifications = relationship("Notification", back_populates="appointment")
     doctor = relationship("Doctor", back_populates="appointments")
 
+    __table_args__ = (
+        # A doctor can never have two appointments starting at the same time;
+        # this also serves as the (doctor_id, date_time) index. On PostgreSQL the
+        # migrations add an exclusion constraint that rejects overlapping ranges too.
+        UniqueConstraint('doctor_id', 'date_time', name='uq_appointments_doctor_start'),
+        Index('ix_appointments_patient_date', 'patient_id', 'date_time'),
+        Index('ix_appointments_date_time', 'date_time'),
+    )
 
+    DEFAULT_DURATION_MINUTES = 60
+    # Longest allowed appointment; bounds the overlap search to an index range
+    MAX_DURATION_MINUTES = 240
 
+    @classmethod
+    def with_parties(cls, include_patient=False):
+        """
+        Loader options that fetch the doctor (and optionally the patient) with their
+        user records in the same statement as the appointments, so serializing a
+        list does not issue a query per row
+        
+        Usage: Appointment.query.options(*Appointment.with_parties()).filter(...)
+        
+        Args:
+            include_patient: Also load the patient and the patient's user
+            
+        Returns:
+            list: SQLAlchemy loader options
+        """
+        from models.doctor import Doctor
+        from models.patient import Patient
+        
+        options = [joinedload(cls.doctor).joinedload(Doctor.user)]
+        if include_patient:
+            options.append(joinedload(cls.patient).joinedload(Patient.user))
+        return options
+
+    def to_dict(self, include_patient=False):
+        """
+        Convert appointment to a dictionary. Load the appointment with
+        with_parties() first to avoid lazy loads of the doctor and patient.
+        
+        Args:
+            include_patient: Include the patient's name
+        """
+        doctor = self.doctor
+        doctor_user = doctor.user if doctor else None
+        
+        data = {
+            'appointment_id': self.appointment_id,
+            'date_time': self.date_time.strftime("%Y-%m-%d %H:%M"),
+            'duration_minutes': self.duration_minutes,
+            'end_time': self.end_time.strftime("%Y-%m-%d %H:%M") if self.end_time else None,
+            'doctor_id': self.doctor_id,
+            'doctor_name': f"Dr. {doctor_user.first_name} {doctor_user.last_name}" if doctor_user else "Unknown",
+            'doctor_specialty': doctor.specialty.name if doctor and doctor.specialty else "General",
+            'patient_id': self.patient_id,
+            'type': self.type.name,
+            'recurrence_pattern': self.recurrence_pattern.name,
+            'status': "UPCOMING" if self.date_time > datetime.now() else "COMPLETED"
+        }
+        if include_patient:
+            data['patient_name'] = self.patient.full_name() if self.patient else "Unknown"
+        return data
+
+    @classmethod
+    def find_conflict(cls, db_session, doctor_id, start, end, exclude_id=None):
+        """
+        Find an appointment of the doctor overlapping [start, end) with one indexed range query
+        
+        Args:
+            db_session: Database session
+            doctor_id: ID of the doctor
+            start: Start of the requested slot
+            end: End of the requested slot
+            exclude_id: Appointment to ignore (e.g. the one being rescheduled)
+            
+        Returns:
+            Appointment or None
+        """
+        query = db_session.query(cls).filter(
+            cls.doctor_id == doctor_id,
+            # Nothing that starts earlier than this can still be running at start
+            cls.date_time > start - timedelta(minutes=cls.MAX_DURATION_MINUTES),
+            cls.date_time < end,
+            cls.end_time > start
+        )
+        if exclude_id is not None:
+            query = query.filter(cls.appointment_id != exclude_id)
+            
+        return query.order_by(cls.date_time).first()
+
+
+@event.listens_for(Appointment, 'before_insert')
+@event.listens_for(Appointment, 'before_update')
+def set_appointment_end_time(mapper, connection, target):
+    """Derive end_time from the start and duration whenever an appointment is written"""
+    if target.duration_minutes is None:
+        target.duration_minutes = Appointment.DEFAULT_DURATION_MINUTES
+    target.end_time = target.date_time + timedelta(minutes=target.duration_minutes)
 
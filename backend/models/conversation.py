@@ -0,0 +1,184 @@
+from datetime import datetime
+import base64
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Index, update, case, or_, and_, desc
+from .base import *
+
+
+class ConversationSummary(Base):
+    """
+    Denormalized inbox row for one pair of users, maintained on every write to messages.
+    The pair is stored ordered (user_low_id < user_high_id) so each conversation has
+    exactly one row; unread counters are kept per side:
+      - unread_low: messages from the high user not yet read by the low user
+      - unread_high: messages from the low user not yet read by the high user
+    """
+    __tablename__ = 'conversation_summaries'
+
+    user_low_id = Column(Integer, ForeignKey('users.user_id'), primary_key=True)
+    user_high_id = Column(Integer, ForeignKey('users.user_id'), primary_key=True)
+    last_message_id = Column(Integer, ForeignKey('messages.message_id'))
+    last_sender_id = Column(Integer, ForeignKey('users.user_id'))
+    last_message_preview = Column(String(60))
+    last_message_at = Column(DateTime)
+    unread_low = Column(Integer, nullable=False, default=0)
+    unread_high = Column(Integer, nullable=False, default=0)
+
+    # Inbox reads go through one of these depending on which side of the pair the user is;
+    # the partner column breaks ties so a page is an ordered range of the index
+    __table_args__ = (
+        Index('ix_conversation_summaries_low_time', 'user_low_id', 'last_message_at', 'user_high_id'),
+        Index('ix_conversation_summaries_high_time', 'user_high_id', 'last_message_at', 'user_low_id'),
+    )
+
+    PREVIEW_LENGTH = 50
+
+    @classmethod
+    def preview(cls, content):
+        """Shorten message content for the inbox"""
+        return content[:cls.PREVIEW_LENGTH] + ('...' if len(content) > cls.PREVIEW_LENGTH else '')
+
+    @staticmethod
+    def pair(user_a_id, user_b_id):
+        """Order two user IDs the way they are stored"""
+        user_a_id, user_b_id = int(user_a_id), int(user_b_id)
+        return (user_a_id, user_b_id) if user_a_id < user_b_id else (user_b_id, user_a_id)
+
+    @staticmethod
+    def encode_cursor(last_message_at, partner_id):
+        """Opaque pagination cursor for an inbox (last_message_at, partner_id) position"""
+        raw = f"{last_message_at.isoformat()}|{partner_id}"
+        return base64.urlsafe_b64encode(raw.encode()).decode()
+
+    @staticmethod
+    def decode_cursor(cursor):
+        """
+        Turn a cursor back into (last_message_at, partner_id)
+
+        Raises:
+            ValueError: If the cursor is malformed
+        """
+        try:
+            last_message_at, partner_id = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+            return datetime.fromisoformat(last_message_at), int(partner_id)
+        except (ValueError, UnicodeDecodeError) as e:
+            raise ValueError(f"Invalid cursor: {cursor}") from e
+
+    @classmethod
+    def inbox_side(cls, user_id, low_side, before=None):
+        """
+        Conversations where the user is on one side of the pair, newest first.
+        Each side is an ordered range of its own index; inbox_page merges the two.
+
+        Args:
+            user_id: User whose inbox is read
+            low_side: True for the rows where the user is user_low_id
+            before: Optional (last_message_at, partner_id) position to continue after
+        """
+        own, partner = (cls.user_low_id, cls.user_high_id) if low_side else (cls.user_high_id, cls.user_low_id)
+        query = cls.query.filter(own == user_id, cls.last_message_at.isnot(None))
+        if before:
+            last_message_at, partner_id = before
+            query = query.filter(or_(
+                cls.last_message_at < last_message_at,
+                and_(cls.last_message_at == last_message_at, partner < partner_id)
+            ))
+        return query.order_by(desc(cls.last_message_at), desc(partner))
+
+    @classmethod
+    def inbox_page(cls, user_id, limit, before=None):
+        """
+        Up to limit conversations of the user older than the before position, newest first
+
+        Returns:
+            List of (summary, partner_id) tuples
+        """
+        user_id = int(user_id)
+        rows = cls.inbox_side(user_id, True, before).limit(limit).all()
+        rows += cls.inbox_side(user_id, False, before).limit(limit).all()
+        entries = [(row, row.user_high_id if row.user_low_id == user_id else row.user_low_id) for row in rows]
+        entries.sort(key=lambda entry: (entry[0].last_message_at, entry[1]), reverse=True)
+        return entries[:limit]
+
+    def unread_for(self, user_id):
+        """Unread messages waiting for the given side of the pair"""
+        return self.unread_low if int(user_id) == self.user_low_id else self.unread_high
+
+    @classmethod
+    def _ensure_row(cls, db_session, user_low_id, user_high_id):
+        """Create the pair's row if it does not exist yet, without failing on a concurrent insert"""
+        dialect = db_session.get_bind(mapper=cls.__mapper__).dialect.name
+        values = {"user_low_id": user_low_id, "user_high_id": user_high_id, "unread_low": 0, "unread_high": 0}
+
+        if dialect == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert
+        elif dialect == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            if db_session.get(cls, (user_low_id, user_high_id)) is None:
+                db_session.add(cls(**values))
+                db_session.flush()
+            return
+
+        db_session.execute(insert(cls).values(**values).on_conflict_do_nothing())
+
+    @classmethod
+    def record_message(cls, db_session, message):
+        """
+        Fold a newly flushed message into its conversation row. Runs in the caller's
+        transaction; the counter is incremented in SQL so concurrent sends do not
+        lose updates, and the last-message fields only move forward.
+
+        Args:
+            db_session: Database session
+            message: Message with its message_id assigned
+        """
+        user_low_id, user_high_id = cls.pair(message.sender_id, message.receiver_id)
+        cls._ensure_row(db_session, user_low_id, user_high_id)
+
+        is_newer = or_(cls.last_message_id.is_(None), cls.last_message_id < message.message_id)
+
+        def latest(column, value):
+            return case((is_newer, value), else_=column)
+
+        values = {
+            "last_message_id": latest(cls.last_message_id, message.message_id),
+            "last_sender_id": latest(cls.last_sender_id, message.sender_id),
+            "last_message_preview": latest(cls.last_message_preview, cls.preview(message.content)),
+            "last_message_at": latest(cls.last_message_at, message.timestamp),
+        }
+        # The receiver's side gets one more unread message
+        if int(message.receiver_id) == user_low_id:
+            values["unread_low"] = cls.unread_low + 1
+        else:
+            values["unread_high"] = cls.unread_high + 1
+
+        db_session.execute(
+            update(cls)
+            .where(cls.user_low_id == user_low_id, cls.user_high_id == user_high_id)
+            .values(**values)
+        )
+
+    @classmethod
+    def mark_read(cls, db_session, reader_id, partner_id, count):
+        """
+        Lower the reader's unread counter after messages from partner were marked read.
+        Always relative: a message stored between the UPDATE of the messages and
+        this one keeps its +1.
+
+        Args:
+            db_session: Database session
+            reader_id: User who read the messages
+            partner_id: User who sent them
+            count: Number of messages marked read (rowcount of their UPDATE)
+        """
+        if not count:
+            return
+        user_low_id, user_high_id = cls.pair(reader_id, partner_id)
+        column = cls.unread_low if int(reader_id) == user_low_id else cls.unread_high
+        new_value = case((column > count, column - count), else_=0)
+
+        db_session.execute(
+            update(cls)
+            .where(cls.user_low_id == user_low_id, cls.user_high_id == user_high_id)
+            .values({column.key: new_value})
+        )
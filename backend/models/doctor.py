@@ -28,6 +28,82 @@ class Doctor(Base):
     sent_referrals = relationship("Referral", foreign_keys="Referral.referring_doctor_id", back_populates="referring_doctor")
     received_referrals = relationship("Referral", foreign_keys="Referral.specialist_id", back_populates="specialist")
 
+    # Slot grid used for real-time availability (8am-5pm in 30 min increments)
+    SLOT_MINUTES = 30
+    DAY_START_HOUR = 8
+    DAY_END_HOUR = 17
+    SLOTS_PER_DAY = (DAY_END_HOUR - DAY_START_HOUR) * 60 // SLOT_MINUTES
+
+    @classmethod
+    def get_bookings(cls, db_session, doctor_ids, start_date, end_date):
+        """
+        Fetch the appointment start times of several doctors over a date range in one query
+        
+        Args:
+            db_session: Database session
+            doctor_ids: IDs of the doctors to look up
+            start_date: First date of the range (inclusive)
+            end_date: Last date of the range (inclusive)
+            
+        Returns:
+            dict: {doctor_id: {date: [appointment datetimes]}}
+        """
+        from datetime import datetime, timedelta, time
+        from collections import defaultdict
+        from models.appointment import Appointment
+        
+        bookings = defaultdict(lambda: defaultdict(list))
+        if not doctor_ids:
+            return bookings
+        
+        rows = db_session.query(Appointment.doctor_id, Appointment.date_time).filter(
+            Appointment.doctor_id.in_(doctor_ids),
+            Appointment.date_time >= datetime.combine(start_date, time(0, 0)),
+            Appointment.date_time < datetime.combine(end_date + timedelta(days=1), time(0, 0))
+        ).all()
+        
+        for doctor_id, date_time in rows:
+            bookings[doctor_id][date_time.date()].append(date_time)
+            
+        return bookings
+
+    @classmethod
+    def free_slot_mask(cls, date, booked_mask):
+        """
+        Build a bitmap of free slots for one day (bit i set = slot starting at
+        DAY_START_HOUR + i * SLOT_MINUTES is free). Weekends have no slots.
+        
+        Args:
+            date: The day to build the bitmap for
+            booked_mask: Half-hour booked mask of that day from DoctorSlotIndex
+            
+        Returns:
+            int: Bitmap of free slots
+        """
+        if date.weekday() >= 5:
+            return 0
+        
+        # Both grids are half-hourly, so the day window is a shift of the index mask
+        day_mask = (1 << cls.SLOTS_PER_DAY) - 1
+        return (~booked_mask >> (cls.DAY_START_HOUR * 60 // cls.SLOT_MINUTES)) & day_mask
+
+    @classmethod
+    def mask_to_slots(cls, date, mask):
+        """Expand a free slot bitmap into a list of {"start", "end"} slots"""
+        from datetime import datetime, timedelta, time
+        
+        slots = []
+        day_start = datetime.combine(date, time(cls.DAY_START_HOUR, 0))
+        for slot in range(cls.SLOTS_PER_DAY):
+            if mask & (1 << slot):
+                slot_start = day_start + timedelta(minutes=slot * cls.SLOT_MINUTES)
+                slot_end = slot_start + timedelta(minutes=cls.SLOT_MINUTES)
+                slots.append({
+                    "start": slot_start.strftime("%H:%M"),
+                    "end": slot_end.strftime("%H:%M")
+                })
+        return slots
+
     @classmethod
     def get_availability(cls, db_session, name, date):
         """
@@ -41,20 +117,18 @@ class Doctor(Base):
         Returns:
             List of doctors with their available time slots after accounting for bookings
         """
-        from datetime import datetime, timedelta, time
-        from sqlalchemy import and_, func
-        from models.appointment import Appointment
+        from datetime import datetime
+        from sqlalchemy.orm import contains_eager
+        from models.slot_index import DoctorSlotIndex
         
         # Use today's date if not specified
         if not date:
             date = datetime.now().date()
         
-        # Get weekday as integer (0=Monday, 6=Sunday)
-        weekday_num = date.weekday()
         weekday_name = date.strftime("%A")
          
-        # Build query to get doctors
-        query = db_session.query(cls).join(cls.user)
+        # Build query to get doctors together with their user record
+        query = db_session.query(cls).join(cls.user).options(contains_eager(cls.user))
         if name:
             try:
                 first_name = name.split()[0]
@@ -65,54 +139,14 @@ class Doctor(Base):
                 # Continue without the name filter
         
         doctors = query.all()
-        result = []
         
+        # Read the booked slots of all of these doctors on the specified date at once
+        masks = DoctorSlotIndex.get_masks(db_session, doctors, date, date)
+        
+        result = []
         for doctor in doctors:
-            # Default time slots for the day (8am-5pm in 30 min increments)
-            available_slots = []
-            
-            # Only process weekdays (Monday=0 through Friday=4)
-            if weekday_num < 5:  # 0-4 are weekdays
-                # Generate slots in 30-minute increments
-                current_time = datetime.combine(date, time(8, 0))  # Start at 8 AM
-                end_time = datetime.combine(date, time(17, 0))     # End at 5 PM
-                
-                # Get appointments for this doctor on the specified date
-                appointments = db_session.query(Appointment).filter(
-                    and_(
-                        Appointment.doctor_id == doctor.doctor_id,
-                        func.date(Appointment.date_time) == date
-                    )
-                ).all()
-                
-                # Create a list of booked time slots
-                booked_slots = []
-                for appt in appointments:
-                    appt_start = appt.date_time
-                    appt_end = appt_start + timedelta(minutes=30)
-                    booked_slots.append((appt_start, appt_end))
-                
-                # Generate available slots in 30-minute increments
-                while current_time < end_time:
-                    slot_start = current_time
-                    slot_end = current_time + timedelta(minutes=30)
-                    
-                    # Check if this slot overlaps with any booked appointment
-                    is_available = True
-                    for booked_start, booked_end in booked_slots:
-                        if slot_start < booked_end and slot_end > booked_start:
-                            is_available = False
-                            break
-                    
-                    # If slot is available, add it to the list
-                    if is_available:
-                        available_slots.append({
-                            "start": slot_start.strftime("%H:%M"),
-                            "end": slot_end.strftime("%H:%M")
-                        })
-                    
-                    # Move to the next slot
-                    current_time = slot_end
+            _, booked_mask = masks[doctor.doctor_id][date]
+            mask = cls.free_slot_mask(date, booked_mask)
             
             result.append({
                 "doctor_id": doctor.doctor_id,
@@ -120,7 +154,52 @@ class Doctor(Base):
                 "specialty": doctor.specialty.name if hasattr(doctor.specialty, 'name') else str(doctor.specialty),
                 "date": date.strftime("%Y-%m-%d"),
                 "day": weekday_name,
-                "available_slots": available_slots
+                "available_slots": cls.mask_to_slots(date, mask)
+            })
+            
+        return result
+
+    @classmethod
+    def get_batch_availability(cls, db_session, start_date, end_date, doctor_ids=None, specialty=None):
+        """
+        Get availability bitmaps for many doctors over a date range using one
+        doctor/user query and one bookings query
+        
+        Args:
+            db_session: Database session
+            start_date: First date of the range (inclusive)
+            end_date: Last date of the range (inclusive)
+            doctor_ids: Restrict to these doctors (optional)
+            specialty: Restrict to this UserRole specialty (optional)
+            
+        Returns:
+            List of doctors with a {"YYYY-MM-DD": free slot bitmap} mapping
+        """
+        from datetime import timedelta
+        from sqlalchemy.orm import contains_eager
+        from models.slot_index import DoctorSlotIndex
+        
+        query = db_session.query(cls).join(cls.user).options(contains_eager(cls.user))
+        if doctor_ids:
+            query = query.filter(cls.doctor_id.in_(doctor_ids))
+        if specialty:
+            query = query.filter(cls.specialty == specialty)
+            
+        doctors = query.order_by(cls.doctor_id).all()
+        masks = DoctorSlotIndex.get_masks(db_session, doctors, start_date, end_date)
+        
+        dates = [start_date + timedelta(days=offset) for offset in range((end_date - start_date).days + 1)]
+        
+        result = []
+        for doctor in doctors:
+            doctor_masks = masks[doctor.doctor_id]
+            result.append({
+                "doctor_id": doctor.doctor_id,
+                "name": f"{doctor.user.first_name} {doctor.user.last_name}",
+                "specialty": doctor.specialty.name if hasattr(doctor.specialty, 'name') else str(doctor.specialty),
+                "availability": {
+                    day.isoformat(): cls.free_slot_mask(day, doctor_masks[day][1]) for day in dates
+                }
             })
             
-        return result
\ No newline at end of file
+        return result
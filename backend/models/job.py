@@ -0,0 +1,54 @@
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, DateTime, Text, JSON, Index, text
+from .base import *
+
+
+class ScheduledJob(Base):
+    """
+    Persisted state of a background job run by services.schedulerService.
+    A recurring job keeps one row that moves to its next run_at after each run.
+    Status: pending -> running -> done / failed (recurring jobs go back to pending).
+    """
+    __tablename__ = 'scheduled_jobs'
+
+    job_id = Column(Integer, primary_key=True)
+    name = Column(String(64), nullable=False)
+    payload = Column(JSON, nullable=True)
+    status = Column(String(16), nullable=False, default='pending')
+    run_at = Column(DateTime, nullable=False)
+    interval_seconds = Column(Integer, nullable=True)
+    attempts = Column(Integer, nullable=False, default=0)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime, nullable=False, default=datetime.now)
+    started_at = Column(DateTime, nullable=True)
+    # Renewed by the running process; a running job whose lease runs out is released
+    heartbeat_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+
+    # Rows of recurring jobs that are still scheduled; at most one per name
+    RECURRING_SCHEDULED = "interval_seconds IS NOT NULL AND status IN ('pending', 'running')"
+
+    # The scheduler loads and claims jobs by status and due time. Every process
+    # makes sure the recurring jobs exist at startup; the unique partial index
+    # makes that race leave a single row per recurring job.
+    __table_args__ = (
+        Index('ix_scheduled_jobs_status_run_at', 'status', 'run_at'),
+        Index('uq_scheduled_jobs_recurring_name', 'name', unique=True,
+              postgresql_where=text(RECURRING_SCHEDULED), sqlite_where=text(RECURRING_SCHEDULED)),
+    )
+
+    MAX_ATTEMPTS = 3
+
+    def to_dict(self):
+        return {
+            "job_id": self.job_id,
+            "name": self.name,
+            "payload": self.payload,
+            "status": self.status,
+            "run_at": self.run_at.strftime("%Y-%m-%d %H:%M:%S"),
+            "interval_seconds": self.interval_seconds,
+            "attempts": self.attempts,
+            "last_error": self.last_error,
+            "started_at": self.started_at.strftime("%Y-%m-%d %H:%M:%S") if self.started_at else None,
+            "finished_at": self.finished_at.strftime("%Y-%m-%d %H:%M:%S") if self.finished_at else None
+        }
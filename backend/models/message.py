@@ -1,5 +1,6 @@
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Boolean
+import base64
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Boolean, Index, or_, and_
 from sqlalchemy.orm import relationship
 from .base import * 
 
@@ -17,6 +18,47 @@ class Message(Base):
     sender = relationship("User", foreign_keys=[sender_id], back_populates="sent_messages")
     receiver = relationship("User", foreign_keys=[receiver_id], back_populates="received_messages")
     
+    __table_args__ = (
+        Index('ix_messages_sender_receiver_time', 'sender_id', 'receiver_id', 'timestamp'),
+        Index('ix_messages_receiver_unread', 'receiver_id', 'is_read'),
+    )
+    
+    @staticmethod
+    def encode_cursor(message):
+        """Opaque pagination cursor for a message's (timestamp, message_id) position"""
+        raw = f"{message.timestamp.isoformat()}|{message.message_id}"
+        return base64.urlsafe_b64encode(raw.encode()).decode()
+    
+    @staticmethod
+    def decode_cursor(cursor):
+        """
+        Turn a cursor back into (timestamp, message_id)
+        
+        Raises:
+            ValueError: If the cursor is malformed
+        """
+        try:
+            timestamp, message_id = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+            return datetime.fromisoformat(timestamp), int(message_id)
+        except (ValueError, UnicodeDecodeError) as e:
+            raise ValueError(f"Invalid cursor: {cursor}") from e
+    
+    @classmethod
+    def before_position(cls, timestamp, message_id):
+        """Filter for messages strictly older than a (timestamp, message_id) position"""
+        return or_(
+            cls.timestamp < timestamp,
+            and_(cls.timestamp == timestamp, cls.message_id < message_id)
+        )
+    
+    @classmethod
+    def after_position(cls, timestamp, message_id):
+        """Filter for messages strictly newer than a (timestamp, message_id) position"""
+        return or_(
+            cls.timestamp > timestamp,
+            and_(cls.timestamp == timestamp, cls.message_id > message_id)
+        )
+    
     def to_dict(self):
         """Convert message to a dictionary"""
         return {
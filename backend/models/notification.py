@@ -1,4 +1,6 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Boolean
+from datetime import datetime
+import base64
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Boolean, Index, or_, and_
 from sqlalchemy.orm import relationship
 from .base import * 
 
@@ -16,3 +18,38 @@ class Notification(Base):
     # Relationships
     user = relationship("User")
     appointment = relationship("Appointment", back_populates="notifications")
+    
+    __table_args__ = (
+        Index('ix_notifications_user_time', 'user_id', 'scheduled_time'),
+        # Filtered listings (and the unread count) stay index range reads
+        Index('ix_notifications_user_read_time', 'user_id', 'is_read', 'scheduled_time'),
+        Index('ix_notifications_user_status_time', 'user_id', 'status', 'scheduled_time'),
+    )
+    
+    @staticmethod
+    def encode_cursor(notification):
+        """Opaque pagination cursor for a notification's (scheduled_time, notification_id) position"""
+        raw = f"{notification.scheduled_time.isoformat()}|{notification.notification_id}"
+        return base64.urlsafe_b64encode(raw.encode()).decode()
+    
+    @staticmethod
+    def decode_cursor(cursor):
+        """
+        Turn a cursor back into (scheduled_time, notification_id)
+        
+        Raises:
+            ValueError: If the cursor is malformed
+        """
+        try:
+            scheduled_time, notification_id = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+            return datetime.fromisoformat(scheduled_time), int(notification_id)
+        except (ValueError, UnicodeDecodeError) as e:
+            raise ValueError(f"Invalid cursor: {cursor}") from e
+    
+    @classmethod
+    def before_position(cls, scheduled_time, notification_id):
+        """Filter for notifications strictly older than a (scheduled_time, notification_id) position"""
+        return or_(
+            cls.scheduled_time < scheduled_time,
+            and_(cls.scheduled_time == scheduled_time, cls.notification_id < notification_id)
+        )
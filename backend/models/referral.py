@@ -1,5 +1,5 @@
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Text, Boolean
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Text, Boolean, Index
 from sqlalchemy.orm import relationship
 from .base import *
 
@@ -22,4 +22,8 @@ class Referral(Base):
     patient = relationship("Patient", foreign_keys=[patient_id])
     referring_doctor = relationship("Doctor", foreign_keys=[referring_doctor_id], back_populates="sent_referrals")
     specialist = relationship("Doctor", foreign_keys=[specialist_id], back_populates="received_referrals")
-    appointment = relationship("Appointment")
\ No newline at end of file
+    appointment = relationship("Appointment")
+    
+    __table_args__ = (
+        Index('ix_referrals_specialist_status_priority', 'specialist_id', 'status', 'priority'),
+    )
@@ -0,0 +1,16 @@
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime
+from .base import *
+
+
+class AppointmentReminder(Base):
+    """
+    Ledger of reminders already sent: one row per appointment, reminder kind and
+    appointment start time. The primary key makes sending idempotent, and keying
+    on the start time means a rescheduled appointment is reminded again.
+    """
+    __tablename__ = 'appointment_reminders'
+
+    appointment_id = Column(Integer, ForeignKey('appointments.appointment_id', ondelete='CASCADE'), primary_key=True)
+    kind = Column(String(16), primary_key=True)
+    appointment_time = Column(DateTime, primary_key=True)
+    sent_at = Column(DateTime, nullable=False)
@@ -0,0 +1,243 @@
+from sqlalchemy import Column, Integer, Date, BigInteger, ForeignKey, insert, update, bindparam
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from .base import *
+
+
+class DoctorSlotIndex(Base):
+    """
+    Materialized free/busy picture of one doctor on one date.
+    Each mask has one bit per half-hour of the day (bit 0 = 00:00-00:30):
+      - template_mask: half-hours covered by the doctor's weekly availability template
+      - booked_mask: half-hours in which an appointment starts
+    """
+    __tablename__ = 'doctor_slot_index'
+
+    doctor_id = Column(Integer, ForeignKey('doctors.doctor_id'), primary_key=True)
+    date = Column(Date, primary_key=True)
+    template_mask = Column(BigInteger, nullable=False, default=0)
+    booked_mask = Column(BigInteger, nullable=False, default=0)
+
+    SLOT_MINUTES = 30
+    SLOTS_PER_DAY = 24 * 60 // SLOT_MINUTES
+
+    @classmethod
+    def slot_bit(cls, date_time):
+        """Bit of the half-hour slot a datetime falls in"""
+        return 1 << ((date_time.hour * 60 + date_time.minute) // cls.SLOT_MINUTES)
+
+    @classmethod
+    def hour_bits(cls, hour):
+        """Both half-hour bits of an hour"""
+        return 0b11 << (hour * 2)
+
+    @classmethod
+    def template_mask_for(cls, availability, date):
+        """
+        Build the template mask of a date from Doctor.availability JSON
+        (e.g. {"monday": ["09-10", "10-11"], ...})
+        """
+        mask = 0
+        day_slots = (availability or {}).get(date.strftime("%A").lower(), [])
+        for slot in day_slots:
+            try:
+                start_hour = int(slot[0:2])
+                end_hour = int(slot[3:5])
+            except (ValueError, IndexError, TypeError) as e:
+                print(f"Error processing slot '{slot}': {e}")
+                continue
+            for hour in range(start_hour, min(end_hour, 24)):
+                mask |= cls.hour_bits(hour)
+        return mask
+
+    @classmethod
+    def booked_mask_for(cls, date_times):
+        """Build the booked mask from appointment start times on one date"""
+        mask = 0
+        for date_time in date_times:
+            mask |= cls.slot_bit(date_time)
+        return mask
+
+    @classmethod
+    def get_masks(cls, db_session, doctors, start_date, end_date):
+        """
+        Read the index for several doctors over a date range, materializing any
+        missing (doctor, date) rows from the template and a single bookings query
+
+        Args:
+            db_session: Database session
+            doctors: Doctor records to read
+            start_date: First date of the range (inclusive)
+            end_date: Last date of the range (inclusive)
+
+        Returns:
+            dict: {doctor_id: {date: (template_mask, booked_mask)}}
+        """
+        from datetime import timedelta
+        from models.doctor import Doctor
+
+        masks = {doctor.doctor_id: {} for doctor in doctors}
+        if not doctors:
+            return masks
+
+        rows = db_session.query(cls).filter(
+            cls.doctor_id.in_(list(masks.keys())),
+            cls.date >= start_date,
+            cls.date <= end_date
+        ).all()
+        for row in rows:
+            masks[row.doctor_id][row.date] = (row.template_mask, row.booked_mask)
+
+        dates = [start_date + timedelta(days=offset) for offset in range((end_date - start_date).days + 1)]
+        missing = [(doctor, day) for doctor in doctors for day in dates if day not in masks[doctor.doctor_id]]
+        if not missing:
+            return masks
+
+        new_rows = []
+        for doctor, day in missing:
+            template_mask = cls.template_mask_for(doctor.availability, day)
+            masks[doctor.doctor_id][day] = (template_mask, 0)
+            new_rows.append({
+                "doctor_id": doctor.doctor_id,
+                "date": day,
+                "template_mask": template_mask,
+                "booked_mask": 0
+            })
+
+        # Persist on a separate connection so the caller's session (and the objects
+        # it has loaded) is not committed or expired by a read. The rows go in with
+        # an empty booked mask first, so bookings committed from here on set their
+        # bits on an existing row; the mask is then computed from a bookings read
+        # that starts after the insert and ORed in, which never clears a bit a
+        # concurrent booking has just set.
+        missing_doctor_ids = list({doctor.doctor_id for doctor, _ in missing})
+        bind = db_session.get_bind(mapper=cls.__mapper__)
+        cls._insert_missing(bind, new_rows)
+        with bind.begin() as connection:
+            # Fill the gaps with one bookings query over the span that is missing
+            with Session(bind=connection) as session:
+                fresh = Doctor.get_bookings(session, missing_doctor_ids,
+                                            min(day for _, day in missing), max(day for _, day in missing))
+            updates = []
+            for doctor, day in missing:
+                booked_mask = cls.booked_mask_for(fresh[doctor.doctor_id][day])
+                masks[doctor.doctor_id][day] = (masks[doctor.doctor_id][day][0], booked_mask)
+                if booked_mask:
+                    updates.append({"d_id": doctor.doctor_id, "d_date": day, "bits": booked_mask})
+            if updates:
+                connection.execute(
+                    update(cls)
+                    .where(cls.doctor_id == bindparam("d_id"), cls.date == bindparam("d_date"))
+                    .values(booked_mask=cls.booked_mask.op('|')(bindparam("bits"))),
+                    updates
+                )
+
+        return masks
+
+    @classmethod
+    def _insert_missing(cls, bind, rows):
+        """Insert index rows, skipping any that another request materialized first"""
+        try:
+            with bind.begin() as connection:
+                connection.execute(insert(cls), rows)
+            return
+        except IntegrityError:
+            pass
+        # Some rows already exist; insert the rest one at a time
+        for row in rows:
+            try:
+                with bind.begin() as connection:
+                    connection.execute(insert(cls), [row])
+            except IntegrityError:
+                pass
+
+    @classmethod
+    def rebuild_booked(cls, db_session, start_date, end_date):
+        """
+        Recompute the booked mask of every materialized row in a date range from
+        the appointments, correcting any drift (e.g. a booking that committed
+        while its day was being materialized). Commits the session.
+
+        The rows are locked (SELECT ... FOR UPDATE where the database supports it)
+        before the appointments are read, so a booking or cancel that is still in
+        flight applies its OR or refresh after the correction instead of being
+        overwritten by it. Each correction is also a compare-and-set on the mask
+        that was read; a row that changed in the meantime is left for the next run.
+
+        Returns:
+            int: Number of rows corrected
+        """
+        rows = db_session.query(cls.doctor_id, cls.date, cls.booked_mask).filter(
+            cls.date >= start_date,
+            cls.date <= end_date
+        ).with_for_update().all()
+        if not rows:
+            db_session.commit()
+            return 0
+
+        from models.doctor import Doctor
+        bookings = Doctor.get_bookings(db_session, list({row.doctor_id for row in rows}), start_date, end_date)
+        corrections = []
+        for doctor_id, day, booked_mask in rows:
+            expected = cls.booked_mask_for(bookings[doctor_id][day])
+            if expected != booked_mask:
+                corrections.append({"d_id": doctor_id, "d_date": day, "read_mask": booked_mask, "expected": expected})
+        corrected = 0
+        for correction in corrections:
+            corrected += db_session.execute(
+                update(cls)
+                .where(
+                    cls.doctor_id == bindparam("d_id"),
+                    cls.date == bindparam("d_date"),
+                    cls.booked_mask == bindparam("read_mask")
+                )
+                .values(booked_mask=bindparam("expected")),
+                correction
+            ).rowcount
+        db_session.commit()
+        return corrected
+
+    @classmethod
+    def mark_booked(cls, db_session, doctor_id, date_time):
+        """
+        Set the booked bit of a new appointment. Runs in the caller's transaction;
+        rows that are not materialized yet are left alone and filled on read
+        (the rebuild_slot_index job corrects the rare booking that races a read).
+        """
+        db_session.execute(
+            update(cls)
+            .where(cls.doctor_id == doctor_id, cls.date == date_time.date())
+            .values(booked_mask=cls.booked_mask.op('|')(cls.slot_bit(date_time)))
+        )
+
+    @classmethod
+    def refresh_booked(cls, db_session, doctor_id, date):
+        """
+        Recompute the booked mask of one day after an appointment was removed or moved.
+        Several appointments can share a slot, so bits cannot simply be cleared.
+        """
+        from models.doctor import Doctor
+
+        db_session.flush()
+        bookings = Doctor.get_bookings(db_session, [doctor_id], date, date)
+        db_session.execute(
+            update(cls)
+            .where(cls.doctor_id == doctor_id, cls.date == date)
+            .values(booked_mask=cls.booked_mask_for(bookings[doctor_id][date]))
+        )
+
+    @classmethod
+    def refresh_template(cls, db_session, doctor):
+        """Rewrite the template mask of every materialized day after the weekly template changed"""
+        dates = [row.date for row in db_session.query(cls.date).filter(cls.doctor_id == doctor.doctor_id)]
+        if not dates:
+            return
+
+        db_session.execute(update(cls), [
+            {
+                "doctor_id": doctor.doctor_id,
+                "date": day,
+                "template_mask": cls.template_mask_for(doctor.availability, day)
+            }
+            for day in dates
+        ])
@@ -0,0 +1,114 @@
+from datetime import datetime, timedelta
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Date, Index, and_, or_
+from .base import *
+
+
+class WaitlistEntry(Base):
+    """
+    A patient waiting for an opening with a doctor on a date.
+    The queue of a doctor and date is ordered by priority (highest first), then
+    by request time. Status: waiting -> offered -> accepting -> booked; an offer
+    that is declined or runs out puts the entry back to waiting; cancelled entries
+    have left the queue. 'accepting' is held only while the acceptance books the
+    slot, so that one acceptance at a time can act on an offer.
+    """
+    __tablename__ = 'waitlist_entries'
+
+    entry_id = Column(Integer, primary_key=True)
+    patient_id = Column(Integer, ForeignKey('patients.patient_id'), nullable=False)
+    doctor_id = Column(Integer, ForeignKey('doctors.doctor_id'), nullable=False)
+    date = Column(Date, nullable=False)
+    priority = Column(Integer, nullable=False, default=0)
+    requested_at = Column(DateTime, nullable=False, default=datetime.now)
+    status = Column(String(16), nullable=False, default='waiting')
+
+    # The slot on hold for this patient while status is 'offered'
+    offered_slot = Column(DateTime, nullable=True)
+    offered_duration_minutes = Column(Integer, nullable=True)
+    offer_expires_at = Column(DateTime, nullable=True)
+    appointment_id = Column(Integer, ForeignKey('appointments.appointment_id', ondelete='SET NULL'), nullable=True)
+
+    __table_args__ = (
+        # The head of a queue is looked up by doctor, date and status
+        Index('ix_waitlist_entries_queue', 'doctor_id', 'date', 'status'),
+        Index('ix_waitlist_entries_patient', 'patient_id', 'status'),
+        # Bookings check for holds on a doctor's slots
+        Index('ix_waitlist_entries_offered_slot', 'doctor_id', 'offered_slot'),
+    )
+
+    ACTIVE_STATUSES = ('waiting', 'offered', 'accepting')
+    # Statuses in which the offered slot is held for the entry's patient
+    HOLD_STATUSES = ('offered', 'accepting')
+
+    @classmethod
+    def queue_order(cls):
+        """ORDER BY of a queue: priority first, then first come, first served"""
+        return [cls.priority.desc(), cls.requested_at, cls.entry_id]
+
+    @classmethod
+    def behind_condition(cls, priority, requested_at, entry_id, ahead=False):
+        """
+        Filter for the entries behind a queue position (or ahead of it), in queue_order()
+
+        Args:
+            priority, requested_at, entry_id: The position to compare with
+            ahead: Select the entries ahead of the position instead
+        """
+        if ahead:
+            return or_(
+                cls.priority > priority,
+                and_(cls.priority == priority, cls.requested_at < requested_at),
+                and_(cls.priority == priority, cls.requested_at == requested_at, cls.entry_id < entry_id)
+            )
+        return or_(
+            cls.priority < priority,
+            and_(cls.priority == priority, cls.requested_at > requested_at),
+            and_(cls.priority == priority, cls.requested_at == requested_at, cls.entry_id > entry_id)
+        )
+
+    @classmethod
+    def find_hold(cls, db_session, doctor_id, start, end, exclude_patient_id=None, now=None):
+        """
+        Find an unexpired offer of the doctor's time overlapping [start, end)
+
+        Args:
+            db_session: Database session
+            doctor_id: ID of the doctor
+            start: Start of the requested slot
+            end: End of the requested slot
+            exclude_patient_id: Patient whose own hold does not count (the one booking)
+            now: Reference time (defaults to the current time)
+
+        Returns:
+            WaitlistEntry or None
+        """
+        from models.appointment import Appointment
+
+        query = db_session.query(cls).filter(
+            cls.doctor_id == doctor_id,
+            cls.offered_slot > start - timedelta(minutes=Appointment.MAX_DURATION_MINUTES),
+            cls.offered_slot < end,
+            cls.status.in_(cls.HOLD_STATUSES),
+            cls.offer_expires_at > (now or datetime.now())
+        )
+        if exclude_patient_id is not None:
+            query = query.filter(cls.patient_id != exclude_patient_id)
+
+        for entry in query.all():
+            if entry.offered_slot + timedelta(minutes=entry.offered_duration_minutes) > start:
+                return entry
+        return None
+
+    def to_dict(self):
+        return {
+            "entry_id": self.entry_id,
+            "patient_id": self.patient_id,
+            "doctor_id": self.doctor_id,
+            "date": self.date.strftime("%Y-%m-%d"),
+            "priority": self.priority,
+            "requested_at": self.requested_at.strftime("%Y-%m-%d %H:%M:%S"),
+            "status": self.status,
+            "offered_slot": self.offered_slot.strftime("%Y-%m-%d %H:%M") if self.offered_slot else None,
+            "offer_expires_at": self.offer_expires_at.strftime("%Y-%m-%d %H:%M:%S") if self.offer_expires_at else None,
+            "appointment_id": self.appointment_id
+        }
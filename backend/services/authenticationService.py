@@ -76,6 +76,12 @@ class AuthController:
         # Now commit everything
         db.session.commit()
         
+        # A new doctor record changes the /doctors directory
+        if role in [UserRole.DOCTOR, UserRole.NURSE, UserRole.SURGEON, UserRole.THERAPIST]:
+            # Import here to avoid circular imports
+            from services.doctorService import invalidate_doctor_caches
+            invalidate_doctor_caches()
+        
         # Auto-login by creating access token
         access_token = create_access_token(
             identity=new_user,
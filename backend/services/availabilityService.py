@@ -0,0 +1,82 @@
+from datetime import datetime, timedelta
+from services.db import db
+from models import DoctorSlotIndex
+from services.schedulerService import job_handler
+
+
+class AvailabilityService:
+    # Upper bound on a single range request (roughly a year of calendar)
+    MAX_RANGE_DAYS = 366
+
+    @staticmethod
+    def format_mask_slots(template_mask, booked_mask):
+        """
+        Turn one day of the slot index into the hourly slot list returned by the
+        availability range endpoint
+
+        Args:
+            template_mask: Half-hour template mask of the day
+            booked_mask: Half-hour booked mask of the day
+
+        Returns:
+            list: Formatted slot dictionaries
+        """
+        formatted_slots = []
+        for start_hour in range(24):
+            hour_bits = DoctorSlotIndex.hour_bits(start_hour)
+            if template_mask & hour_bits != hour_bits:
+                continue
+
+            # Format for display
+            display_hour = start_hour if start_hour <= 12 else start_hour - 12
+            if display_hour == 0:
+                display_hour = 12
+            am_pm = "PM" if start_hour >= 12 else "AM"
+
+            formatted_slots.append({
+                "time": f"{display_hour}:00 {am_pm}",
+                "is_booked": bool(booked_mask & hour_bits),
+                "start": f"{start_hour:02d}:00",
+                "end": f"{start_hour + 1:02d}:00"
+            })
+
+        return formatted_slots
+
+    @staticmethod
+    def get_availability_range(doctor, start_date, end_date):
+        """
+        Build a doctor's availability for every date in the range from the slot index
+
+        Args:
+            doctor: Doctor record
+            start_date: First date of the window (inclusive)
+            end_date: Last date of the window (inclusive)
+
+        Returns:
+            dict: {"YYYY-MM-DD": [slot, ...]} for every date the doctor works
+        """
+        masks = DoctorSlotIndex.get_masks(db.session, [doctor], start_date, end_date)[doctor.doctor_id]
+
+        availability_by_date = {}
+        current_date = start_date
+        while current_date <= end_date:
+            template_mask, booked_mask = masks[current_date]
+
+            # Only include days the doctor has slots for
+            if template_mask:
+                availability_by_date[current_date.isoformat()] = AvailabilityService.format_mask_slots(
+                    template_mask, booked_mask
+                )
+
+            current_date += timedelta(days=1)
+
+        return availability_by_date
+
+
+@job_handler("rebuild_slot_index")
+def rebuild_slot_index_job(payload):
+    """Correct drifted booked masks of the days patients can still book"""
+    today = datetime.now().date()
+    corrected = DoctorSlotIndex.rebuild_booked(db.session, today, today + timedelta(days=payload.get("days", 62)))
+    if corrected:
+        print(f"Corrected the booked mask of {corrected} slot index rows")
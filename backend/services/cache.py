@@ -0,0 +1,341 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from cachetools import LRUCache, TTLCache
+
+
+# Every cache created in this module, by name, for the metrics endpoint
+_registry = {}
+_registry_lock = threading.Lock()
+
+
+def register(cache):
+    """Make a cache's metrics visible through get_all_metrics"""
+    with _registry_lock:
+        _registry[cache.name] = cache
+    return cache
+
+
+def get_all_metrics():
+    """Metrics of every registered cache, keyed by cache name"""
+    with _registry_lock:
+        caches = list(_registry.values())
+    return {cache.name: cache.metrics() for cache in caches}
+
+
+def counter_cache_url():
+    """
+    Redis server for counters shared by all worker processes: COUNTER_CACHE_URL,
+    or the Redis used as message broker (MESSAGE_BROKER_URL); None keeps them in process
+    """
+    return os.environ.get('COUNTER_CACHE_URL') or os.environ.get('MESSAGE_BROKER_URL')
+
+
+class CounterCache:
+    """
+    Per-key integer counters in front of a database COUNT.
+
+    The owner of the data keeps the counter current with add() when it changes the
+    underlying rows. Each entry is reloaded from the database once it is older than
+    reconcile_seconds; the difference found at that point is recorded as drift
+    (missed updates, races between a load and an add).
+
+    Counters live in process memory, which is only right with a single worker: an
+    add() is not seen by the other processes. With redis_url they live in Redis
+    instead (INCRBY, expiring after reconcile_seconds), so every worker reads and
+    changes the same counter. Redis errors are logged and answered from the database.
+    """
+    KEY_PREFIX = "nabad:counter:"
+    # Only adjust counters that exist; a missing counter is loaded on its next read
+    ADD_SCRIPT = """
+        if redis.call('EXISTS', KEYS[1]) == 1 then
+            return redis.call('INCRBY', KEYS[1], ARGV[1])
+        end
+        return nil
+    """
+
+    def __init__(self, name, loader, reconcile_seconds=300, max_entries=10000, redis_url=None):
+        """
+        Args:
+            name: Name used in metrics and in Redis keys
+            loader: Function key -> current value from the database
+            reconcile_seconds: Maximum age of a counter before it is checked against the database
+            max_entries: Least recently used counters beyond this are dropped (in memory)
+            redis_url: Optional Redis server holding the counters for every worker process
+        """
+        self.name = name
+        self.loader = loader
+        self.reconcile_seconds = reconcile_seconds
+        self._entries = LRUCache(maxsize=max_entries)
+        self._lock = threading.Lock()
+        self._stats = {
+            "hits": 0,
+            "misses": 0,
+            "reconciliations": 0,
+            "drifted_reconciliations": 0,
+            "total_drift": 0,
+            "redis_errors": 0
+        }
+        self._redis = None
+        if redis_url:
+            import redis
+            self._redis = redis.Redis.from_url(redis_url)
+            self._add_script = self._redis.register_script(self.ADD_SCRIPT)
+        register(self)
+
+    def _redis_key(self, key):
+        return f"{self.KEY_PREFIX}{self.name}:{key}"
+
+    def _redis_error(self, action, e):
+        print(f"Counter cache {self.name}: Redis {action} failed: {e}")
+        with self._lock:
+            self._stats["redis_errors"] += 1
+
+    def get(self, key):
+        """Current value of a counter, loading or reconciling it when needed"""
+        if self._redis is not None:
+            return self._get_shared(key)
+
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and now - entry[1] < self.reconcile_seconds:
+                self._stats["hits"] += 1
+                return entry[0]
+
+        value = self.loader(key)
+
+        with self._lock:
+            if entry is None:
+                self._stats["misses"] += 1
+            else:
+                # Compare against what the cache holds now, including adds made during the load
+                cached = self._entries.get(key, entry)[0]
+                self._stats["reconciliations"] += 1
+                if cached != value:
+                    self._stats["drifted_reconciliations"] += 1
+                    self._stats["total_drift"] += abs(cached - value)
+            self._entries[key] = [value, now]
+        return value
+
+    def _get_shared(self, key):
+        try:
+            stored = self._redis.get(self._redis_key(key))
+        except Exception as e:
+            self._redis_error("read", e)
+            return self.loader(key)
+        if stored is not None:
+            with self._lock:
+                self._stats["hits"] += 1
+            return max(int(stored), 0)
+
+        # Expired (due for reconciliation) or never loaded
+        value = self.loader(key)
+        with self._lock:
+            self._stats["misses"] += 1
+        try:
+            # NX: a worker that loaded concurrently has already stored the counter
+            self._redis.set(self._redis_key(key), value, ex=self.reconcile_seconds, nx=True)
+        except Exception as e:
+            self._redis_error("write", e)
+        return value
+
+    def add(self, key, delta):
+        """Apply a change to a cached counter; uncached counters are loaded on next read"""
+        if self._redis is not None:
+            try:
+                self._add_script(keys=[self._redis_key(key)], args=[int(delta)])
+            except Exception as e:
+                self._redis_error("add", e)
+                # Better a reload than a counter that missed this change
+                self.invalidate(key)
+            return
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry[0] = max(entry[0] + delta, 0)
+
+    def invalidate(self, key):
+        """Forget a counter so the next read loads it"""
+        if self._redis is not None:
+            try:
+                self._redis.delete(self._redis_key(key))
+            except Exception as e:
+                self._redis_error("delete", e)
+            return
+
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def metrics(self):
+        """Hit rate and drift statistics"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._entries)
+        stats["shared"] = self._redis is not None
+        reads = stats["hits"] + stats["misses"] + stats["reconciliations"]
+        stats["hit_rate"] = round(stats["hits"] / reads, 4) if reads else None
+        stats["drift_rate"] = (
+            round(stats["drifted_reconciliations"] / stats["reconciliations"], 4)
+            if stats["reconciliations"] else None
+        )
+        return stats
+
+
+class ValueCache:
+    """
+    A single value (e.g. a serialized JSON document) cached for ttl_seconds or until
+    invalidate() is called. Bytes values also get an ETag derived from their content.
+    The version increases with every invalidation in this process; it is not shared
+    between workers, so keys of shared caches should hash the content instead.
+    """
+
+    def __init__(self, name, loader, ttl_seconds=300):
+        """
+        Args:
+            name: Name used in metrics
+            loader: Function returning the value
+            ttl_seconds: Maximum age of the cached value (None to keep it until invalidated)
+        """
+        self.name = name
+        self.loader = loader
+        self.ttl_seconds = ttl_seconds
+        self._entry = None
+        self._generation = 0
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "invalidations": 0}
+        register(self)
+
+    def get(self):
+        """
+        Returns:
+            tuple: (value, etag); etag is None unless the value is bytes
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entry
+            if entry is not None and (self.ttl_seconds is None or now - entry[2] < self.ttl_seconds):
+                self._stats["hits"] += 1
+                return entry[0], entry[1]
+            self._stats["misses"] += 1
+            generation = self._generation
+
+        value = self.loader()
+        etag = hashlib.sha1(value).hexdigest() if isinstance(value, bytes) else None
+
+        with self._lock:
+            # Do not store a value loaded before an invalidation that happened meanwhile
+            if generation == self._generation:
+                self._entry = (value, etag, now)
+        return value, etag
+
+    @property
+    def version(self):
+        """Number of invalidations so far"""
+        return self._generation
+
+    def invalidate(self):
+        """Drop the cached value so the next read reloads it"""
+        with self._lock:
+            self._entry = None
+            self._generation += 1
+            self._stats["invalidations"] += 1
+
+    def metrics(self):
+        """Hit rate and invalidation statistics"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["cached"] = self._entry is not None
+            stats["version"] = self._generation
+        reads = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / reads, 4) if reads else None
+        return stats
+
+
+class ResponseCache:
+    """
+    Size-bounded LRU cache of JSON-serializable values with a time to live.
+
+    Entries live in process memory and, when redis_url is given, also in Redis
+    under the same TTL, so they survive restarts and are shared by every worker
+    process. Redis errors are logged and treated as misses.
+    """
+    KEY_PREFIX = "nabad:cache:"
+
+    def __init__(self, name, max_entries=1000, ttl_seconds=3600, redis_url=None):
+        """
+        Args:
+            name: Name used in metrics and in Redis keys
+            max_entries: Least recently used entries beyond this are dropped from memory
+            ttl_seconds: Lifetime of an entry
+            redis_url: Optional Redis server for the shared, persistent tier
+        """
+        self.name = name
+        self.ttl_seconds = ttl_seconds
+        self._entries = TTLCache(maxsize=max_entries, ttl=ttl_seconds)
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "redis_hits": 0, "misses": 0, "stores": 0, "redis_errors": 0}
+        self._redis = None
+        if redis_url:
+            import redis
+            self._redis = redis.Redis.from_url(redis_url)
+        register(self)
+
+    def get(self, key):
+        """Cached value for a key, or None"""
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._stats["hits"] += 1
+                return value
+
+        if self._redis is not None:
+            try:
+                stored = self._redis.get(self.KEY_PREFIX + self.name + ":" + key)
+            except Exception as e:
+                print(f"Response cache {self.name}: Redis read failed: {e}")
+                stored = None
+                with self._lock:
+                    self._stats["redis_errors"] += 1
+            if stored is not None:
+                value = json.loads(stored)
+                with self._lock:
+                    self._entries[key] = value
+                    self._stats["redis_hits"] += 1
+                return value
+
+        with self._lock:
+            self._stats["misses"] += 1
+        return None
+
+    def set(self, key, value):
+        """Store a value under a key for ttl_seconds"""
+        with self._lock:
+            self._entries[key] = value
+            self._stats["stores"] += 1
+
+        if self._redis is not None:
+            try:
+                self._redis.setex(self.KEY_PREFIX + self.name + ":" + key, int(self.ttl_seconds), json.dumps(value))
+            except Exception as e:
+                print(f"Response cache {self.name}: Redis write failed: {e}")
+                with self._lock:
+                    self._stats["redis_errors"] += 1
+
+    def clear(self):
+        """Drop every entry held in memory"""
+        with self._lock:
+            self._entries.clear()
+
+    def metrics(self):
+        """Hit rate and size statistics"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._entries)
+        stats["persistent"] = self._redis is not None
+        reads = stats["hits"] + stats["redis_hits"] + stats["misses"]
+        stats["hit_rate"] = round((stats["hits"] + stats["redis_hits"]) / reads, 4) if reads else None
+        return stats
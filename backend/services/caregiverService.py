@@ -3,7 +3,9 @@ from flask_jwt_extended import jwt_required, get_jwt_identity
 from datetime import datetime
 from services.db import db
 from models import User, Patient, UserRole, MedicalRecord, Appointment, Notification
+from services.requestCache import get_current_user, get_user, get_patient
 from sqlalchemy import or_
+from sqlalchemy.orm import joinedload
 
 class CaregiverController:
     @staticmethod
@@ -20,7 +22,7 @@ class CaregiverController:
         """
         # Get the current user to verify permissions
         current_user_id = get_jwt_identity()
-        current_user = User.query.get(current_user_id)
+        current_user = get_current_user()
         
         if not current_user:
             return jsonify({"error": "User not found"}), 404
@@ -39,12 +41,12 @@ class CaregiverController:
             return jsonify({"error": "Missing required fields: patient_id and caregiver_id"}), 400
             
         # Check if patient exists
-        patient = Patient.query.get(patient_id)
+        patient = get_patient(patient_id)
         if not patient:
             return jsonify({"error": "Patient not found"}), 404
             
         # Check if caregiver exists and has correct role
-        caregiver = User.query.get(caregiver_id)
+        caregiver = get_user(caregiver_id)
         if not caregiver:
             return jsonify({"error": "Caregiver not found"}), 404
         if caregiver.role != UserRole.CAREGIVER:
@@ -93,7 +95,7 @@ class CaregiverController:
         """Get all patients associated with the current caregiver"""
         # Get the current user
         current_user_id = get_jwt_identity()
-        current_user = User.query.get(current_user_id)
+        current_user = get_current_user()
         
         if not current_user:
             return jsonify({"error": "User not found"}), 404
@@ -127,13 +129,13 @@ class CaregiverController:
         """Get caregiver information for a specific patient"""
         # Get the current user
         current_user_id = get_jwt_identity()
-        current_user = User.query.get(current_user_id)
+        current_user = get_current_user()
         
         if not current_user:
             return jsonify({"error": "User not found"}), 404
             
         # Check if the patient exists
-        patient = Patient.query.get(patient_id)
+        patient = get_patient(patient_id)
         if not patient:
             return jsonify({"error": "Patient not found"}), 404
             
@@ -152,7 +154,7 @@ class CaregiverController:
             }), 200
             
         # Get caregiver information
-        caregiver = User.query.get(patient.caregiver_id)
+        caregiver = get_user(patient.caregiver_id)
         if not caregiver:
             return jsonify({"error": "Caregiver record not found"}), 404
             
@@ -181,7 +183,7 @@ class CaregiverController:
         """
         # Get the current user
         current_user_id = get_jwt_identity()
-        current_user = User.query.get(current_user_id)
+        current_user = get_current_user()
         
         if not current_user:
             return jsonify({"error": "User not found"}), 404
@@ -198,7 +200,7 @@ class CaregiverController:
                 return jsonify({"error": "Missing required field: patient_id"}), 400
                 
         # Check if patient exists
-        patient = Patient.query.get(patient_id)
+        patient = get_patient(patient_id)
         if not patient:
             return jsonify({"error": "Patient not found"}), 404
             
@@ -244,13 +246,13 @@ class CaregiverController:
         """Get a patient's medical data for caregiver access"""
         # Get the current user
         current_user_id = get_jwt_identity()
-        current_user = User.query.get(current_user_id)
+        current_user = get_current_user()
         
         if not current_user:
             return jsonify({"error": "User not found"}), 404
             
         # Check if the patient exists
-        patient = Patient.query.get(patient_id)
+        patient = get_patient(patient_id)
         if not patient:
             return jsonify({"error": "Patient not found"}), 404
             
@@ -271,7 +273,7 @@ class CaregiverController:
             })
             
         # Get patient's appointments
-        appointments = Appointment.query.filter_by(patient_id=patient_id).all()
+        appointments = Appointment.query.options(*Appointment.with_parties()).filter_by(patient_id=patient_id).all()
         appointment_list = []
         for appt in appointments:
             appointment_list.append({
@@ -294,7 +296,7 @@ class CaregiverController:
         """Get all emergency alerts for a caregiver"""
         # Get the current user
         current_user_id = get_jwt_identity()
-        current_user = User.query.get(current_user_id)
+        current_user = get_current_user()
         
         if not current_user:
             return jsonify({"error": "User not found"}), 404
@@ -304,7 +306,11 @@ class CaregiverController:
             return jsonify({"error": "User is not a caregiver"}), 403
             
         # Get all emergency notifications for this caregiver
-        notifications = Notification.query.filter_by(
+        # Load the linked appointment and patient up front; the lookups below are then
+        # served from the session instead of a query per alert
+        notifications = Notification.query.options(
+            joinedload(Notification.appointment).joinedload(Appointment.patient).joinedload(Patient.user)
+        ).filter_by(
             user_id=current_user.user_id, 
             status="emergency"
         ).order_by(Notification.scheduled_time.desc()).all()
@@ -318,7 +324,7 @@ class CaregiverController:
                 # If this is linked to an appointment, get patient from there
                 appointment = Appointment.query.get(notification.appointment_id)
                 if appointment:
-                    patient = Patient.query.get(appointment.patient_id)
+                    patient = get_patient(appointment.patient_id)
                     if patient:
                         patient_info = {
                             "patient_id": patient.patient_id,
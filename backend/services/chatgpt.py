@@ -1,35 +1,124 @@
 from typing import Dict, List, Optional
+from collections import namedtuple
+import hashlib
 import json
-import requests
+import os
+import queue
+import threading
 from sqlalchemy.orm import Session
 import logging
 from datetime import datetime
 import re
 from models import AppointmentType
+from services.cache import ValueCache, ResponseCache
+from services.llmClient import LLMClient, LLMError
+from services.intentRouter import IntentRouter, INTENTS, BOOK, RECOMMEND, CANCEL, RESCHEDULE
+from services.appointmentService import AppointmentService
+from services.requestCache import get_user, get_doctor
+
+
+# Rendered doctor roster for prompts; token_count is an estimate (about 4 characters per token)
+RosterPrompt = namedtuple("RosterPrompt", ["text", "token_count", "doctor_count"])
+
+
+def _load_doctor_roster() -> RosterPrompt:
+    """Query every doctor with their user record and render the prompt block"""
+    from services.db import db
+    from models.doctor import Doctor
+    from sqlalchemy.orm import contains_eager
+
+    doctors = (
+        db.session.query(Doctor)
+        .join(Doctor.user)
+        .options(contains_eager(Doctor.user))
+        .order_by(Doctor.doctor_id)
+        .all()
+    )
+    text = ChatGPTAPIService.format_doctor_data([
+        {
+            "doctor_id": doctor.doctor_id,
+            "full_name": f"{doctor.user.first_name} {doctor.user.last_name}",
+            "specialty": str(doctor.specialty),
+            "description": doctor.description
+        }
+        for doctor in doctors
+    ])
+    roster = RosterPrompt(text, (len(text) + 3) // 4, len(doctors))
+    logging.getLogger(__name__).info(
+        f"Rendered doctor roster: {roster.doctor_count} doctors, ~{roster.token_count} tokens"
+    )
+    return roster
+
+
+# Kept until a doctor signs up or changes availability; the TTL bounds staleness across worker processes
+doctor_roster = ValueCache("doctor_roster_prompt", _load_doctor_roster, ttl_seconds=600)
 
 class ChatGPTAPIService:
+    # Returned by a streaming run whose client disconnected or timed out; nothing was changed
+    CANCELLED = {"status": "error", "message": "Request cancelled"}
+    # Time allowed on top of one model call's deadline between two events of a streaming run
+    STREAM_GRACE_SECONDS = 10
+
     def __init__(self, api_key: str , db):
         self.api_key = api_key
         self.db = db
-        self.base_url = "https://api.openai.com/v1/chat/completions"
+        # Pooled client with deadlines, retries and a concurrency cap; OPENAI_BASE_URL points it at another server
+        self.llm = LLMClient.from_env(api_key)
+        self.base_url = self.llm.url
+        # Routes clear-cut chat queries without asking the model to classify them
+        self.intent_router = IntentRouter()
+        # Model answers to repeated prompts; LLM_CACHE_URL (Redis) makes them persistent and shared
+        self.response_cache = ResponseCache(
+            "llm_responses",
+            max_entries=int(os.environ.get("LLM_CACHE_SIZE", 1000)),
+            ttl_seconds=int(os.environ.get("LLM_CACHE_TTL_SECONDS", 3600)),
+            redis_url=os.environ.get("LLM_CACHE_URL")
+        )
+        # Per-thread event queue and cancel flag of a streaming coordinator run (see coordinator_stream)
+        self._stream = threading.local()
 
         self.logger = logging.getLogger(__name__)
-        self.BASE_URL = "http://localhost:5000"
 
-    def _send_to_api(self, wanted_prompt: str) -> Dict:
+    def _user_from_token(self, token: str):
+        """User the access token was issued to, or None if it is invalid"""
+        from flask_jwt_extended import decode_token
+        try:
+            return get_user(decode_token(token)["sub"])
+        except Exception as e:
+            self.logger.error(f"Invalid token: {str(e)}")
+            return None
+
+    def _upcoming_appointments(self, user) -> List[Dict]:
+        """Upcoming appointments of the user, as listed by GET /appointments/patient"""
+        appointments, status = AppointmentService.patient_appointments(user.user_id)
+        if status != 200:
+            return []
+        return [appt for appt in appointments if appt["status"] == "UPCOMING"]
+
+    def _emit(self, event_type: str, data) -> None:
+        """Pass an event to the client of a streaming run; does nothing otherwise"""
+        events = getattr(self._stream, "events", None)
+        if events is not None:
+            events.put((event_type, data))
+
+    def _stream_cancelled(self) -> bool:
+        """True if the client of a streaming run has gone away; checked before every model call and write"""
+        cancelled = getattr(self._stream, "cancelled", None)
+        return cancelled is not None and cancelled.is_set()
+
+    def _send_to_api(self, wanted_prompt: str, stream_tokens: bool = True) -> Dict:
         """Send text with specific command to OpenAI API
         Args:
             text (str): Text to send to the API where it is processed by FileProcessorService at app level
             wanted_prompt (str): custom prompt to send to the API
+            stream_tokens (bool): during a streaming run, forward the completion text as token events;
+                prompts whose answer is JSON to be parsed (ids, dates) pass False
         Returns:
             Dict: Response from the API
         """
+        if self._stream_cancelled():
+            return self.CANCELLED
         try:
-            headers = {
-                "Authorization": f"Bearer {self.api_key}",
-                "Content-Type": "application/json"
-            }
-            
             prompt = f"{wanted_prompt}\n\n"
             
             system_prompt = (
@@ -37,27 +126,66 @@ class ChatGPTAPIService:
                 "help them "
             )
 
-            payload = {
-                        "model": "gpt-4o",
-                        "messages": [
-                            {"role": "system", "content": system_prompt},
-                            {"role": "user", "content": prompt}
-                        ]
-                    }
-            
-            response = requests.post(self.base_url, headers=headers, json=payload)
-            response.raise_for_status()
+            messages = [
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": prompt}
+            ]
             
+            if stream_tokens and getattr(self._stream, "events", None) is not None:
+                parts = []
+                tokens = self.llm.stream_chat(messages)
+                try:
+                    for token in tokens:
+                        # Nobody is reading any more; closing the stream frees the connection
+                        if self._stream_cancelled():
+                            return self.CANCELLED
+                        parts.append(token)
+                        self._emit("token", token)
+                finally:
+                    tokens.close()
+                # Same shape as a non-streamed completion
+                completion = {"choices": [{"index": 0, "message": {"role": "assistant", "content": "".join(parts)}}]}
+            else:
+                completion = self.llm.chat(messages)
+
             return {
                 "status": "success",
-                "response": response.json()
+                "response": completion
             }
             
-        except requests.exceptions.RequestException as e:
+        except LLMError as e:
             self.logger.error(f"API request failed: {str(e)}")
             return {"status": "error", "message": f"API request failed: {str(e)}"}
     
     
+    def _response_cache_key(self, prompt: str, date_sensitive: bool) -> str:
+        """
+        Hash of the normalized prompt. Prompts that use the doctor roster embed its
+        text, so a changed roster changes the key in every worker process.
+        Date-sensitive prompts are also partitioned by today's date so an answer
+        never outlives its day.
+        """
+        normalized = re.sub(r"\s+", " ", re.sub(r"[?!.,;:'\"]", "", prompt.lower())).strip()
+        day = datetime.now().date().isoformat() if date_sensitive else ""
+        return hashlib.sha256(f"{day}|{normalized}".encode()).hexdigest()
+
+    def _send_cached(self, wanted_prompt: str, date_sensitive: bool = False, stream_tokens: bool = True) -> Dict:
+        """
+        _send_to_api for prompts whose answer can be shared between patients;
+        successful responses are reused from the response cache.
+        """
+        key = self._response_cache_key(wanted_prompt, date_sensitive)
+        cached = self.response_cache.get(key)
+        if cached is not None:
+            if stream_tokens:
+                self._emit("token", cached["choices"][0]["message"]["content"])
+            return {"status": "success", "response": cached}
+
+        response = self._send_to_api(wanted_prompt, stream_tokens=stream_tokens)
+        if response["status"] == "success":
+            self.response_cache.set(key, response["response"])
+        return response
+
     def recommend_doctor(self, patient_query: str) -> Dict:
         """
         Analyze patient query and recommend the most suitable doctor
@@ -94,7 +222,7 @@ class ChatGPTAPIService:
             )
 
             # Send to GPT for recommendation
-            response = self._send_to_api(prompt)
+            response = self._send_cached(prompt)
             
             if response["status"] == "success":
                 content = response["response"]["choices"][0]["message"]["content"]
@@ -113,40 +241,23 @@ class ChatGPTAPIService:
             self.logger.error(f"Error recommending doctor: {str(e)}")
             return {"status": "error", "message": f"Failed to recommend doctor: {str(e)}"}
     
-    def get_doctors_from_db(self) -> List[Dict]:
+    def get_doctors_from_db(self) -> str:
         """
-        Retrieve all doctors and their information from the database
+        Doctor roster block for the prompt, rendered once and reused until a doctor
+        is added or changes availability (see services.doctorService.invalidate_doctor_caches)
         
         Returns:
-            List[Dict]: List of doctor information dictionaries
+            str: Formatted doctor information, or an empty string if none could be loaded
         """
         try:
-            from models.doctor import Doctor
-            from models.user import User
-            from sqlalchemy.orm import Session
-            
-            # Query to get doctors with user information
-            # Use the session from the db instance instead of calling the db module directly
-            doctors = self.db.session.query(Doctor).join(Doctor.user).all()
-            
-            result = []
-            for doctor in doctors:
-                doctor_info = {
-                    "doctor_id": doctor.doctor_id,
-                    "full_name": f"{doctor.user.first_name} {doctor.user.last_name}",
-                    "specialty": str(doctor.specialty),
-                    "description": doctor.description 
-                }
-                result.append(doctor_info)
-                
-            formatted_doctors = self.format_doctor_data(result)
-            return formatted_doctors
-            
+            roster, _ = doctor_roster.get()
+            return roster.text
         except Exception as e:
             self.logger.error(f"Error retrieving doctors from database: {str(e)}")
-            return []
+            return ""
     
-    def format_doctor_data(self, doctor_data: List[Dict]) -> str:
+    @staticmethod
+    def format_doctor_data(doctor_data: List[Dict]) -> str:
         """
         Format doctor data for inclusion in the prompt to GPT
         
@@ -156,17 +267,16 @@ class ChatGPTAPIService:
         Returns:
             str: Formatted string of doctor information
         """
-        formatted_data = ""
-        
+        parts = []
         for i, doctor in enumerate(doctor_data, 1):
-            formatted_data += f"{i}. Dr. {doctor['full_name']}\n"
-            formatted_data += f"   ID: {doctor['doctor_id']}\n"
-            formatted_data += f"   Specialty: {doctor['specialty']}\n"
+            parts.append(f"{i}. Dr. {doctor['full_name']}\n")
+            parts.append(f"   ID: {doctor['doctor_id']}\n")
+            parts.append(f"   Specialty: {doctor['specialty']}\n")
             if doctor.get('description'):
-                formatted_data += f"   Description: {doctor['description']}\n"
-            formatted_data += "\n"
+                parts.append(f"   Description: {doctor['description']}\n")
+            parts.append("\n")
             
-        return formatted_data
+        return "".join(parts)
     
     def book_appointment_ai(self, patient_query:str, token:str ) ->Dict:
         """
@@ -180,6 +290,7 @@ class ChatGPTAPIService:
         """
         try:
             # Get all doctors from the database
+            self._emit("status", "Finding doctors…")
             doctor_data = self.get_doctors_from_db()
             
             if not doctor_data or len(doctor_data) == 0:
@@ -206,7 +317,7 @@ class ChatGPTAPIService:
 
             # Send to GPT for booking appointment
             
-            response = self._send_to_api(prompt)
+            response = self._send_to_api(prompt, stream_tokens=False)
             
             if response["status"] == "success":
                 
@@ -216,31 +327,24 @@ class ChatGPTAPIService:
             else:
                 self.logger.error("Failed to get doctor data from AI response")
             try:
-                
-                
-                """Sends a POST request to register to a single doctor."""
-                url = self.BASE_URL + "/appointments"
+                user = self._user_from_token(token)
+                self.logger.info(f"booking appointment with {doctor_data}")
 
-                headers = {'Content-Type': 'application/json' , 'Authorization': f'Bearer {token}'}
-                self.logger.info(f"sent information to the api {doctor_data}")
-                try:
-                    
-                    doctor_data ["appointment_type"]= "REGULAR"
-                    doctor_data ["verify_insurance"]= True
-                    doctor_data ["notes"]= "Booked with AI assistance"
-                    doctor_data ["recurrence_pattern"]= "NONE"
-                    doctor_data ["recurrence_count"]= 3
-                                
-                            
-                    data = json.dumps(doctor_data)
-                    response = requests.post(url, headers=headers, data = data) 
-                    if response.status_code == 409:
-                        return {"status": "error", "message": "Appointment already in this time exists"}
-                    elif response.status_code == 201:
-                        return {"status": "success", "message": "Appointment booked successfully"}
-                except requests.exceptions.RequestException as e:
-                    self.logger.error(f"API request failed: {str(e)}")
-                    return {"status": "error", "message": f"API request failed: {str(e)}"}
+                doctor_data ["appointment_type"]= "REGULAR"
+                doctor_data ["verify_insurance"]= True
+                doctor_data ["notes"]= "Booked with AI assistance"
+                doctor_data ["recurrence_pattern"]= "NONE"
+                doctor_data ["recurrence_count"]= 3
+
+                if self._stream_cancelled():
+                    return self.CANCELLED
+                self._emit("status", "Booking…")
+                result, status = AppointmentService.book(user, doctor_data)
+                if status == 409:
+                    return {"status": "error", "message": "Appointment already in this time exists"}
+                elif status == 201:
+                    return {"status": "success", "message": "Appointment booked successfully"}
+                return {"status": "error", "message": result.get("error", "Failed to book appointment")}
                 
             except json.JSONDecodeError as e:
                 self.logger.error(f"JSON parsing failed: {str(e)}")
@@ -263,13 +367,12 @@ class ChatGPTAPIService:
         """
 
         try:
-            url = self.BASE_URL + "/appointments/patient"
+            user = self._user_from_token(token)
+            if not user:
+                return {"status": "error", "message": "User not found"}
 
-            headers = {'Content-Type': 'application/json' , 'Authorization': f'Bearer {token}'}
-
-            appointments =  requests.get(url, headers=headers)
-            appointments = appointments.json()
-            appointments = [appt for appt in appointments if appt["status"] == "UPCOMING"]
+            self._emit("status", "Looking up your appointments…")
+            appointments = self._upcoming_appointments(user)
             
             today = datetime.now().date()
             # Create prompt for GPT to analyze and cancel appointment
@@ -282,7 +385,7 @@ class ChatGPTAPIService:
             )
 
             # Send to GPT for cancellation
-            response = self._send_to_api(prompt)
+            response = self._send_to_api(prompt, stream_tokens=False)
            
             if response["status"] == "success":
                 content = response["response"]["choices"][0]["message"]["content"]
@@ -291,10 +394,6 @@ class ChatGPTAPIService:
                 return response   
             
             try:
-                url = self.BASE_URL + "/appointments/cancel"
-
-                headers = {'Content-Type': 'application/json' , 'Authorization': f'Bearer {token}'}
-                
                 match = re.search(r'"appointment_id"\s*:\s*(\d+)', content)
 
                 if match:
@@ -302,8 +401,12 @@ class ChatGPTAPIService:
                    
                 appointment_id = int(appointment_id)
                 
-                data = json.dumps({"appointment_id": appointment_id})
-                response = requests.put(url, headers=headers, data=data)
+                if self._stream_cancelled():
+                    return self.CANCELLED
+                self._emit("status", "Cancelling…")
+                result, status = AppointmentService.cancel(user, {"appointment_id": appointment_id})
+                if status != 200:
+                    return {"status": "error", "message": result.get("error", "Failed to cancel appointment")}
 
                 return {"status": "success", "message": "Appointment cancelled successfully"}
             except json.JSONDecodeError as e:
@@ -326,13 +429,12 @@ class ChatGPTAPIService:
 
         """
         try:
-            url = self.BASE_URL + "/appointments/patient"
-
-            headers = {'Content-Type': 'application/json' , 'Authorization': f'Bearer {token}'}
+            user = self._user_from_token(token)
+            if not user:
+                return {"status": "error", "message": "User not found"}
 
-            appointments =  requests.get(url, headers=headers)
-            appointments = appointments.json()
-            appointments = [appt for appt in appointments if appt["status"] == "UPCOMING"]
+            self._emit("status", "Looking up your appointments…")
+            appointments = self._upcoming_appointments(user)
             
             today = datetime.now().date()
             # Create prompt for GPT to analyze and cancel appointment
@@ -347,7 +449,7 @@ class ChatGPTAPIService:
             )
 
             # Send to GPT for cancellation
-            response = self._send_to_api(prompt)
+            response = self._send_to_api(prompt, stream_tokens=False)
            
             if response["status"] == "success":
                 content = response["response"]["choices"][0]["message"]["content"]
@@ -356,19 +458,18 @@ class ChatGPTAPIService:
                 return response   
             
             try:
-                url = self.BASE_URL + "/appointments/reschedule"
-
-                headers = {'Content-Type': 'application/json' , 'Authorization': f'Bearer {token}'}
-
-                
                 match = re.search(r'```json\s*(\{.*?\})\s*```', content, re.DOTALL)
                 if match:
                     json_str = match.group(1)
                 json_str = json.loads(json_str)
                 json_str["reason"]= "Rescheduled with AI assistance"
-                data = json.dumps(json_str)
-                
-                response = requests.put(url, headers=headers, data=data)
+
+                if self._stream_cancelled():
+                    return self.CANCELLED
+                self._emit("status", "Rescheduling…")
+                result, status = AppointmentService.reschedule(user, json_str)
+                if status != 200:
+                    return {"status": "error", "message": result.get("error", "Failed to reschedule appointment")}
 
                 return {"status": "success", "message": "Appointment reschudeled successfully"}
             except json.JSONDecodeError as e:
@@ -393,6 +494,7 @@ class ChatGPTAPIService:
             """
             try:
                 # Get all doctors from the database
+                self._emit("status", "Finding doctors…")
                 doctor_data = self.get_doctors_from_db()
                 
                 if not doctor_data or len(doctor_data) == 0:
@@ -417,8 +519,8 @@ class ChatGPTAPIService:
                     "}"
                 )
         
-                # Send to GPT for doctor recommendation
-                response = self._send_to_api(prompt)
+                # Send to GPT for doctor recommendation; the prompt carries today's date
+                response = self._send_cached(prompt, date_sensitive=True)
                 
                 if response["status"] == "success":
                     content = response["response"]["choices"][0]["message"]["content"]
@@ -482,24 +584,18 @@ class ChatGPTAPIService:
             Returns:
                 Dict: Doctor details
             """
-            url = f"{self.BASE_URL}/doctors/{doctor_id}"
-            headers = {'Authorization': f'Bearer {token}'}
-            
-            try:
-                response = requests.get(url, headers=headers)
-                
-                if response.status_code == 200:
-                    return {"status": "success", "data": response.json()}
-                else:
-                    self.logger.error(f"Failed to get doctor details: {response.status_code}")
-                    return {"status": "error", "message": f"Failed to get doctor details: {response.status_code}"}
-            except requests.exceptions.RequestException as e:
-                self.logger.error(f"API request failed: {str(e)}")
-                return {"status": "error", "message": f"API request failed: {str(e)}"}
+            from services.doctorService import doctor_to_dict
+
+            doctor = get_doctor(doctor_id)
+            if not doctor:
+                self.logger.error(f"Failed to get doctor details: doctor {doctor_id} not found")
+                return {"status": "error", "message": f"Doctor {doctor_id} not found"}
+            return {"status": "success", "data": doctor_to_dict(doctor)}
     
     def coordinator(self, patient_query: str, token: str) :
         """
-        Main coordinator function to handle patient queries and recommend doctors or book appointments
+        Main coordinator function to handle patient queries and recommend doctors or book appointments.
+        Clear-cut queries are routed by the local intent router; only the rest are classified by the model.
         
         Args:
             patient_query (str): Patient's description of symptoms or medical needs
@@ -508,6 +604,90 @@ class ChatGPTAPIService:
         Returns:
             Dict: Response containing recommended doctor information or appointment booking details
         """
+        intent = self.intent_router.route(patient_query)
+        if intent is None:
+            response = self._classify_intent(patient_query)
+            if response["status"] != "success":
+                return response
+            intent = response["intent"]
+            self.intent_router.record_upstream(intent)
+
+        if intent == BOOK:
+            self.logger.info(f"Booking appointment for query: {patient_query}")
+            return self.book_appointment_ai(patient_query=patient_query, token=token)
+        elif intent == RECOMMEND:
+            self.logger.info(f"Recommending doctor for query: {patient_query}")
+            return self.recommend_doctor_ai(patient_query=patient_query, token=token)
+        elif intent == CANCEL:
+            self.logger.info(f"Cancelling appointment for query: {patient_query}")
+            return self.cancel_appointment_ai(patient_query=patient_query, token=token)
+        elif intent == RESCHEDULE:
+            self.logger.info(f"Rescheduling appointment for query: {patient_query}")
+            return self.reschdule_appointment_ai(patient_query=patient_query, token=token)
+        else:
+            return {"status": "error", "message": "No valid action found"}
+
+    def coordinator_stream(self, patient_query: str, token: str):
+        """
+        Streaming form of coordinator. The request is handled in a worker thread
+        while this generator passes on its progress as it happens. When the client
+        disconnects (the generator is closed) or no event arrives within a model
+        call's deadline, the run is cancelled: the worker stops before its next model
+        call or booking change.
+        
+        Args:
+            patient_query (str): Patient's description of symptoms or medical needs
+            token (str): Authentication token for API requests
+            
+        Yields:
+            tuple: (event type, data) - "status" messages, "token" pieces of the model's
+            answer, and finally one "result" with the dict coordinator would have returned
+        """
+        from flask import current_app
+        app = current_app._get_current_object()
+        events = queue.Queue()
+        cancelled = threading.Event()
+
+        def run():
+            self._stream.events = events
+            self._stream.cancelled = cancelled
+            try:
+                with app.app_context():
+                    result = self.coordinator(patient_query, token)
+            except Exception as e:
+                self.logger.error(f"Error handling streamed query: {str(e)}")
+                result = {"status": "error", "message": f"Failed to handle request: {str(e)}"}
+            finally:
+                self._stream.events = None
+                self._stream.cancelled = None
+            events.put(("result", result))
+
+        # Not a daemon: a shutdown waits for a booking in progress instead of cutting it off mid-write
+        threading.Thread(target=run, name="ai-chat-stream").start()
+        try:
+            yield "status", "Understanding your request…"
+            while True:
+                try:
+                    event_type, data = events.get(timeout=self.llm.deadline_seconds + self.STREAM_GRACE_SECONDS)
+                except queue.Empty:
+                    cancelled.set()
+                    self.logger.error("Streamed query timed out waiting for the worker")
+                    yield "result", {"status": "error", "message": "Request timed out"}
+                    break
+                yield event_type, data
+                if event_type == "result":
+                    break
+        finally:
+            # Client gone or run finished; a worker still going stops before its next step
+            cancelled.set()
+
+    def _classify_intent(self, patient_query: str) -> Dict:
+        """
+        Ask the model which action the patient wants
+        
+        Returns:
+            Dict: {"status": "success", "intent": one of INTENTS or None} or an error response
+        """
        # Create prompt for GPT to analyze doctor profiles and recommend based on patient query
         prompt = (
                     "You are a medical assistant AI. Based on the patient's query decide whether the patient wants a doctor recomendation or to book an" \
@@ -521,109 +701,19 @@ class ChatGPTAPIService:
                     f"{patient_query}\n\n" \
                 )
         
-                # Send to GPT for doctor recommendation
-        response = self._send_to_api(prompt)
+        response = self._send_cached(prompt, stream_tokens=False)
+        if response["status"] != "success":
+            return response
 
-        if response["status"] == "success":
-                    content = response["response"]["choices"][0]["message"]["content"]
-                    
-                    # Clean up the response to extract the JSON
-                    content = re.sub(r"```json|```", "", content).strip()
-                    content = json.loads(content)
-                    
-                    
-                    if content["book_appointment"] == True:
-                        # Use the dedicated endpoint instead of direct method call
-                        try:
-                            url = f"{self.BASE_URL}/ai/book"
-                            headers = {
-                                'Content-Type': 'application/json',
-                                'Authorization': f'Bearer {token}'
-                            }
-                            payload = {"query": patient_query}
-                            
-                            self.logger.info(f"Redirecting to booking endpoint with query: {patient_query}")
-                            api_response = requests.post(url, headers=headers, json=payload)
-                            
-                            # Check if the request was successful
-                            if api_response.status_code == 200:
-                                return api_response.json()
-                            else:
-                                return {
-                                    "status": "error", 
-                                    "message": f"Booking request failed with status code: {api_response.status_code}"
-                                }
-                        except Exception as e:
-                            self.logger.error(f"Error redirecting to booking endpoint: {str(e)}")
-                            return {"status": "error", "message": f"Failed to book appointment: {str(e)}"}
-                    elif content["doctor_recomendation"] == True:
-                        try:
-                            url = f"{self.BASE_URL}/ai/recomendation"
-                            headers = {
-                                'Content-Type': 'application/json',
-                                'Authorization': f'Bearer {token}'
-                            }
-                            payload = {"query": patient_query}
-                            
-                            self.logger.info(f"Redirecting to recomendation endpoint with query: {patient_query}")
-                            api_response = requests.post(url, headers=headers, json=payload)
-                            
-                            # Check if the request was successful
-                            if api_response.status_code == 200:
-                                return api_response.json()
-                            else:
-                                return {
-                                    "status": "error", 
-                                    "message": f"recomendation request failed with status code: {api_response.status_code}"
-                                }
-                        except Exception as e:
-                            self.logger.error(f"Error redirecting to recomendation endpoint: {str(e)}")
-                            return {"status": "error", "message": f"Failed to recomendation appointment: {str(e)}"}
-                    elif content["cancel_appointment"] == True:
-                        try:
-                            url = f"{self.BASE_URL}/ai/cancel"
-                            headers = {
-                                'Content-Type': 'application/json',
-                                'Authorization': f'Bearer {token}'
-                            }
-                            payload = {"query": patient_query}
-                            
-                            self.logger.info(f"Redirecting to cancel endpoint with query: {patient_query}")
-                            api_response = requests.post(url, headers=headers, json=payload)
-                            
-                            # Check if the request was successful
-                            if api_response.status_code == 200:
-                                return api_response.json()
-                            else:
-                                return {
-                                    "status": "error", 
-                                    "message": f"cancel request failed with status code: {api_response.status_code}"
-                                }
-                        except Exception as e:
-                            self.logger.error(f"Error redirecting to cancel endpoint: {str(e)}")
-                            return {"status": "error", "message": f"Failed to cancel appointment: {str(e)}"}
-                    elif content["reschedule"] == True:
-                        try:
-                            url = f"{self.BASE_URL}/ai/reschedule"
-                            headers = {
-                                'Content-Type': 'application/json',
-                                'Authorization': f'Bearer {token}'
-                            }
-                            payload = {"query": patient_query}
-                            
-                            self.logger.info(f"Redirecting to reschdule endpoint with query: {patient_query}")
-                            api_response = requests.post(url, headers=headers, json=payload)
-                            
-                            # Check if the request was successful
-                            if api_response.status_code == 200:
-                                return api_response.json()
-                            else:
-                                return {
-                                    "status": "error", 
-                                    "message": f"reschudeling request failed with status code: {api_response.status_code}"
-                                }
-                        except Exception as e:
-                            self.logger.error(f"Error redirecting to reschdule endpoint: {str(e)}")
-                            return {"status": "error", "message": f"Failed to reschdule appointment: {str(e)}"}
-                    else:
-                        return {"status": "error", "message": "No valid action found"}
+        content = response["response"]["choices"][0]["message"]["content"]
+        
+        # Clean up the response to extract the JSON
+        content = re.sub(r"```json|```", "", content).strip()
+        try:
+            content = json.loads(content)
+        except json.JSONDecodeError as e:
+            self.logger.error(f"JSON parsing failed: {str(e)}")
+            return {"status": "error", "message": "Failed to parse AI response as JSON"}
+
+        intent = next((name for name in INTENTS if content.get(name) == True), None)
+        return {"status": "success", "intent": intent}
@@ -0,0 +1,56 @@
+import json
+from flask import request, Response
+from sqlalchemy.orm import contains_eager
+from services.db import db
+from models import User, Doctor
+from services.cache import ValueCache
+
+
+def _load_doctor_directory():
+    """Serialize every doctor with their user record using one joined query"""
+    doctors = db.session.query(Doctor).join(Doctor.user).options(
+        contains_eager(Doctor.user)
+    ).order_by(Doctor.doctor_id).all()
+
+    return json.dumps([doctor_to_dict(doctor) for doctor in doctors]).encode()
+
+
+def doctor_to_dict(doctor):
+    """Public profile of a doctor as listed by /doctors"""
+    return {
+        'id': doctor.doctor_id,
+        'first_name': doctor.user.first_name,
+        'last_name': doctor.user.last_name,
+        'email': doctor.user.email,
+        "specialty": doctor.specialty.name,
+        "description": doctor.description,
+    }
+
+
+# Serialized /doctors response; invalidated when a doctor signs up or edits availability
+doctor_directory = ValueCache("doctor_directory", _load_doctor_directory, ttl_seconds=300)
+
+
+def invalidate_doctor_caches():
+    """Drop everything derived from the doctor roster after a doctor was added or changed"""
+    # Import here to avoid circular imports
+    from services.chatgpt import doctor_roster
+
+    doctor_directory.invalidate()
+    doctor_roster.invalidate()
+
+
+class DoctorController:
+    @staticmethod
+    def get_doctors():
+        """
+        Get a list of all doctors, served from the directory cache.
+        Responds 304 Not Modified when the client's If-None-Match matches.
+        """
+        body, etag = doctor_directory.get()
+
+        response = Response(body, mimetype='application/json')
+        response.set_etag(etag)
+        # Let browsers keep the body but revalidate it on every use
+        response.headers['Cache-Control'] = 'no-cache'
+        return response.make_conditional(request)
@@ -0,0 +1,207 @@
+import json
+import os
+import queue
+import threading
+import time
+from collections import defaultdict
+from flask import request, jsonify, Response, stream_with_context, current_app
+from flask_jwt_extended import get_jwt_identity
+from itsdangerous import URLSafeTimedSerializer, BadSignature, SignatureExpired
+
+
+def sse_event(event_type, data):
+    """One server-sent event with a JSON payload"""
+    return f"event: {event_type}\ndata: {json.dumps(data)}\n\n"
+
+
+class InProcessBroker:
+    """
+    Publish/subscribe of JSON events per user within one process.
+    Every subscriber gets its own bounded queue; a client that stops reading
+    loses events instead of growing memory (it catches up over the REST endpoints).
+    """
+    QUEUE_SIZE = 100
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = defaultdict(set)
+
+    def subscribe(self, user_id):
+        """Register a new listener for a user and return its queue"""
+        listener = queue.Queue(maxsize=self.QUEUE_SIZE)
+        with self._lock:
+            self._subscribers[str(user_id)].add(listener)
+        return listener
+
+    def unsubscribe(self, user_id, listener):
+        """Remove a listener returned by subscribe"""
+        with self._lock:
+            listeners = self._subscribers.get(str(user_id))
+            if listeners is not None:
+                listeners.discard(listener)
+                if not listeners:
+                    del self._subscribers[str(user_id)]
+
+    def publish(self, user_id, event_type, data):
+        """Send an event to every listener of a user"""
+        self._deliver(str(user_id), {"type": event_type, "data": data})
+
+    def _deliver(self, user_id, event):
+        with self._lock:
+            listeners = list(self._subscribers.get(user_id, ()))
+        for listener in listeners:
+            try:
+                listener.put_nowait(event)
+            except queue.Full:
+                print(f"Dropping {event['type']} event for user {user_id}: listener is not keeping up")
+
+
+class RedisBroker(InProcessBroker):
+    """
+    Broker for several worker processes. Events are published to a Redis channel
+    (or any server speaking the Redis pub/sub protocol) and a background thread in
+    every process fans them out to that process's local listeners.
+    Needs the redis package.
+    """
+    CHANNEL_PREFIX = "nabad:events:"
+    # Wait between reconnect attempts, doubled after every failure up to the maximum
+    RECONNECT_MIN_SECONDS = 1
+    RECONNECT_MAX_SECONDS = 30
+
+    def __init__(self, url):
+        super().__init__()
+        import redis
+
+        self._redis = redis.Redis.from_url(url)
+        self._listener = threading.Thread(target=self._listen, name="redis-event-listener", daemon=True)
+        self._listener.start()
+
+    def publish(self, user_id, event_type, data):
+        """Send an event to every listener of a user in any process"""
+        self._redis.publish(
+            self.CHANNEL_PREFIX + str(user_id),
+            json.dumps({"type": event_type, "data": data})
+        )
+
+    def _listen(self):
+        """
+        Fan out broker messages until the process exits. A lost connection is
+        logged and retried with backoff; the pattern subscription is made again
+        on every new connection. Events published while disconnected are lost,
+        clients catch up over the REST endpoints.
+        """
+        backoff = self.RECONNECT_MIN_SECONDS
+        while True:
+            pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+            try:
+                pubsub.psubscribe(self.CHANNEL_PREFIX + "*")
+                for message in pubsub.listen():
+                    backoff = self.RECONNECT_MIN_SECONDS
+                    try:
+                        channel = message["channel"].decode()
+                        event = json.loads(message["data"])
+                    except (ValueError, AttributeError) as e:
+                        print(f"Ignoring malformed broker message: {e}")
+                        continue
+                    self._deliver(channel[len(self.CHANNEL_PREFIX):], event)
+            except Exception as e:
+                print(f"Event broker connection lost, reconnecting in {backoff}s: {e}")
+            finally:
+                try:
+                    pubsub.close()
+                except Exception:
+                    pass
+            time.sleep(backoff)
+            backoff = min(backoff * 2, self.RECONNECT_MAX_SECONDS)
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    """
+    Process-wide broker. Uses Redis when MESSAGE_BROKER_URL is set (needed with
+    more than one worker process), otherwise delivers in process.
+    """
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                broker_url = os.environ.get('MESSAGE_BROKER_URL')
+                _broker = RedisBroker(broker_url) if broker_url else InProcessBroker()
+    return _broker
+
+
+def _ticket_serializer():
+    return URLSafeTimedSerializer(current_app.config["SECRET_KEY"], salt="event-stream")
+
+
+class EventController:
+    # Seconds between keep-alive comments on an idle stream
+    HEARTBEAT_SECONDS = 15
+    # Seconds a stream ticket can be used to open a stream
+    TICKET_TTL_SECONDS = 60
+
+    @staticmethod
+    def issue_stream_ticket():
+        """
+        Short-lived ticket for opening the current user's event stream.
+
+        EventSource cannot send an Authorization header, so the stream is opened
+        with a ticket in the query string instead of the access token. The ticket
+        only opens event streams and expires after TICKET_TTL_SECONDS, so a URL
+        that ends up in an access log is not a usable credential.
+
+        Returns:
+            tuple: ({"ticket", "expires_in"}, 200)
+        """
+        ticket = _ticket_serializer().dumps({"user_id": get_jwt_identity()})
+        return jsonify({"ticket": ticket, "expires_in": EventController.TICKET_TTL_SECONDS}), 200
+
+    @staticmethod
+    def stream_events():
+        """
+        Server-sent event stream of the current user's real-time events
+        (new messages and unread-count changes).
+
+        Opened with a ticket from POST /events/ticket:
+        GET /events/stream?ticket=<ticket>
+        """
+        ticket = request.args.get('ticket')
+        if not ticket:
+            return jsonify({"error": "Missing ticket"}), 401
+        try:
+            user_id = _ticket_serializer().loads(
+                ticket, max_age=EventController.TICKET_TTL_SECONDS
+            )["user_id"]
+        except SignatureExpired:
+            return jsonify({"error": "Ticket expired"}), 401
+        except (BadSignature, KeyError, TypeError):
+            return jsonify({"error": "Invalid ticket"}), 401
+
+        broker = get_broker()
+        listener = broker.subscribe(user_id)
+
+        def generate():
+            try:
+                # Tell the client how long to wait before reconnecting
+                yield "retry: 3000\n\n"
+                while True:
+                    try:
+                        event = listener.get(timeout=EventController.HEARTBEAT_SECONDS)
+                    except queue.Empty:
+                        yield ": keep-alive\n\n"
+                        continue
+                    yield sse_event(event['type'], event['data'])
+            finally:
+                broker.unsubscribe(user_id, listener)
+
+        return Response(
+            stream_with_context(generate()),
+            mimetype='text/event-stream',
+            headers={
+                "Cache-Control": "no-cache",
+                "X-Accel-Buffering": "no"
+            }
+        )
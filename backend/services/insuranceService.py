@@ -2,6 +2,7 @@ from flask import request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from services.db import db
 from models import User, Patient, Insurance, InsuranceCoverage, Doctor, Appointment
+from services.requestCache import get_current_user, get_patient, get_doctor
 
 class InsuranceController:
     @staticmethod
@@ -12,7 +13,7 @@ class InsuranceController:
         """
         # Get the current user
         current_user_id = get_jwt_identity()
-        current_user = User.query.get(current_user_id)
+        current_user = get_current_user()
         
         if not current_user:
             return jsonify({"error": "User not found"}), 404
@@ -29,10 +30,10 @@ class InsuranceController:
             # Only staff can view other patients' insurance
             if current_user.role.name == "PATIENT" and str(current_user.user_id) != patient_id:
                 return jsonify({"error": "Unauthorized to view other patients' insurance"}), 403
-            patient = Patient.query.get(patient_id)
+            patient = get_patient(patient_id)
         else:
             # Use the current user's patient record
-            patient = Patient.query.get(current_user.user_id)
+            patient = get_patient(current_user.user_id)
             
         if not patient:
             return jsonify({"error": "Patient record not found"}), 404
@@ -66,7 +67,7 @@ class InsuranceController:
         """
         # Get the current user
         current_user_id = get_jwt_identity()
-        current_user = User.query.get(current_user_id)
+        current_user = get_current_user()
         
         if not current_user:
             return jsonify({"error": "User not found"}), 404
@@ -79,10 +80,10 @@ class InsuranceController:
             # Staff members can update any patient's insurance
             if not data.get('patient_id'):
                 return jsonify({"error": "Patient ID required for staff users"}), 400
-            patient = Patient.query.get(data.get('patient_id'))
+            patient = get_patient(data.get('patient_id'))
         else:
             # Patients can only update their own insurance
-            patient = Patient.query.get(current_user.user_id)
+            patient = get_patient(current_user.user_id)
             
         if not patient:
             return jsonify({"error": "Patient record not found"}), 404
@@ -162,7 +163,7 @@ class InsuranceController:
         """
         # Get the current user
         current_user_id = get_jwt_identity()
-        current_user = User.query.get(current_user_id)
+        current_user = get_current_user()
         
         if not current_user:
             return jsonify({"error": "User not found"}), 404
@@ -175,10 +176,10 @@ class InsuranceController:
             # Staff members can check any patient's insurance
             if not data.get('patient_id'):
                 return jsonify({"error": "Patient ID required for staff users"}), 400
-            patient = Patient.query.get(data.get('patient_id'))
+            patient = get_patient(data.get('patient_id'))
         else:
             # Patients can only check their own insurance
-            patient = Patient.query.get(current_user.user_id)
+            patient = get_patient(current_user.user_id)
             
         if not patient:
             return jsonify({"error": "Patient record not found"}), 404
@@ -188,7 +189,7 @@ class InsuranceController:
             return jsonify({"error": "Missing required field: doctor_id"}), 400
             
         # Get the doctor information
-        doctor = Doctor.query.get(data["doctor_id"])
+        doctor = get_doctor(data["doctor_id"])
         if not doctor:
             return jsonify({"error": "Doctor not found"}), 404
             
@@ -0,0 +1,149 @@
+import re
+import threading
+
+
+# Actions the AI coordinator can take, named as in the coordinator's model prompt
+BOOK = "book_appointment"
+RECOMMEND = "doctor_recomendation"
+CANCEL = "cancel_appointment"
+RESCHEDULE = "reschedule"
+INTENTS = (BOOK, RECOMMEND, CANCEL, RESCHEDULE)
+
+
+class IntentRouter:
+    """
+    Decides the coordinator action for a patient query locally when the query is
+    unambiguous, so the model is only asked to classify the hard cases.
+
+    Keyword/regex rules score each intent. A query is routed locally only when
+    exactly one intent matches and nothing suggests a negation or a compound
+    request; otherwise an optional offline classifier gets a chance, and failing
+    that the caller falls back to the model. Counters show how much traffic the
+    fast path absorbs.
+    """
+    # Cancelling is destructive, so only an explicit "cancel" decides it locally;
+    # "I can't make it" and similar go to the model, which often reads them as reschedules
+    RULES = {
+        CANCEL: [
+            r"\bcancel\w*\b",
+        ],
+        RESCHEDULE: [
+            r"\bre-?schedul\w*\b",
+            r"\bpostpone\w*\b",
+            r"\b(move|push|shift) (my|the|our)\b.*\b(appointment|visit|booking)\b",
+            r"\b(move|push|shift) (it|this|that)\b",
+            r"\bchange (my|the) (appointment|booking|date|time)\b",
+            r"\b(new|another|different|later|earlier) (time|date|day|slot)\b",
+            r"\b(could|can) (we|you|i) (do|make it)\b",
+        ],
+        BOOK: [
+            r"\bbook\w*\b",
+            r"\b(make|set up|get|need|want) an? (new )?(appointment|visit|consultation)\b",
+            r"(?<!re)\bschedul\w* (an? |my )?(appointment|visit|consultation|check-?up)\b",
+        ],
+        RECOMMEND: [
+            r"\brecommend\w*\b",
+            r"\bsuggest\w*\b",
+            r"\b(which|what|what kind of) (doctor|specialist|specialty)\b",
+            r"\bwho should i (see|visit|consult)\b",
+        ],
+    }
+    # Words that make a single keyword match unreliable
+    AMBIGUOUS = re.compile(r"\b(don'?t|do not|not|never|instead|rather than|and then)\b", re.IGNORECASE)
+    # Words that, next to "cancel", suggest the patient wants something other than
+    # a plain cancellation (rebooking, keeping it, or a second clause)
+    CANCEL_AMBIGUOUS = re.compile(
+        r"\b(re-?book\w*|move\w*|keep\w*|but|rather|instead of|and|or|then)\b", re.IGNORECASE
+    )
+    # Day mentions; naming two different days counts as a reschedule signal
+    DAY_MENTION = re.compile(
+        r"\b(mon|tue|tues|wed|thu|thur|thurs|fri|sat|sun)(day)?\b|\b(today|tomorrow|tonight)\b"
+        r"|\b\d{4}-\d{1,2}-\d{1,2}\b|\b\d{1,2}/\d{1,2}\b|\b\d{1,2}(st|nd|rd|th)\b",
+        re.IGNORECASE
+    )
+
+    def __init__(self, classifier=None, classifier_threshold=0.8, name="intent_router"):
+        """
+        Args:
+            classifier: Optional offline model, a function query -> (intent, confidence)
+            classifier_threshold: Minimum classifier confidence to skip the model
+            name: Name used in metrics
+        """
+        self.name = name
+        self.classifier = classifier
+        self.classifier_threshold = classifier_threshold
+        self._rules = {
+            intent: [re.compile(pattern, re.IGNORECASE) for pattern in patterns]
+            for intent, patterns in self.RULES.items()
+        }
+        self._lock = threading.Lock()
+        self._stats = {"rules": 0, "classifier": 0, "upstream": 0}
+        self._by_intent = {intent: 0 for intent in INTENTS}
+
+    def scores(self, query):
+        """Number of matching rules per intent"""
+        scores = {
+            intent: sum(1 for rule in rules if rule.search(query))
+            for intent, rules in self._rules.items()
+        }
+        if len(self.days_mentioned(query)) > 1:
+            scores[RESCHEDULE] += 1
+        return scores
+
+    def is_ambiguous(self, query, intent):
+        """Whether a query matching only intent should still go to the model"""
+        if self.AMBIGUOUS.search(query):
+            return True
+        return intent == CANCEL and bool(self.CANCEL_AMBIGUOUS.search(query))
+
+    def days_mentioned(self, query):
+        """Distinct days named in a query, e.g. {"tue", "thu"}"""
+        days = set()
+        for match in self.DAY_MENTION.finditer(query):
+            # "Tuesday", "Tue" and "tues" are the same day
+            days.add(match.group(1).lower()[:3] if match.group(1) else match.group(0).lower())
+        return days
+
+    def route(self, query):
+        """
+        Intent of a query if it can be decided locally.
+
+        Returns:
+            str or None: One of INTENTS, or None when the model should decide
+        """
+        query = (query or "").strip()
+        intent, source = None, "upstream"
+
+        if query:
+            matched = [intent for intent, score in self.scores(query).items() if score]
+            if len(matched) == 1 and not self.is_ambiguous(query, matched[0]):
+                intent, source = matched[0], "rules"
+            elif self.classifier is not None:
+                predicted, confidence = self.classifier(query)
+                if predicted in INTENTS and confidence >= self.classifier_threshold:
+                    intent, source = predicted, "classifier"
+
+        self._count(source, intent)
+        return intent
+
+    def record_upstream(self, intent):
+        """Count the intent the model chose for a query the router passed on"""
+        if intent in INTENTS:
+            with self._lock:
+                self._by_intent[intent] += 1
+
+    def _count(self, source, intent):
+        with self._lock:
+            self._stats[source] += 1
+            if intent is not None:
+                self._by_intent[intent] += 1
+
+    def metrics(self):
+        """How many queries each path handled, and the share resolved without the model"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["by_intent"] = dict(self._by_intent)
+        total = stats["rules"] + stats["classifier"] + stats["upstream"]
+        stats["total"] = total
+        stats["fast_path_rate"] = round((stats["rules"] + stats["classifier"]) / total, 4) if total else None
+        return stats
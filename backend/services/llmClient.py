@@ -0,0 +1,208 @@
+import asyncio
+import json
+import os
+import random
+import threading
+import time
+import logging
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class LLMError(Exception):
+    """A chat completion could not be obtained (after retries, or within the deadline)"""
+
+
+class LLMClient:
+    """
+    Client for an OpenAI-compatible chat-completions API.
+
+    - One requests.Session per client, so TLS connections to the API are reused
+    - Every call has a deadline covering queueing, all attempts and the backoff between them
+    - Connection errors, timeouts, 429 and 5xx responses are retried with full-jitter backoff
+      (a Retry-After header is honoured when it fits in the deadline)
+    - At most max_concurrency calls are in flight; further callers wait for a slot
+      until their deadline instead of piling more requests onto a slow upstream
+    - achat() offers the same call to asyncio code without blocking the event loop
+    - stream_chat() yields the completion text as the API produces it
+    """
+    DEFAULT_BASE_URL = "https://api.openai.com/v1"
+    RETRY_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+
+    def __init__(self, api_key, base_url=None, model="gpt-4o", connect_timeout=5,
+                 read_timeout=60, deadline_seconds=90, max_retries=2, max_concurrency=8,
+                 backoff_base=0.5, backoff_cap=8):
+        """
+        Args:
+            api_key: Bearer token for the API
+            base_url: API root (e.g. http://127.0.0.1:8089/v1 for a local stub)
+            model: Model name sent with every request
+            connect_timeout: Seconds to establish a connection
+            read_timeout: Seconds to wait for response data on one attempt
+            deadline_seconds: Default overall budget of one chat() call
+            max_retries: Attempts after the first one
+            max_concurrency: Calls allowed in flight at once (also the connection pool size)
+            backoff_base: First retry waits up to this many seconds, doubling per attempt
+            backoff_cap: Longest wait between attempts
+        """
+        self.api_key = api_key
+        self.base_url = (base_url or self.DEFAULT_BASE_URL).rstrip("/")
+        self.model = model
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.deadline_seconds = deadline_seconds
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.logger = logging.getLogger(__name__)
+
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_concurrency)
+        self._session.mount("https://", adapter)
+        self._session.mount("http://", adapter)
+        self._session.headers.update({
+            "Authorization": f"Bearer {api_key}",
+            "Content-Type": "application/json"
+        })
+
+    @classmethod
+    def from_env(cls, api_key):
+        """
+        Client configured from the environment:
+        OPENAI_BASE_URL, OPENAI_MODEL, LLM_TIMEOUT_SECONDS, LLM_MAX_RETRIES, LLM_MAX_CONCURRENCY
+        """
+        return cls(
+            api_key,
+            base_url=os.environ.get("OPENAI_BASE_URL"),
+            model=os.environ.get("OPENAI_MODEL", "gpt-4o"),
+            deadline_seconds=float(os.environ.get("LLM_TIMEOUT_SECONDS", 90)),
+            max_retries=int(os.environ.get("LLM_MAX_RETRIES", 2)),
+            max_concurrency=int(os.environ.get("LLM_MAX_CONCURRENCY", 8))
+        )
+
+    @property
+    def url(self):
+        return f"{self.base_url}/chat/completions"
+
+    def chat(self, messages, deadline_seconds=None, **options):
+        """
+        Send a chat completion request.
+
+        Args:
+            messages: List of {"role": ..., "content": ...} dicts
+            deadline_seconds: Overall budget for this call (defaults to the client's)
+            **options: Extra fields for the request body (e.g. temperature)
+
+        Returns:
+            dict: Parsed JSON response of the API
+
+        Raises:
+            LLMError: No successful response within the retries and the deadline
+        """
+        deadline = time.monotonic() + (deadline_seconds or self.deadline_seconds)
+        payload = {"model": self.model, "messages": messages, **options}
+
+        if not self._slots.acquire(timeout=max(deadline - time.monotonic(), 0)):
+            raise LLMError("Too many concurrent requests to the language model")
+        try:
+            return self._post_with_retries(payload, deadline)
+        finally:
+            self._slots.release()
+
+    async def achat(self, messages, deadline_seconds=None, **options):
+        """chat() for asyncio callers; runs the blocking call in a worker thread"""
+        return await asyncio.to_thread(self.chat, messages, deadline_seconds, **options)
+
+    def stream_chat(self, messages, deadline_seconds=None, **options):
+        """
+        Send a streaming chat completion request and yield the text deltas.
+        Failures before the first byte are retried like chat(); once text is
+        flowing an interruption raises LLMError.
+
+        Args:
+            messages: List of {"role": ..., "content": ...} dicts
+            deadline_seconds: Overall budget for the whole stream (defaults to the client's)
+            **options: Extra fields for the request body
+
+        Yields:
+            str: Pieces of the completion text
+        """
+        deadline = time.monotonic() + (deadline_seconds or self.deadline_seconds)
+        payload = {"model": self.model, "messages": messages, "stream": True, **options}
+
+        if not self._slots.acquire(timeout=max(deadline - time.monotonic(), 0)):
+            raise LLMError("Too many concurrent requests to the language model")
+        try:
+            response = self._post_with_retries(payload, deadline, stream=True)
+            with response:
+                for line in response.iter_lines(decode_unicode=True):
+                    if time.monotonic() > deadline:
+                        raise LLMError("Language model stream timed out")
+                    # Server-sent events: "data: {chunk}" lines, ended by "data: [DONE]"
+                    if not line or not line.startswith("data:"):
+                        continue
+                    data = line[len("data:"):].strip()
+                    if data == "[DONE]":
+                        break
+                    for choice in json.loads(data).get("choices", []):
+                        delta = (choice.get("delta") or {}).get("content")
+                        if delta:
+                            yield delta
+        except (requests.exceptions.RequestException, ValueError) as e:
+            raise LLMError(f"Language model stream failed: {e}") from e
+        finally:
+            self._slots.release()
+
+    def _post_with_retries(self, payload, deadline, stream=False):
+        attempt = 0
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise LLMError("Language model request timed out")
+
+            retry_after = None
+            try:
+                response = self._session.post(
+                    self.url,
+                    json=payload,
+                    timeout=(min(self.connect_timeout, remaining), min(self.read_timeout, remaining)),
+                    stream=stream
+                )
+                if response.status_code not in self.RETRY_STATUS_CODES:
+                    response.raise_for_status()
+                    return response if stream else response.json()
+                error = f"status {response.status_code}"
+                retry_after = self._retry_after(response)
+                response.close()
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                error = str(e)
+            except (requests.exceptions.RequestException, ValueError) as e:
+                # Client errors and unparsable bodies will not improve on retry
+                raise LLMError(f"Language model request failed: {e}") from e
+
+            if attempt >= self.max_retries:
+                raise LLMError(f"Language model request failed after {attempt + 1} attempts: {error}")
+
+            # Full jitter keeps many workers from retrying in lockstep
+            delay = random.uniform(0, min(self.backoff_cap, self.backoff_base * 2 ** attempt))
+            if retry_after is not None:
+                delay = max(delay, retry_after)
+            if time.monotonic() + delay >= deadline:
+                raise LLMError(f"Language model request failed before the deadline: {error}")
+
+            attempt += 1
+            self.logger.warning(f"Retrying language model request (attempt {attempt + 1}) in {delay:.2f}s: {error}")
+            time.sleep(delay)
+
+    @staticmethod
+    def _retry_after(response):
+        """Seconds from a numeric Retry-After header, if any"""
+        try:
+            return float(response.headers["Retry-After"])
+        except (KeyError, ValueError):
+            return None
+
+    def close(self):
+        """Close pooled connections"""
+        self._session.close()
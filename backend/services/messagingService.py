@@ -2,174 +2,243 @@ from flask import request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
 from datetime import datetime
 from services.db import db
-from models import User, Doctor, Patient, Message, Appointment, UserRole
-from sqlalchemy import or_, and_, desc , text
+from models import User, Doctor, Patient, Message, Appointment, UserRole, ConversationSummary
+from services.eventService import get_broker
+from services.cache import CounterCache, counter_cache_url
+from services.requestCache import get_current_user, get_user
+from sqlalchemy import or_, and_, desc , text, func, case
 import traceback
+import base64
+
+def _count_unread_messages(user_id):
+    return Message.query.filter(
+        Message.receiver_id == user_id,
+        Message.is_read == False
+    ).count()
+
+
+# Unread messages per receiver, kept current by send_message and mark_messages_as_read
+unread_message_counts = CounterCache(
+    "unread_messages", _count_unread_messages, reconcile_seconds=300,
+    redis_url=counter_cache_url()
+)
+
 
 class MessagingController:
     
+    # Page size limits for the contacts list
+    DEFAULT_CONTACTS_PER_PAGE = 50
+    MAX_CONTACTS_PER_PAGE = 100
+
+    DOCTOR_ROLES = [UserRole.DOCTOR, UserRole.SURGEON, UserRole.THERAPIST]
+
+    @staticmethod
+    def _contact_filter(current_user):
+        """
+        SQL filter selecting the users the current user can message, or None if the
+        role does not support messaging
+        """
+        user_id = current_user.user_id
+        
+        if current_user.role == UserRole.PATIENT:
+            # Doctors from appointments booked by this patient
+            return User.user_id.in_(
+                db.session.query(Appointment.doctor_id).filter(Appointment.patient_id == user_id)
+            )
+        if current_user.role in MessagingController.DOCTOR_ROLES:
+            # Patients the doctor has appointments with, and all nurses
+            return or_(
+                User.user_id.in_(
+                    db.session.query(Appointment.patient_id).filter(Appointment.doctor_id == user_id)
+                ),
+                and_(User.role == UserRole.NURSE, User.user_id != user_id)
+            )
+        if current_user.role == UserRole.NURSE:
+            # All patients and doctors
+            return User.role.in_([UserRole.PATIENT] + MessagingController.DOCTOR_ROLES)
+        return None
+
+    @staticmethod
+    def encode_contact_cursor(name, user_id):
+        """Opaque pagination cursor for a contact's (display name, user_id) position"""
+        return base64.urlsafe_b64encode(f"{user_id}|{name}".encode()).decode()
+
+    @staticmethod
+    def decode_contact_cursor(cursor):
+        """
+        Turn a contact cursor back into (display name, user_id)
+        
+        Raises:
+            ValueError: If the cursor is malformed
+        """
+        try:
+            user_id, name = base64.urlsafe_b64decode(cursor.encode()).decode().split('|', 1)
+            return name, int(user_id)
+        except (ValueError, UnicodeDecodeError) as e:
+            raise ValueError(f"Invalid cursor: {cursor}") from e
+
     @staticmethod
     @jwt_required()
     def get_messaging_contacts():
         """
-        Get all contacts (doctors and nurses) that the user can message.
-        For patients: retrieve appointments the patient booked and then list only the doctors from those appointments.
+        Get a page of contacts (doctors, nurses, patients) that the user can message.
+        For patients: the doctors from appointments the patient booked.
         For doctors: patients they have appointments with and nurses.
         For nurses: all patients and doctors.
+        
+        Query parameters:
+            q: Only contacts whose name contains this text (optional)
+            per_page: Contacts per page, max 100 (optional; without it or a cursor
+                      every contact is returned, as the dashboards expect)
+            after: Cursor from "paging.after"; return the page that follows it (optional)
+        
+        Contacts, their unread counts and the ordering are produced by one query that
+        joins the contact set to a single GROUP BY sender_id unread aggregate. Pages
+        are keyed on (display name, user_id), so a page costs the same however deep
+        it is and no total count is needed.
         """
         try:
             current_user_id = get_jwt_identity()
             print(f"Fetching contacts for user ID: {current_user_id}")
-            current_user = User.query.get(current_user_id)
+            current_user = get_current_user()
             if not current_user:
                 print(f"User not found for ID: {current_user_id}")
                 return jsonify({"error": "User not found"}), 404
-            contacts = []
             print(f"User role: {current_user.role}")
-            # Patient: Get only doctors from appointments booked by this patient.
-            if current_user.role == UserRole.PATIENT:
-                print("Processing contacts for a patient using appointment data")
-                query = text("""
-                    SELECT DISTINCT a.doctor_id, u.first_name, u.last_name, u.role
-                    FROM appointments a
-                    JOIN users u ON a.doctor_id = u.user_id
-                    WHERE a.patient_id = :patient_id
-                """)
-                result = db.session.execute(query, {'patient_id': current_user_id})
-                doctor_rows = result.fetchall()
-                print(f"Found {len(doctor_rows)} doctors from appointments")
-                for row in doctor_rows:
-                    doctor_id, first_name, last_name, role = row
-                    unread_count = Message.query.filter(
-                        Message.sender_id == doctor_id,
-                        Message.receiver_id == current_user_id,
-                        Message.is_read == False
-                    ).count()
-                    contacts.append({
-                        "id": doctor_id,
-                        "name": f"Dr. {first_name} {last_name}",
-                        "role": "Doctor",
-                        "specialty": "Doctor",
-                        "unread_count": unread_count
-                    })
-            elif current_user.role in [UserRole.DOCTOR, UserRole.SURGEON, UserRole.THERAPIST]:
-                print("Processing contacts for a doctor")
-                # Get patients doctor has appointments with
-                patient_ids = db.session.query(Appointment.patient_id)\
-                    .filter(Appointment.doctor_id == current_user_id)\
-                    .distinct().all()
-                    
-                patient_ids = [p[0] for p in patient_ids]
-                print(f"Found {len(patient_ids)} patient IDs for appointments")
-                
-                if patient_ids:
-                    patients = User.query.filter(User.user_id.in_(patient_ids)).all()
-                    print(f"Found {len(patients)} patient user records")
-                    
-                    for patient in patients:
-                        # Count unread messages from this patient
-                        unread_count = Message.query.filter(
-                            Message.sender_id == patient.user_id,
-                            Message.receiver_id == current_user_id,
-                            Message.is_read == False
-                        ).count()
-                        
-                        contacts.append({
-                            "id": patient.user_id,
-                            "name": f"{patient.first_name} {patient.last_name}",
-                            "role": "Patient",
-                            "unread_count": unread_count
-                        })
-                
-                # Get all nurses too
-                nurses = User.query.filter(User.role == UserRole.NURSE).all()
-                print(f"Found {len(nurses)} nurse user records")
-                
-                for nurse in nurses:
-                    if nurse.user_id != current_user_id:  # Don't include yourself
-                        # Count unread messages from this nurse
-                        unread_count = Message.query.filter(
-                            Message.sender_id == nurse.user_id,
-                            Message.receiver_id == current_user_id,
-                            Message.is_read == False
-                        ).count()
-                        
-                        contacts.append({
-                            "id": nurse.user_id,
-                            "name": f"Nurse {nurse.first_name} {nurse.last_name}",
-                            "role": "Nurse",
-                            "unread_count": unread_count
-                        })
-            
-            elif current_user.role == UserRole.NURSE:
-                print("Processing contacts for a nurse")
-                # Get all patients
-                patients = User.query.filter(User.role == UserRole.PATIENT).all()
-                print(f"Found {len(patients)} patient user records")
-                
-                for patient in patients:
-                    # Count unread messages from this patient
-                    unread_count = Message.query.filter(
-                        Message.sender_id == patient.user_id,
-                        Message.receiver_id == current_user_id,
-                        Message.is_read == False
-                    ).count()
-                    
-                    contacts.append({
-                        "id": patient.user_id,
-                        "name": f"{patient.first_name} {patient.last_name}",
-                        "role": "Patient",
-                        "unread_count": unread_count
-                    })
-                
-                # Get all doctors
-                doctors = User.query.filter(User.role.in_([UserRole.DOCTOR, UserRole.SURGEON, UserRole.THERAPIST])).all()
-                print(f"Found {len(doctors)} doctor user records")
-                
-                for doctor in doctors:
-                    # Count unread messages from this doctor
-                    unread_count = Message.query.filter(
-                        Message.sender_id == doctor.user_id,
-                        Message.receiver_id == current_user_id,
-                        Message.is_read == False
-                    ).count()
-                    
-                    contacts.append({
-                        "id": doctor.user_id,
-                        "name": f"Dr. {doctor.first_name} {doctor.last_name}",
-                        "role": "Doctor",
-                        "specialty": doctor.role.name if hasattr(doctor, 'role') else "Doctor",
-                        "unread_count": unread_count
-                    })
-            else:
+            
+            contact_filter = MessagingController._contact_filter(current_user)
+            if contact_filter is None:
                 print(f"Unsupported user role: {current_user.role}")
                 return jsonify({"error": "Your account type does not support messaging"}), 403
-
-            contacts.sort(key=lambda x: x["name"])
+            
+            # Get query parameters
+            search = request.args.get('q', '').strip()
+            after = request.args.get('after')
+            per_page = request.args.get('per_page', type=int)
+            paged = per_page is not None or bool(after)
+            if paged:
+                per_page = min(max(per_page or MessagingController.DEFAULT_CONTACTS_PER_PAGE, 1),
+                               MessagingController.MAX_CONTACTS_PER_PAGE)
+            try:
+                after_position = MessagingController.decode_contact_cursor(after) if after else None
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+            
+            # Unread messages sent to the current user, counted per sender
+            unread = db.session.query(
+                Message.sender_id.label('sender_id'),
+                func.count(Message.message_id).label('unread_count')
+            ).filter(
+                Message.receiver_id == current_user.user_id,
+                Message.is_read == False
+            ).group_by(Message.sender_id).subquery()
+            
+            # Display name as shown to the user, so pages are ordered the way they read
+            display_name = case(
+                (User.role.in_(MessagingController.DOCTOR_ROLES), 'Dr. ' + User.first_name + ' ' + User.last_name),
+                (User.role == UserRole.NURSE, 'Nurse ' + User.first_name + ' ' + User.last_name),
+                else_=User.first_name + ' ' + User.last_name
+            )
+            
+            query = User.query.filter(contact_filter)
+            if search:
+                query = query.filter((User.first_name + ' ' + User.last_name).ilike(f"%{search}%"))
+            if after_position:
+                after_name, after_id = after_position
+                query = query.filter(or_(
+                    display_name > after_name,
+                    and_(display_name == after_name, User.user_id > after_id)
+                ))
+            
+            query = query.outerjoin(unread, unread.c.sender_id == User.user_id).with_entities(
+                User.user_id,
+                User.role,
+                display_name.label('name'),
+                func.coalesce(unread.c.unread_count, 0)
+            ).order_by(display_name, User.user_id)
+            # Fetch one extra row to learn whether another page follows
+            rows = query.limit(per_page + 1).all() if paged else query.all()
+            has_more = paged and len(rows) > per_page
+            if paged:
+                rows = rows[:per_page]
+            
+            contacts = []
+            for user_id, role, name, unread_count in rows:
+                contact = {
+                    "id": user_id,
+                    "name": name,
+                    "unread_count": unread_count
+                }
+                if role in MessagingController.DOCTOR_ROLES:
+                    contact["role"] = "Doctor"
+                    contact["specialty"] = "Doctor" if current_user.role == UserRole.PATIENT else role.name
+                elif role == UserRole.NURSE:
+                    contact["role"] = "Nurse"
+                else:
+                    contact["role"] = "Patient"
+                contacts.append(contact)
+            
             print(f"Successfully retrieved {len(contacts)} contacts")
-            return jsonify({"contacts": contacts}), 200
+            response = {"contacts": contacts}
+            if paged:
+                response["paging"] = {
+                    "per_page": per_page,
+                    "after": MessagingController.encode_contact_cursor(rows[-1][2], rows[-1][0]) if has_more else None,
+                    "has_more": has_more
+                }
+            return jsonify(response), 200
         except Exception as e:
             db.session.rollback()
             print(f"Error getting messaging contacts: {str(e)}")
             print(traceback.format_exc())
             return jsonify({"error": f"Failed to get contacts: {str(e)}"}), 500
 
+    # Page size limits for a chat history page
+    DEFAULT_MESSAGES_PER_PAGE = 50
+    MAX_MESSAGES_PER_PAGE = 100
+
     @staticmethod
     @jwt_required()
     def get_messages_with_contact(contact_id):
         """
-        Get all messages between current user and the specified contact
+        Get one page of messages between current user and the specified contact,
+        oldest first within the page
+        
+        Query parameters:
+            before: Cursor; return the page of messages just older than it (optional)
+            after: Cursor; return messages newer than it, e.g. to poll for new ones (optional)
+            limit: Page size (default 50, max 100)
+        
+        Without a cursor the newest page is returned. Pages are keyed on
+        (timestamp, message_id), so every page costs one index range read however
+        long the thread is. The response's "paging.before" cursor loads older
+        messages (null once the start of the thread is reached) and "paging.after"
+        loads anything newer than this page.
         """
         current_user_id = get_jwt_identity()
-        current_user = User.query.get(current_user_id)
+        current_user = get_current_user()
         
         if not current_user:
             return jsonify({"error": "User not found"}), 404
 
-        contact = User.query.get(contact_id)
+        contact = get_user(contact_id)
         if not contact:
             return jsonify({"error": "Contact not found"}), 404
         
+        before = request.args.get('before')
+        after = request.args.get('after')
+        if before and after:
+            return jsonify({"error": "Use either before or after, not both"}), 400
+        
+        limit = request.args.get('limit', MessagingController.DEFAULT_MESSAGES_PER_PAGE, type=int)
+        limit = min(max(limit, 1), MessagingController.MAX_MESSAGES_PER_PAGE)
+        
+        try:
+            before_position = Message.decode_cursor(before) if before else None
+            after_position = Message.decode_cursor(after) if after else None
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        
         try:
             # Get messages between current user and contact (both ways)
             messages_query = Message.query.filter(
@@ -177,9 +246,29 @@ class MessagingController:
                     and_(Message.sender_id == current_user_id, Message.receiver_id == contact_id),
                     and_(Message.sender_id == contact_id, Message.receiver_id == current_user_id)
                 )
-            ).order_by(Message.timestamp.asc())
+            )
             
-            messages = messages_query.all()
+            # Fetch one extra row to learn whether another page follows
+            if after_position:
+                messages = messages_query.filter(Message.after_position(*after_position)).order_by(
+                    Message.timestamp.asc(), Message.message_id.asc()
+                ).limit(limit + 1).all()
+                has_more_newer = len(messages) > limit
+                messages = messages[:limit]
+                # Anything older than this page (or than the cursor, if it is empty)?
+                oldest = (messages[0].timestamp, messages[0].message_id) if messages else after_position
+                has_more_older = messages_query.filter(
+                    Message.before_position(*oldest)
+                ).with_entities(Message.message_id).first() is not None
+            else:
+                if before_position:
+                    messages_query = messages_query.filter(Message.before_position(*before_position))
+                messages = messages_query.order_by(
+                    Message.timestamp.desc(), Message.message_id.desc()
+                ).limit(limit + 1).all()
+                has_more_older = len(messages) > limit
+                messages = list(reversed(messages[:limit]))
+                has_more_newer = before_position is not None
             
             # Format messages for response
             messages_data = []
@@ -192,6 +281,15 @@ class MessagingController:
                     "is_read": msg.is_read
                 })
             
+            # With an empty page, keep paging from the cursor that was given
+            paging = {
+                "limit": limit,
+                "before": (Message.encode_cursor(messages[0]) if messages else before or after) if has_more_older else None,
+                "after": Message.encode_cursor(messages[-1]) if messages else after or before,
+                "has_more_older": has_more_older,
+                "has_more_newer": has_more_newer
+            }
+            
             # Get contact information
             contact_name = f"{contact.first_name} {contact.last_name}"
             if contact.role in [UserRole.DOCTOR, UserRole.SURGEON, UserRole.THERAPIST]:
@@ -207,7 +305,8 @@ class MessagingController:
             
             return jsonify({
                 "contact": contact_info,
-                "messages": messages_data
+                "messages": messages_data,
+                "paging": paging
             }), 200
             
         except Exception as e:
@@ -222,7 +321,7 @@ class MessagingController:
         Send a message to another user
         """
         current_user_id = get_jwt_identity()
-        current_user = User.query.get(current_user_id)
+        current_user = get_current_user()
         
         if not current_user:
             return jsonify({"error": "User not found"}), 404
@@ -237,7 +336,7 @@ class MessagingController:
         content = data['content']
         
         # Validate recipient exists
-        recipient = User.query.get(recipient_id)
+        recipient = get_user(recipient_id)
         if not recipient:
             return jsonify({"error": "Recipient not found"}), 404
             
@@ -287,69 +386,121 @@ class MessagingController:
             )
             
             db.session.add(message)
-            db.session.commit()
+            db.session.flush()
             
-            return jsonify({
-                "message": "Message sent successfully",
-                "message_id": message.message_id,
-                "timestamp": message.timestamp.isoformat()
-            }), 201
+            # Keep the inbox summary in the same transaction as the message
+            ConversationSummary.record_message(db.session, message)
+            db.session.commit()
             
         except Exception as e:
             db.session.rollback()
             print(f"Error sending message: {str(e)}")
             return jsonify({"error": f"Failed to send message: {str(e)}"}), 500
+        
+        # The message is stored: a failing counter or broker must not make the
+        # client resend it, the counter reconciles and clients catch up over REST
+        try:
+            unread_message_counts.add(int(message.receiver_id), 1)
+            
+            # Push to connected clients of both users
+            MessagingController.publish_message(message)
+        except Exception as e:
+            print(f"Error publishing message {message.message_id}: {str(e)}")
+        
+        return jsonify({
+            "message": "Message sent successfully",
+            "message_id": message.message_id,
+            "timestamp": message.timestamp.isoformat()
+        }), 201
+
+    @staticmethod
+    def publish_message(message):
+        """
+        Publish a stored message to the real-time streams of its sender and receiver,
+        along with the receiver's unread-count change
+        """
+        broker = get_broker()
+        data = {
+            "id": message.message_id,
+            "content": message.content,
+            "timestamp": message.timestamp.isoformat(),
+            "is_read": message.is_read
+        }
+        broker.publish(message.receiver_id, "message", dict(data, contact_id=int(message.sender_id), is_sent=False))
+        broker.publish(message.receiver_id, "unread", {"contact_id": int(message.sender_id), "delta": 1})
+        # The sender's other open tabs
+        broker.publish(message.sender_id, "message", dict(data, contact_id=int(message.receiver_id), is_sent=True))
 
     @staticmethod
     @jwt_required()
     def mark_messages_as_read(contact_id):
         """
-        Mark all messages from a specific contact as read
+        Mark messages from a specific contact as read with a single UPDATE
+        
+        Request body (optional):
+        {
+            "up_to_message_id": int  # Only mark messages up to and including this one
+        }
         """
         current_user_id = get_jwt_identity()
-        current_user = User.query.get(current_user_id)
+        current_user = get_current_user()
         
         if not current_user:
             return jsonify({"error": "User not found"}), 404
             
+        data = request.get_json(silent=True) or {}
+        up_to_message_id = data.get('up_to_message_id')
+        if up_to_message_id is not None:
+            try:
+                up_to_message_id = int(up_to_message_id)
+            except (ValueError, TypeError):
+                return jsonify({"error": "up_to_message_id must be an integer"}), 400
+            
         try:
-            # Find all unread messages from the contact
+            # Flip every unread message from the contact in one statement
             unread_messages = Message.query.filter(
                 Message.sender_id == contact_id,
                 Message.receiver_id == current_user_id,
                 Message.is_read == False
-            ).all()
+            )
+            if up_to_message_id is not None:
+                unread_messages = unread_messages.filter(Message.message_id <= up_to_message_id)
+            count = unread_messages.update({Message.is_read: True}, synchronize_session=False)
             
-            # Update each message
-            for message in unread_messages:
-                message.is_read = True
-                
+            # Subtract what was marked; newer messages may have arrived meanwhile
+            ConversationSummary.mark_read(db.session, current_user_id, contact_id, count)
             db.session.commit()
             
-            return jsonify({
-                "message": f"Marked {len(unread_messages)} messages as read",
-                "count": len(unread_messages)
-            }), 200
-            
         except Exception as e:
             db.session.rollback()
             print(f"Error marking messages as read: {str(e)}")
             return jsonify({"error": f"Failed to mark messages as read: {str(e)}"}), 500
+        
+        # The messages are marked; counter and broker failures are only logged
+        if count:
+            try:
+                unread_message_counts.add(int(current_user_id), -count)
+                get_broker().publish(current_user_id, "unread", {"contact_id": int(contact_id), "delta": -count})
+            except Exception as e:
+                print(f"Error publishing read messages of user {current_user_id}: {str(e)}")
+        
+        return jsonify({
+            "message": f"Marked {count} messages as read",
+            "count": count
+        }), 200
 
     @staticmethod
     @jwt_required()
     def get_unread_message_count():
         """
-        Get the count of unread messages for the current user
+        Get the count of unread messages for the current user.
+        Served from the unread counter cache; the database is only counted on a
+        miss or when the counter is due for reconciliation.
         """
         current_user_id = get_jwt_identity()
         
         try:
-            # Count unread messages
-            unread_count = Message.query.filter(
-                Message.receiver_id == current_user_id,
-                Message.is_read == False
-            ).count()
+            unread_count = unread_message_counts.get(int(current_user_id))
             
             return jsonify({
                 "unread_count": unread_count
@@ -363,9 +514,15 @@ class MessagingController:
     @jwt_required()
     def get_conversations():
         """
-        Get all conversation summaries for the current user
-        Returns a list of users that the current user has exchanged messages with
-        and the latest message in each conversation
+        Get a page of conversation summaries for the current user, newest first.
+        Each entry is the other user together with the latest message and the number
+        of unread messages from them, read from the conversation summary table.
+        Pages are keyset ranges of the per-side inbox indexes; "paging.before" loads
+        the next page.
+        
+        Query parameters:
+            per_page: Conversations per page (default 50, max 100)
+            before: Cursor from the previous page's paging.before
         """
         current_user_id = get_jwt_identity()
         # Ensure current_user_id is an integer
@@ -375,88 +532,67 @@ class MessagingController:
             print(f"Invalid user ID format: {current_user_id}")
             return jsonify({"error": "Invalid user ID format"}), 400
             
-        current_user = User.query.get(current_user_id)
+        current_user = get_current_user()
         
         if not current_user:
             return jsonify({"error": "User not found"}), 404
             
         try:
-            # Get all users the current user has exchanged messages with
-            # This is a bit complex as we need to get both sent and received messages
-            
-            # First, get all users the current user has sent messages to
-            sent_to_users = db.session.query(Message.receiver_id.distinct()).filter(
-                Message.sender_id == current_user_id
-            ).all()
-            sent_to_user_ids = [int(user[0]) for user in sent_to_users]
-            
-            # Then, get all users who have sent messages to the current user
-            received_from_users = db.session.query(Message.sender_id.distinct()).filter(
-                Message.receiver_id == current_user_id
-            ).all()
-            received_from_user_ids = [int(user[0]) for user in received_from_users]
-            
-            # Combine and deduplicate
-            conversation_user_ids = list(set(sent_to_user_ids + received_from_user_ids))
-            
-            if not conversation_user_ids:
-                return jsonify({"conversations": []}), 200
-                
-            # Get user objects
-            conversation_users = User.query.filter(User.user_id.in_(conversation_user_ids)).all()
+            per_page = request.args.get('per_page', MessagingController.DEFAULT_CONTACTS_PER_PAGE, type=int)
+            per_page = min(max(per_page, 1), MessagingController.MAX_CONTACTS_PER_PAGE)
+            before = request.args.get('before')
             
-            conversations = []
+            try:
+                before_position = ConversationSummary.decode_cursor(before) if before else None
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
             
-            for user in conversation_users:
-                # Ensure user_id is an integer
-                user_id = int(user.user_id)
-                
-                # Get the latest message between these users
-                latest_message = Message.query.filter(
-                    or_(
-                        and_(Message.sender_id == current_user_id, Message.receiver_id == user_id),
-                        and_(Message.sender_id == user_id, Message.receiver_id == current_user_id)
-                    )
-                ).order_by(Message.timestamp.desc()).first()
-                
-                if not latest_message:
-                    continue
-                    
-                # Count unread messages from this user
-                unread_count = Message.query.filter(
-                    Message.sender_id == user_id,
-                    Message.receiver_id == current_user_id,
-                    Message.is_read == False
-                ).count()
-                
+            # One row past the page tells whether there is another one
+            entries = ConversationSummary.inbox_page(current_user_id, per_page + 1, before_position)
+            has_more = len(entries) > per_page
+            entries = entries[:per_page]
+            
+            partner_ids = [partner_id for _, partner_id in entries]
+            users = {user.user_id: user for user in User.query.filter(User.user_id.in_(partner_ids)).all()} if partner_ids else {}
+            rows = [(summary, users[partner_id]) for summary, partner_id in entries if partner_id in users]
+            
+            conversations = []
+            for summary, user in rows:
                 # Format user name based on role
                 user_name = f"{user.first_name} {user.last_name}"
-                if user.role in [UserRole.DOCTOR, UserRole.SURGEON, UserRole.THERAPIST]:
+                if user.role in MessagingController.DOCTOR_ROLES:
                     user_name = f"Dr. {user.first_name} {user.last_name}"
                 elif user.role == UserRole.NURSE:
                     user_name = f"Nurse {user.first_name} {user.last_name}"
                 
+                is_sent = summary.last_sender_id == current_user_id
                 conversations.append({
-                    "user_id": user_id,
+                    "user_id": user.user_id,
                     "name": user_name,
                     "role": user.role.name,
                     "latest_message": {
-                        "id": latest_message.message_id,
-                        "content": latest_message.content[:50] + ('...' if len(latest_message.content) > 50 else ''),
-                        "timestamp": latest_message.timestamp.isoformat(),
-                        "is_sent": latest_message.sender_id == current_user_id,
-                        "is_read": latest_message.is_read
+                        "id": summary.last_message_id,
+                        "content": summary.last_message_preview,
+                        "timestamp": summary.last_message_at.isoformat(),
+                        "is_sent": is_sent,
+                        # Messages are read oldest first, so the latest is read once its receiver has nothing unread
+                        "is_read": summary.unread_for(user.user_id if is_sent else current_user_id) == 0
                     },
-                    "unread_count": unread_count
+                    "unread_count": summary.unread_for(current_user_id)
                 })
             
-            # Sort by latest message timestamp, newest first
-            conversations.sort(key=lambda x: x["latest_message"]["timestamp"], reverse=True)
-            
-            return jsonify({"conversations": conversations}), 200
+            last_summary, last_partner_id = entries[-1] if entries else (None, None)
+            return jsonify({
+                "conversations": conversations,
+                "paging": {
+                    "per_page": per_page,
+                    "before": ConversationSummary.encode_cursor(last_summary.last_message_at, last_partner_id) if has_more else None,
+                    "has_more": has_more
+                }
+            }), 200
             
         except Exception as e:
             error_traceback = traceback.format_exc()
             print(f"Error getting conversations: {str(e)}")
             print(f"Traceback: {error_traceback}")
-            return jsonify({"error": f"Failed to get conversations: {str(e)}"}), 500
\ No newline at end of file
+            return jsonify({"error": f"Failed to get conversations: {str(e)}"}), 500
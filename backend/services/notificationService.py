@@ -3,32 +3,105 @@ from flask_jwt_extended import jwt_required, get_jwt_identity
 from datetime import datetime
 from services.db import db
 from models import User, Notification
-from sqlalchemy import desc
+from services.cache import CounterCache, counter_cache_url
+from services.requestCache import get_current_user
+from sqlalchemy import desc, event
+from sqlalchemy.orm import Session
+
+def _count_unread_notifications(user_id):
+    return Notification.query.filter(
+        Notification.user_id == user_id,
+        Notification.is_read == False
+    ).count()
+
+
+# Unread notifications per user. Notifications added through the ORM are counted
+# by the events below once their transaction commits; bulk inserts and the
+# mark-read endpoints call add() themselves.
+unread_notification_counts = CounterCache(
+    "unread_notifications", _count_unread_notifications, reconcile_seconds=300,
+    redis_url=counter_cache_url()
+)
+
+
+@event.listens_for(Notification, 'after_insert')
+def _note_new_notification(mapper, connection, target):
+    if not target.is_read:
+        session = Session.object_session(target)
+        session.info.setdefault('new_unread_notifications', []).append(target.user_id)
+
+
+@event.listens_for(Session, 'after_commit')
+def _count_committed_notifications(session):
+    for user_id in session.info.pop('new_unread_notifications', []):
+        unread_notification_counts.add(user_id, 1)
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _forget_rolled_back_notifications(session, previous_transaction):
+    session.info.pop('new_unread_notifications', None)
+
 
 class NotificationController:
+
+    # Page size limits for the notification list
+    DEFAULT_NOTIFICATIONS_PER_PAGE = 50
+    MAX_NOTIFICATIONS_PER_PAGE = 100
+
     @staticmethod
     @jwt_required()
     def get_user_notifications():
         """
-        Get all notifications for the current user
+        Get one page of the current user's notifications, newest first
+        
+        Query parameters:
+            before: Cursor; return the page just older than it (optional)
+            limit: Page size (default 50, max 100)
+            is_read: "true" or "false" to list only read or unread notifications (optional)
+            status: Only notifications with this status, e.g. "reminder" (optional)
+        
+        Pages are keyed on (scheduled_time, notification_id), so every page is one
+        index range read however far back it is. "paging.before" loads the next
+        (older) page and is null on the last one. "unread_count" comes from the
+        unread counter cache, so a badge can be rendered from limit=1 without
+        counting the table.
         """
-        # Get the current user
-        current_user_id = get_jwt_identity()
-        current_user = User.query.get(current_user_id)
+        current_user = get_current_user()
         
         if not current_user:
             return jsonify({"error": "User not found"}), 404
             
         # Get query parameters
-        limit = request.args.get('limit', 50, type=int)
-        offset = request.args.get('offset', 0, type=int)
+        limit = request.args.get('limit', NotificationController.DEFAULT_NOTIFICATIONS_PER_PAGE, type=int)
+        limit = min(max(limit, 1), NotificationController.MAX_NOTIFICATIONS_PER_PAGE)
+        before = request.args.get('before')
+        status = request.args.get('status')
+        is_read = request.args.get('is_read')
+        if is_read is not None:
+            if is_read.lower() not in ('true', 'false'):
+                return jsonify({"error": "is_read must be true or false"}), 400
+            is_read = is_read.lower() == 'true'
+        
+        try:
+            before_position = Notification.decode_cursor(before) if before else None
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
         
         # Get notifications for the user
-        notifications = Notification.query.filter_by(
-            user_id=current_user.user_id
-        ).order_by(
-            desc(Notification.scheduled_time)
-        ).limit(limit).offset(offset).all()
+        notifications_query = Notification.query.filter(Notification.user_id == current_user.user_id)
+        if is_read is not None:
+            notifications_query = notifications_query.filter(Notification.is_read == is_read)
+        if status:
+            notifications_query = notifications_query.filter(Notification.status == status)
+        if before_position:
+            notifications_query = notifications_query.filter(Notification.before_position(*before_position))
+        
+        # Fetch one extra row to learn whether another page follows
+        notifications = notifications_query.order_by(
+            desc(Notification.scheduled_time), desc(Notification.notification_id)
+        ).limit(limit + 1).all()
+        has_more = len(notifications) > limit
+        notifications = notifications[:limit]
         
         # Format the notifications data
         notifications_list = []
@@ -37,15 +110,40 @@ class NotificationController:
                 "notification_id": notification.notification_id,
                 "message": notification.message,
                 "scheduled_time": notification.scheduled_time.isoformat(),
-                "is_read": getattr(notification, 'is_read', False),
+                "is_read": bool(notification.is_read),
+                "status": notification.status,
                 "appointment_id": notification.appointment_id
             })
             
         return jsonify({
             "user_id": current_user.user_id,
             "notifications": notifications_list,
-            "count": len(notifications_list)
+            "count": len(notifications_list),
+            "unread_count": unread_notification_counts.get(current_user.user_id),
+            "paging": {
+                "limit": limit,
+                "before": Notification.encode_cursor(notifications[-1]) if has_more else None,
+                "has_more": has_more
+            }
         }), 200
+
+    @staticmethod
+    @jwt_required()
+    def get_unread_notification_count():
+        """
+        Get the count of unread notifications for the current user.
+        Served from the unread counter cache; the database is only counted on a
+        miss or when the counter is due for reconciliation.
+        """
+        current_user_id = get_jwt_identity()
+        
+        try:
+            return jsonify({
+                "unread_count": unread_notification_counts.get(int(current_user_id))
+            }), 200
+        except Exception as e:
+            print(f"Error getting unread notification count: {str(e)}")
+            return jsonify({"error": f"Failed to get unread notification count: {str(e)}"}), 500
     
     @staticmethod
     @jwt_required()
@@ -55,37 +153,83 @@ class NotificationController:
         """
         # Get the current user
         current_user_id = get_jwt_identity()
-        current_user = User.query.get(current_user_id)
+        current_user = get_current_user()
         
         if not current_user:
             return jsonify({"error": "User not found"}), 404
             
-        # Get the notification
-        notification = Notification.query.get(notification_id)
+        try:
+            # Update in place; only the owner's unread notification can match
+            updated = Notification.query.filter(
+                Notification.notification_id == notification_id,
+                Notification.user_id == current_user.user_id,
+                Notification.is_read == False
+            ).update({Notification.is_read: True}, synchronize_session=False)
+            
+            if not updated:
+                # Tell a missing notification apart from someone else's (or one already read)
+                owner = db.session.query(Notification.user_id).filter(
+                    Notification.notification_id == notification_id
+                ).first()
+                if not owner:
+                    return jsonify({"error": "Notification not found"}), 404
+                if owner.user_id != current_user.user_id:
+                    return jsonify({"error": "Unauthorized to access this notification"}), 403
+                
+            db.session.commit()
+            if updated:
+                unread_notification_counts.add(current_user.user_id, -1)
+            return jsonify({
+                "message": "Notification marked as read",
+                "notification_id": notification_id
+            }), 200
+        except Exception as e:
+            db.session.rollback()
+            return jsonify({"error": f"Failed to update notification: {str(e)}"}), 500
+
+    @staticmethod
+    @jwt_required()
+    def mark_all_notifications_read():
+        """
+        Mark all of the current user's notifications as read with a single UPDATE
+        
+        Request body (optional):
+        {
+            "up_to_notification_id": int  # Only mark notifications up to and including this one
+        }
+        """
+        # Get the current user
+        current_user_id = get_jwt_identity()
+        current_user = get_current_user()
         
-        if not notification:
-            return jsonify({"error": "Notification not found"}), 404
+        if not current_user:
+            return jsonify({"error": "User not found"}), 404
             
-        # Check if the notification belongs to the current user
-        if notification.user_id != current_user.user_id:
-            return jsonify({"error": "Unauthorized to access this notification"}), 403
+        data = request.get_json(silent=True) or {}
+        up_to_notification_id = data.get('up_to_notification_id')
+        if up_to_notification_id is not None:
+            try:
+                up_to_notification_id = int(up_to_notification_id)
+            except (ValueError, TypeError):
+                return jsonify({"error": "up_to_notification_id must be an integer"}), 400
             
-        # Mark as read (check if the column exists first)
-        if hasattr(notification, 'is_read'):
-            notification.is_read = True
+        try:
+            unread_notifications = Notification.query.filter(
+                Notification.user_id == current_user.user_id,
+                Notification.is_read == False
+            )
+            if up_to_notification_id is not None:
+                unread_notifications = unread_notifications.filter(
+                    Notification.notification_id <= up_to_notification_id
+                )
+            count = unread_notifications.update({Notification.is_read: True}, synchronize_session=False)
+            db.session.commit()
+            unread_notification_counts.add(current_user.user_id, -count)
             
-            try:
-                db.session.commit()
-                return jsonify({
-                    "message": "Notification marked as read",
-                    "notification_id": notification.notification_id
-                }), 200
-            except Exception as e:
-                db.session.rollback()
-                return jsonify({"error": f"Failed to update notification: {str(e)}"}), 500
-        else:
-            # If is_read doesn't exist, just return success anyway
             return jsonify({
-                "message": "Notification processed (is_read field not available)",
-                "notification_id": notification.notification_id
-            }), 200
\ No newline at end of file
+                "message": f"Marked {count} notifications as read",
+                "count": count
+            }), 200
+        except Exception as e:
+            db.session.rollback()
+            return jsonify({"error": f"Failed to update notifications: {str(e)}"}), 500
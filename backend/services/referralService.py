@@ -3,6 +3,7 @@ from flask_jwt_extended import jwt_required, get_jwt_identity
 from datetime import datetime
 from services.db import db
 from models import User, Doctor, Patient, Referral, Notification, UserRole
+from services.requestCache import get_current_user, get_user, get_patient, get_doctor
 from sqlalchemy import desc, or_
 
 class ReferralController:
@@ -27,7 +28,7 @@ class ReferralController:
         """
         # Get the current user (referring doctor)
         current_user_id = get_jwt_identity()
-        current_user = User.query.get(current_user_id)
+        current_user = get_current_user()
         
         if not current_user:
             return jsonify({"error": "User not found"}), 404
@@ -49,12 +50,12 @@ class ReferralController:
             return jsonify({"error": "Missing required fields: patient_id, specialist_id, reason"}), 400
             
         # Check if patient exists
-        patient = Patient.query.get(patient_id)
+        patient = get_patient(patient_id)
         if not patient:
             return jsonify({"error": "Patient not found"}), 404
             
         # Check if specialist exists and is a doctor
-        specialist = User.query.get(specialist_id)
+        specialist = get_user(specialist_id)
         if not specialist:
             return jsonify({"error": "Specialist not found"}), 404
             
@@ -62,8 +63,8 @@ class ReferralController:
             return jsonify({"error": "The specified user is not a medical specialist"}), 400
             
         # Get doctor records
-        referring_doctor = Doctor.query.get(current_user.user_id)
-        specialist_doctor = Doctor.query.get(specialist_id)
+        referring_doctor = get_doctor(current_user.user_id)
+        specialist_doctor = get_doctor(specialist_id)
         
         if not referring_doctor:
             return jsonify({"error": "Referring doctor record not found"}), 404
@@ -123,7 +124,7 @@ class ReferralController:
         """
         # Get the current user
         current_user_id = get_jwt_identity()
-        current_user = User.query.get(current_user_id)
+        current_user = get_current_user()
         
         if not current_user:
             return jsonify({"error": "User not found"}), 404
@@ -163,8 +164,8 @@ class ReferralController:
         referrals_list = []
         for referral in referrals:
             # Get related records
-            patient = Patient.query.get(referral.patient_id)
-            referring_doctor = User.query.get(referral.referring_doctor_id)
+            patient = get_patient(referral.patient_id)
+            referring_doctor = get_user(referral.referring_doctor_id)
             
             referrals_list.append({
                 "referral_id": referral.referral_id,
@@ -199,7 +200,7 @@ class ReferralController:
         """
         # Get the current user
         current_user_id = get_jwt_identity()
-        current_user = User.query.get(current_user_id)
+        current_user = get_current_user()
         
         if not current_user:
             return jsonify({"error": "User not found"}), 404
@@ -233,8 +234,8 @@ class ReferralController:
         referrals_list = []
         for referral in referrals:
             # Get related records
-            patient = Patient.query.get(referral.patient_id)
-            specialist = User.query.get(referral.specialist_id)
+            patient = get_patient(referral.patient_id)
+            specialist = get_user(referral.specialist_id)
             
             referrals_list.append({
                 "referral_id": referral.referral_id,
@@ -268,7 +269,7 @@ class ReferralController:
         """
         # Get the current user
         current_user_id = get_jwt_identity()
-        current_user = User.query.get(current_user_id)
+        current_user = get_current_user()
         
         if not current_user:
             return jsonify({"error": "User not found"}), 404
@@ -292,9 +293,9 @@ class ReferralController:
             db.session.commit()
             
         # Get related records
-        patient = Patient.query.get(referral.patient_id)
-        referring_doctor = User.query.get(referral.referring_doctor_id)
-        specialist = User.query.get(referral.specialist_id)
+        patient = get_patient(referral.patient_id)
+        referring_doctor = get_user(referral.referring_doctor_id)
+        specialist = get_user(referral.specialist_id)
         
         return jsonify({
             "referral_id": referral.referral_id,
@@ -336,7 +337,7 @@ class ReferralController:
         """
         # Get the current user
         current_user_id = get_jwt_identity()
-        current_user = User.query.get(current_user_id)
+        current_user = get_current_user()
         
         if not current_user:
             return jsonify({"error": "User not found"}), 404
@@ -385,14 +386,14 @@ class ReferralController:
                 # Notify referring doctor
                 notification_recipient = referral.referring_doctor_id
                 notification_doctor_name = current_user.full_name()
-                other_doctor_name = User.query.get(referral.referring_doctor_id).full_name() if User.query.get(referral.referring_doctor_id) else "Unknown"
+                other_doctor_name = get_user(referral.referring_doctor_id).full_name() if get_user(referral.referring_doctor_id) else "Unknown"
             else:
                 # Notify specialist
                 notification_recipient = referral.specialist_id
                 notification_doctor_name = current_user.full_name()
-                other_doctor_name = User.query.get(referral.specialist_id).full_name() if User.query.get(referral.specialist_id) else "Unknown"
+                other_doctor_name = get_user(referral.specialist_id).full_name() if get_user(referral.specialist_id) else "Unknown"
                 
-            patient_name = Patient.query.get(referral.patient_id).full_name() if Patient.query.get(referral.patient_id) else "Unknown"
+            patient_name = get_patient(referral.patient_id).full_name() if get_patient(referral.patient_id) else "Unknown"
                 
             notification = Notification(
                 user_id=notification_recipient,
@@ -423,13 +424,13 @@ class ReferralController:
         """
         # Get the current user
         current_user_id = get_jwt_identity()
-        current_user = User.query.get(current_user_id)
+        current_user = get_current_user()
         
         if not current_user:
             return jsonify({"error": "User not found"}), 404
             
         # Check if the patient exists
-        patient = Patient.query.get(patient_id)
+        patient = get_patient(patient_id)
         if not patient:
             return jsonify({"error": "Patient not found"}), 404
             
@@ -451,7 +452,7 @@ class ReferralController:
             
             # If not involved in any referrals for this patient, check if they're the patient's assigned doctor
             if involved_referrals_count == 0:
-                patient_record = Patient.query.get(patient_id)
+                patient_record = get_patient(patient_id)
                 if not patient_record or patient_record.doctor_id != doctor_id:
                     return jsonify({"error": "Unauthorized to view this patient's referrals"}), 403
         
@@ -465,8 +466,8 @@ class ReferralController:
         referrals_list = []
         for referral in referrals:
             # Get related doctors
-            referring_doctor = User.query.get(referral.referring_doctor_id)
-            specialist = User.query.get(referral.specialist_id)
+            referring_doctor = get_user(referral.referring_doctor_id)
+            specialist = get_user(referral.specialist_id)
             
             referrals_list.append({
                 "referral_id": referral.referral_id,
@@ -501,7 +502,7 @@ class ReferralController:
         """
         # Get the current user
         current_user_id = get_jwt_identity()
-        current_user = User.query.get(current_user_id)
+        current_user = get_current_user()
         
         if not current_user:
             return jsonify({"error": "User not found"}), 404
@@ -561,7 +562,7 @@ class ReferralController:
         """
         # Get the current user
         current_user_id = get_jwt_identity()
-        current_user = User.query.get(current_user_id)
+        current_user = get_current_user()
         
         if not current_user:
             return jsonify({"error": "User not found"}), 404
@@ -606,7 +607,7 @@ class ReferralController:
             # Create notification for the recipient
             notification = Notification(
                 user_id=recipient_id,
-                message=f"New message from Dr. {current_user.full_name()} regarding referral for {Patient.query.get(referral.patient_id).full_name() if Patient.query.get(referral.patient_id) else 'Unknown'}",
+                message=f"New message from Dr. {current_user.full_name()} regarding referral for {get_patient(referral.patient_id).full_name() if get_patient(referral.patient_id) else 'Unknown'}",
                 scheduled_time=datetime.now()
             )
             
@@ -2,126 +2,321 @@ from flask import request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from datetime import datetime, timedelta
 from services.db import db
-from models import User, Patient, Appointment, Notification, UserRole
-from sqlalchemy import and_, or_, func
+from models import User, Patient, Appointment, Notification, UserRole, AppointmentReminder
+from services.requestCache import get_current_user, get_user, get_patient
+from sqlalchemy import and_, or_, func, select, literal, union_all, insert
+from sqlalchemy.orm import aliased
+from sqlalchemy.exc import IntegrityError
+from services.schedulerService import job_handler, schedule_job
+from services.notificationService import unread_notification_counts
+
+class ReminderService:
+    """
+    Set-based appointment reminders. One query finds every (appointment, reminder
+    kind) pair that is due and not yet in the AppointmentReminder ledger; the
+    ledger rows and notifications are then bulk-inserted together in batches.
+    Runs are idempotent: a pair is recorded once, and a concurrent run that
+    races for the same pairs fails its batch on the ledger's primary key.
+    """
+    # Reminder kind -> how long before the appointment it is due. Each appointment
+    # gets the kind whose window it falls in, measured from the next shorter kind.
+    REMINDER_KINDS = {
+        "two_hours": timedelta(hours=2),
+        "day_before": timedelta(hours=24),
+    }
+    # Due reminders are sent up to this long ahead, so a run every LOOKAHEAD keeps up
+    LOOKAHEAD = timedelta(minutes=30)
+    BATCH_SIZE = 1000
+
+    @staticmethod
+    def due_reminders_query(now):
+        """Every due, unsent (appointment, kind) pair with the names needed for the messages"""
+        patient_user = aliased(User)
+        doctor_user = aliased(User)
+
+        selects = []
+        lower = now
+        for kind, lead in sorted(ReminderService.REMINDER_KINDS.items(), key=lambda item: item[1]):
+            upper = now + lead + ReminderService.LOOKAHEAD
+            sent = and_(
+                AppointmentReminder.appointment_id == Appointment.appointment_id,
+                AppointmentReminder.kind == kind,
+                AppointmentReminder.appointment_time == Appointment.date_time
+            )
+            selects.append(
+                select(
+                    Appointment.appointment_id,
+                    Appointment.date_time,
+                    Appointment.patient_id,
+                    Patient.caregiver_id,
+                    patient_user.first_name.label("patient_first_name"),
+                    patient_user.last_name.label("patient_last_name"),
+                    doctor_user.first_name.label("doctor_first_name"),
+                    doctor_user.last_name.label("doctor_last_name"),
+                    literal(kind).label("kind")
+                )
+                .join(Patient, Patient.patient_id == Appointment.patient_id)
+                .join(patient_user, patient_user.user_id == Appointment.patient_id)
+                .join(doctor_user, doctor_user.user_id == Appointment.doctor_id)
+                .outerjoin(AppointmentReminder, sent)
+                .where(
+                    Appointment.date_time > lower,
+                    Appointment.date_time <= upper,
+                    AppointmentReminder.appointment_id.is_(None)
+                )
+            )
+            lower = upper
+        return union_all(*selects)
+
+    @staticmethod
+    def time_until(delta):
+        """How far ahead an appointment is, e.g. 'in 40 minutes' or 'in 2 hours 10 minutes'"""
+        minutes = max(round(delta.total_seconds() / 60), 0)
+        if minutes == 0:
+            return "starting now"
+        hours, minutes = divmod(minutes, 60)
+        parts = []
+        if hours:
+            parts.append(f"{hours} hour{'s' if hours != 1 else ''}")
+        if minutes:
+            parts.append(f"{minutes} minute{'s' if minutes != 1 else ''}")
+        return "in " + " ".join(parts)
+
+    @staticmethod
+    def reminder_messages(row, now):
+        """
+        (patient message, caregiver message) for a due reminder row. The short
+        reminder says how far ahead the appointment actually is: a run catching up
+        can send it for an appointment well under two hours away.
+        """
+        doctor = f"Dr. {row.doctor_first_name} {row.doctor_last_name}"
+        if row.kind == "two_hours":
+            when = f"{ReminderService.time_until(row.date_time - now)} at {row.date_time.strftime('%H:%M')}"
+        else:
+            when = f"on {row.date_time.strftime('%Y-%m-%d at %H:%M')}"
+        return (
+            f"Reminder: Your appointment with {doctor} is {when}.",
+            f"Reminder: Your patient {row.patient_first_name} {row.patient_last_name} has an appointment with {doctor} {when}."
+        )
+
+    @staticmethod
+    def send_due_reminders(now=None):
+        """
+        Create the notifications of every due reminder and record them in the ledger.
+
+        Args:
+            now: Reference time (defaults to the current time)
+
+        Returns:
+            dict: Counts of patient and caregiver notifications created and of
+            batches skipped because another run had already claimed them
+        """
+        now = now or datetime.now()
+        rows = db.session.execute(ReminderService.due_reminders_query(now)).all()
+
+        counts = {"patient_notifications": 0, "caregiver_notifications": 0, "skipped_batches": 0}
+        for offset in range(0, len(rows), ReminderService.BATCH_SIZE):
+            batch = rows[offset:offset + ReminderService.BATCH_SIZE]
+            ledger = []
+            notifications = []
+            caregiver_count = 0
+            for row in batch:
+                ledger.append({
+                    "appointment_id": row.appointment_id,
+                    "kind": row.kind,
+                    "appointment_time": row.date_time,
+                    "sent_at": now
+                })
+                patient_message, caregiver_message = ReminderService.reminder_messages(row, now)
+                notifications.append({
+                    "user_id": row.patient_id,
+                    "appointment_id": row.appointment_id,
+                    "message": patient_message,
+                    "scheduled_time": now,
+                    "is_read": False,
+                    "status": "reminder"
+                })
+                if row.caregiver_id:
+                    notifications.append({
+                        "user_id": row.caregiver_id,
+                        "appointment_id": row.appointment_id,
+                        "message": caregiver_message,
+                        "scheduled_time": now,
+                        "is_read": False,
+                        "status": "reminder"
+                    })
+                    caregiver_count += 1
+
+            try:
+                db.session.execute(insert(AppointmentReminder), ledger)
+                db.session.execute(insert(Notification), notifications)
+                db.session.commit()
+            except IntegrityError:
+                # Another run sent (some of) these reminders first
+                db.session.rollback()
+                counts["skipped_batches"] += 1
+                continue
+            # Bulk inserts bypass the ORM events that keep the unread counters current
+            for notification in notifications:
+                unread_notification_counts.add(notification["user_id"], 1)
+            counts["patient_notifications"] += len(batch)
+            counts["caregiver_notifications"] += caregiver_count
+
+        counts["notifications_created"] = counts["patient_notifications"] + counts["caregiver_notifications"]
+        return counts
+
+    # Most patients a single opening is offered to
+    AVAILABILITY_FANOUT_LIMIT = 50
+
+    @staticmethod
+    def availability_targets_query(doctor_id, opening, exclude_patient_id=None, limit=None):
+        """
+        Patients who could move an upcoming appointment with the doctor up to an opening.
+
+        One row per patient: their next appointment with the doctor after the opening.
+        Patients who would gain the most time (the latest next appointment) come first,
+        and at most limit rows are returned.
+
+        Returns:
+            Select: (patient_id, appointment_id, date_time) rows
+        """
+        next_visit = (
+            select(Appointment.patient_id, func.min(Appointment.date_time).label("next_time"))
+            .where(Appointment.doctor_id == doctor_id, Appointment.date_time > opening)
+            .group_by(Appointment.patient_id)
+        )
+        if exclude_patient_id:
+            next_visit = next_visit.where(Appointment.patient_id != exclude_patient_id)
+        next_visit = (
+            next_visit
+            .order_by(func.min(Appointment.date_time).desc(), Appointment.patient_id)
+            .limit(limit or ReminderService.AVAILABILITY_FANOUT_LIMIT)
+            .subquery()
+        )
+        # (doctor_id, date_time) is unique, so this finds exactly one appointment per patient
+        return select(Appointment.patient_id, Appointment.appointment_id, Appointment.date_time).join(
+            next_visit,
+            and_(
+                Appointment.patient_id == next_visit.c.patient_id,
+                Appointment.doctor_id == doctor_id,
+                Appointment.date_time == next_visit.c.next_time
+            )
+        )
+
+    @staticmethod
+    def notify_availability(doctor_id, opening, exclude_patient_id=None, now=None):
+        """
+        Offer an opening in a doctor's schedule to the patients best placed to take it.
+
+        The notifications are created by a single INSERT ... SELECT over
+        availability_targets_query, so no rows are loaded into the application.
+
+        Args:
+            doctor_id: The doctor with the opening
+            opening: datetime of the freed slot (a date means the whole day)
+            exclude_patient_id: Patient who freed the slot
+            now: Reference time (defaults to the current time)
+
+        Returns:
+            int: Number of notifications created
+        """
+        doctor = get_user(doctor_id)
+        if not doctor:
+            return 0
+
+        if isinstance(opening, datetime):
+            when = opening.strftime('%Y-%m-%d at %H:%M')
+        else:
+            when = opening.strftime('%Y-%m-%d')
+            # Only appointments after that day can move up into it
+            opening = datetime.combine(opening, datetime.max.time())
+
+        targets = ReminderService.availability_targets_query(doctor_id, opening, exclude_patient_id).subquery()
+        message = (
+            f"Earlier appointment available: Dr. {doctor.first_name} {doctor.last_name} has an opening "
+            f"on {when} due to a cancellation. Contact the clinic to move your appointment up."
+        )
+        recipients = db.session.execute(
+            insert(Notification).from_select(
+                ["user_id", "appointment_id", "message", "scheduled_time", "is_read", "status"],
+                select(
+                    targets.c.patient_id,
+                    targets.c.appointment_id,
+                    literal(message),
+                    literal(now or datetime.now()),
+                    literal(False),
+                    literal("availability")
+                )
+            ).returning(Notification.user_id)
+        ).scalars().all()
+        db.session.commit()
+        for user_id in recipients:
+            unread_notification_counts.add(user_id, 1)
+        return len(recipients)
+
+
+@job_handler("send_reminders")
+def send_reminders_job(payload):
+    counts = ReminderService.send_due_reminders()
+    if counts["notifications_created"]:
+        print(f"Sent {counts['notifications_created']} appointment reminders")
+
+
+@job_handler("notify_availability")
+def notify_availability_job(payload):
+    if payload.get("slot_time"):
+        opening = datetime.strptime(payload["slot_time"], "%Y-%m-%d %H:%M")
+    else:
+        opening = datetime.strptime(payload["appointment_date"], "%Y-%m-%d").date()
+    created = ReminderService.notify_availability(
+        payload["doctor_id"], opening, exclude_patient_id=payload.get("exclude_patient_id")
+    )
+    print(f"Offered an opening of doctor {payload['doctor_id']} to {created} patients")
+
 
 class ReminderController:
     @staticmethod
     @jwt_required()
     def schedule_appointment_reminders():
         """
-        Schedule reminders for upcoming appointments
-        This endpoint is expected to be triggered by a cron job or scheduler
+        Send the reminders of upcoming appointments that are due
+        The background scheduler runs this every 15 minutes; the endpoint triggers a run right away
         
         It creates notifications for:
         1. Patients with upcoming appointments (24h, 2h)
         2. Caregivers for their elderly patients' appointments
-        3. Doctors about their upcoming appointments
+        Reminders already sent are skipped, so the endpoint can be called as often as needed.
         """
-        # Get the current time
-        now = datetime.now()
-        
-        # Define reminder timeframes
-        one_day_from_now = now + timedelta(days=1)
-        two_hours_from_now = now + timedelta(hours=2)
-        
-        # Get all appointments in the next 24 hours that don't have reminders yet
-        upcoming_appointments = Appointment.query.filter(
-            Appointment.date_time > now,
-            Appointment.date_time < one_day_from_now,
-            
-        ).all()
-        
-        notifications_created = 0
-        patient_notifications = 0
-        caregiver_notifications = 0
-        
         try:
-            for appointment in upcoming_appointments:
-                # Get patient and doctor records
-                patient = Patient.query.get(appointment.patient_id)
-                doctor_user = User.query.get(appointment.doctor_id)
-                
-                if not patient or not doctor_user:
-                    continue
-                
-                appointment_time = appointment.date_time
-                formatted_time = appointment_time.strftime('%Y-%m-%d at %H:%M')
-                
-                # Check if we need to create a 24-hour reminder
-                if now <= appointment_time - timedelta(hours=24) <= now + timedelta(minutes=30):
-                    # 24-hour reminder for patient
-                    patient_reminder = Notification(
-                        user_id=appointment.patient_id,
-                        appointment_id=appointment.appointment_id,
-                        message=f"Reminder: Your appointment with Dr. {doctor_user.first_name} {doctor_user.last_name} is tomorrow at {appointment_time.strftime('%H:%M')}.",
-                        scheduled_time=now,
-                        status='reminder'
-                    )
-                    db.session.add(patient_reminder)
-                    patient_notifications += 1
-                    
-                    # If patient has a caregiver, notify them too
-                    if patient.caregiver_id:
-                        caregiver_reminder = Notification(
-                            user_id=patient.caregiver_id,
-                            appointment_id=appointment.appointment_id,
-                            message=f"Reminder: Your patient {patient.full_name()} has an appointment with Dr. {doctor_user.first_name} {doctor_user.last_name} tomorrow at {appointment_time.strftime('%H:%M')}.",
-                            scheduled_time=now,
-                            status='reminder'
-                        )
-                        db.session.add(caregiver_reminder)
-                        caregiver_notifications += 1
-                
-                # Check if we need to create a 2-hour reminder
-                elif now <= appointment_time - timedelta(hours=2) <= now + timedelta(minutes=30):
-                    # 2-hour reminder for patient
-                    patient_reminder = Notification(
-                        user_id=appointment.patient_id,
-                        appointment_id=appointment.appointment_id,
-                        message=f"Reminder: Your appointment with Dr. {doctor_user.first_name} {doctor_user.last_name} is in 2 hours at {appointment_time.strftime('%H:%M')}.",
-                        scheduled_time=now,
-                        status='reminder'
-                    )
-                    db.session.add(patient_reminder)
-                    patient_notifications += 1
-                    
-                    # If patient has a caregiver, notify them too
-                    if patient.caregiver_id:
-                        caregiver_reminder = Notification(
-                            user_id=patient.caregiver_id,
-                            appointment_id=appointment.appointment_id,
-                            message=f"Reminder: Your patient {patient.full_name()} has an appointment with Dr. {doctor_user.first_name} {doctor_user.last_name} in 2 hours at {appointment_time.strftime('%H:%M')}.",
-                            scheduled_time=now,
-                            status='reminder'
-                        )
-                        db.session.add(caregiver_reminder)
-                        caregiver_notifications += 1
-                
-            # Commit all notifications
-            db.session.commit()
-            notifications_created = patient_notifications + caregiver_notifications
-            
-            return jsonify({
-                "message": "Reminders scheduled successfully",
-                "notifications_created": notifications_created,
-                "patient_notifications": patient_notifications,
-                "caregiver_notifications": caregiver_notifications
-            }), 200
-            
+            counts = ReminderService.send_due_reminders()
         except Exception as e:
             db.session.rollback()
             return jsonify({"error": f"Failed to schedule reminders: {str(e)}"}), 500
+
+        return jsonify({
+            "message": "Reminders scheduled successfully",
+            **counts
+        }), 200
             
     @staticmethod
     @jwt_required()
     def notify_cancellation_availabilities():
         """
         Notify patients about cancellations and last-minute availabilities
-        This endpoint is expected to be called when an appointment is cancelled
+        This endpoint is expected to be called when an appointment is cancelled.
+        The notifications are sent by a background job; the response carries its ID.
+        
+        Request body:
+        {
+            "doctor_id": int,
+            "appointment_date": "YYYY-MM-DD",
+            "time": "HH:MM"  (optional; without it the whole day counts as open)
+        }
+
+        Patients with a later appointment with the doctor are offered the opening,
+        ranked and capped by ReminderService.availability_targets_query.
         """
-        current_user_id = get_jwt_identity()
-        current_user = User.query.get(current_user_id)
+        current_user = get_current_user()
         
         if not current_user:
             return jsonify({"error": "User not found"}), 404
@@ -134,73 +329,31 @@ class ReminderController:
         data = request.get_json()
         doctor_id = data.get('doctor_id')
         appointment_date = data.get('appointment_date')  # Format: YYYY-MM-DD
-        cancellation_message = data.get('message', 'A slot has opened up due to a cancellation')
-        
         # Validate required fields
         if not doctor_id or not appointment_date:
             return jsonify({"error": "Missing required fields: doctor_id, appointment_date"}), 400
         
         try:
-            # Parse the date
-            date_obj = datetime.strptime(appointment_date, "%Y-%m-%d").date()
-            
-            # Find all cancelled appointments for this doctor and date
-            cancelled_appointments = Appointment.query.filter(
-                Appointment.doctor_id == doctor_id,
-                func.date(Appointment.date_time) == date_obj,
-                
-            ).all()
-            
-            if not cancelled_appointments:
-                return jsonify({
-                    "message": "No cancelled appointments found for this doctor on this date",
-                    "notifications_sent": 0
-                }), 200
-                
-            # Get the doctor's information
-            doctor = User.query.get(doctor_id)
-            if not doctor:
-                return jsonify({"error": "Doctor not found"}), 404
-                
-            # Find patients who might be interested in the available slots
-            # For simplicity, we'll notify patients who have had appointments with this doctor before
-            potential_patients = db.session.query(Patient.patient_id).distinct().join(
-                Appointment, Patient.patient_id == Appointment.patient_id
-            ).filter(
-                Appointment.doctor_id == doctor_id
-            ).all()
-            
-            # Extract patient IDs
-            patient_ids = [p[0] for p in potential_patients]
-            
-            # Create notifications for these patients
-            notifications_sent = 0
-            for patient_id in patient_ids:
-                # Create notification for this patient
-                notification = Notification(
-                    user_id=patient_id,
-                    message=f"Available appointment: Dr. {doctor.first_name} {doctor.last_name} has an opening on {appointment_date} due to a cancellation. Contact the clinic to book this slot.",
-                    scheduled_time=datetime.now(),
-                    status='availability'
-                )
-                db.session.add(notification)
-                notifications_sent += 1
-            
-            # Commit to database
-            db.session.commit()
-            
-            return jsonify({
-                "message": "Availability notifications sent successfully",
-                "notifications_sent": notifications_sent,
-                "doctor_name": f"Dr. {doctor.first_name} {doctor.last_name}",
-                "date": appointment_date
-            }), 200
-            
+            datetime.strptime(appointment_date, "%Y-%m-%d")
         except ValueError:
             return jsonify({"error": "Invalid date format. Use YYYY-MM-DD"}), 400
-        except Exception as e:
-            db.session.rollback()
-            return jsonify({"error": f"Failed to send availability notifications: {str(e)}"}), 500
+
+        payload = {"doctor_id": doctor_id, "appointment_date": appointment_date}
+        if data.get('time'):
+            try:
+                datetime.strptime(data['time'], "%H:%M")
+            except ValueError:
+                return jsonify({"error": "Invalid time format. Use HH:MM"}), 400
+            payload["slot_time"] = f"{appointment_date} {data['time']}"
+
+        if not get_user(doctor_id):
+            return jsonify({"error": "Doctor not found"}), 404
+
+        job = schedule_job("notify_availability", payload)
+        return jsonify({
+            "message": "Availability notifications queued",
+            "job_id": job.job_id
+        }), 202
             
     @staticmethod
     @jwt_required()
@@ -210,7 +363,7 @@ class ReminderController:
         """
         # Get the current user
         current_user_id = get_jwt_identity()
-        current_user = User.query.get(current_user_id)
+        current_user = get_current_user()
         
         if not current_user:
             return jsonify({"error": "User not found"}), 404
@@ -245,8 +398,8 @@ class ReminderController:
         # Format the appointment data
         reminders_list = []
         for appointment in appointments:
-            patient = Patient.query.get(appointment.patient_id)
-            doctor = User.query.get(appointment.doctor_id)
+            patient = get_patient(appointment.patient_id)
+            doctor = get_user(appointment.doctor_id)
             
             reminders_list.append({
                 "appointment_id": appointment.appointment_id,
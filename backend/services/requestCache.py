@@ -0,0 +1,58 @@
+from flask import g, has_request_context
+from flask_jwt_extended import get_jwt_identity
+from services.db import db
+
+
+def get_entity(model, entity_id):
+    """
+    Load a record by primary key, memoized for the life of the current request.
+    Repeated lookups of the same record within a request (including misses) cost
+    one query; outside a request every call goes to the database.
+
+    Args:
+        model: Model class (e.g. User)
+        entity_id: Primary key; strings from the JWT identity are accepted
+
+    Returns:
+        The record, or None if it does not exist
+    """
+    try:
+        entity_id = int(entity_id)
+    except (TypeError, ValueError):
+        return None
+
+    if not has_request_context():
+        return db.session.get(model, entity_id)
+
+    if "_entity_cache" not in g:
+        g._entity_cache = {}
+    key = (model, entity_id)
+    if key not in g._entity_cache:
+        g._entity_cache[key] = db.session.get(model, entity_id)
+    return g._entity_cache[key]
+
+
+def get_user(user_id):
+    """User by ID, memoized per request"""
+    from models.user import User
+    return get_entity(User, user_id)
+
+
+def get_patient(patient_id):
+    """Patient by ID, memoized per request"""
+    from models.patient import Patient
+    return get_entity(Patient, patient_id)
+
+
+def get_doctor(doctor_id):
+    """Doctor by ID, memoized per request"""
+    from models.doctor import Doctor
+    return get_entity(Doctor, doctor_id)
+
+
+def get_current_user():
+    """
+    The authenticated user of the current request (None if the token's user no
+    longer exists). Shares the record already loaded by the JWT user lookup.
+    """
+    return get_user(get_jwt_identity())
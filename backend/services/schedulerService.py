@@ -0,0 +1,421 @@
+import heapq
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from flask import jsonify
+from flask_jwt_extended import jwt_required
+from sqlalchemy import update, func
+from sqlalchemy.exc import IntegrityError
+from services.db import db
+from models import ScheduledJob, UserRole
+from services.requestCache import get_current_user
+
+
+# Job name -> function(payload dict), registered with @job_handler
+_handlers = {}
+
+
+def job_handler(name):
+    """Register a function as the handler of a job name; it runs in an app context"""
+    def register(function):
+        _handlers[name] = function
+        return function
+    return register
+
+
+class JobScheduler:
+    """
+    Runs persisted jobs in this process. A dispatcher thread keeps a heap of
+    (run_at, job_id) and hands due jobs to a small thread pool, so jobs never
+    occupy HTTP workers. Job state lives in the scheduled_jobs table:
+      - a job is claimed with a conditional UPDATE (pending -> running), so several
+        processes can run a scheduler against one database without running a job twice
+      - while a job runs, its process renews heartbeat_at every POLL_SECONDS; only a
+        job whose lease has lapsed (its process is gone) is put back to pending
+      - the heap is refilled from the table every POLL_SECONDS, which picks up jobs
+        scheduled by other processes and anything left over from a restart
+      - failed runs are retried with backoff up to ScheduledJob.MAX_ATTEMPTS
+    """
+    POLL_SECONDS = 30
+    # A "running" job without a heartbeat for this long is assumed lost with its process
+    LEASE_SECONDS = 5 * 60
+    RETRY_BACKOFF_SECONDS = 30
+
+    def __init__(self, app, max_workers=4):
+        self.app = app
+        self.max_workers = max_workers
+        self._heap = []
+        self._queued = set()
+        self._running = 0
+        # Jobs claimed by this process, whose leases it renews
+        self._active = set()
+        self._condition = threading.Condition()
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job-worker")
+        self._stopped = False
+        self._thread = None
+
+    def start(self):
+        """Start the dispatcher thread"""
+        self._thread = threading.Thread(target=self._dispatch, name="job-scheduler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop dispatching; running jobs finish"""
+        with self._condition:
+            self._stopped = True
+            self._condition.notify()
+        self._pool.shutdown(wait=False)
+
+    def push(self, job_id, run_at):
+        """Queue a persisted pending job for its run time"""
+        with self._condition:
+            if job_id in self._queued:
+                return
+            self._queued.add(job_id)
+            heapq.heappush(self._heap, (run_at, job_id))
+            self._condition.notify()
+
+    def local_stats(self):
+        """Queue depth and activity of this process's scheduler"""
+        with self._condition:
+            return {"queued": len(self._heap), "running": self._running, "workers": self.max_workers}
+
+    def _dispatch(self):
+        next_poll = datetime.now()
+        while True:
+            now = datetime.now()
+            if now >= next_poll:
+                try:
+                    self._renew_leases(now)
+                except Exception as e:
+                    print(f"Job scheduler could not renew job leases: {e}")
+                try:
+                    self._load_pending(now)
+                except Exception as e:
+                    print(f"Job scheduler could not load jobs: {e}")
+                next_poll = now + timedelta(seconds=self.POLL_SECONDS)
+
+            due = []
+            with self._condition:
+                if self._stopped:
+                    return
+                while self._heap and self._heap[0][0] <= now:
+                    _, job_id = heapq.heappop(self._heap)
+                    self._queued.discard(job_id)
+                    due.append(job_id)
+                if not due:
+                    wake_at = min(self._heap[0][0], next_poll) if self._heap else next_poll
+                    self._condition.wait(timeout=max((wake_at - now).total_seconds(), 0.01))
+                    continue
+                self._running += len(due)
+
+            for index, job_id in enumerate(due):
+                try:
+                    self._pool.submit(self._run, job_id)
+                except RuntimeError:
+                    # The pool was shut down by stop(); the jobs are still pending in
+                    # the table and are picked up by the next scheduler to poll
+                    with self._condition:
+                        self._running -= len(due) - index
+                    return
+
+    def _renew_leases(self, now):
+        """Move the heartbeat of every job this process is running to now"""
+        with self._condition:
+            active = list(self._active)
+        if not active:
+            return
+        with self.app.app_context():
+            db.session.execute(
+                update(ScheduledJob)
+                .where(ScheduledJob.job_id.in_(active), ScheduledJob.status == 'running')
+                .values(heartbeat_at=now)
+            )
+            db.session.commit()
+
+    def _load_pending(self, now):
+        """Queue every pending job from the table, and release jobs whose lease has lapsed"""
+        with self.app.app_context():
+            db.session.execute(
+                update(ScheduledJob)
+                .where(
+                    ScheduledJob.status == 'running',
+                    ScheduledJob.heartbeat_at < now - timedelta(seconds=self.LEASE_SECONDS)
+                )
+                .values(status='pending')
+            )
+            db.session.commit()
+            pending = db.session.query(ScheduledJob.job_id, ScheduledJob.run_at).filter(
+                ScheduledJob.status == 'pending'
+            ).all()
+        for job_id, run_at in pending:
+            self.push(job_id, run_at)
+
+    def _run(self, job_id):
+        try:
+            with self.app.app_context():
+                self._run_claimed(job_id)
+        except Exception as e:
+            print(f"Job {job_id} could not be run: {e}")
+        finally:
+            with self._condition:
+                self._running -= 1
+
+    def _run_claimed(self, job_id):
+        started_at = datetime.now()
+        claimed = db.session.execute(
+            update(ScheduledJob)
+            .where(ScheduledJob.job_id == job_id, ScheduledJob.status == 'pending')
+            .values(status='running', started_at=started_at, heartbeat_at=started_at,
+                    attempts=ScheduledJob.attempts + 1)
+        ).rowcount
+        db.session.commit()
+        if not claimed:
+            # Another process took it, or it was already run
+            return
+
+        with self._condition:
+            self._active.add(job_id)
+        try:
+            self._finish_claimed(job_id)
+        finally:
+            with self._condition:
+                self._active.discard(job_id)
+
+    def _finish_claimed(self, job_id):
+        job = db.session.get(ScheduledJob, job_id)
+        handler = _handlers.get(job.name)
+        error = None
+        try:
+            if handler is None:
+                raise LookupError(f"No handler registered for job '{job.name}'")
+            handler(job.payload or {})
+        except Exception as e:
+            db.session.rollback()
+            job = db.session.get(ScheduledJob, job_id)
+            error = str(e)
+            print(f"Job {job.name} ({job_id}) failed: {error}")
+
+        now = datetime.now()
+        job.finished_at = now
+        job.last_error = error
+        if error and job.attempts < ScheduledJob.MAX_ATTEMPTS:
+            job.status = 'pending'
+            job.run_at = now + timedelta(seconds=self.RETRY_BACKOFF_SECONDS * 2 ** (job.attempts - 1))
+        elif job.interval_seconds:
+            # Recurring jobs keep their row and move to the next slot after the run
+            job.status = 'pending'
+            job.attempts = 0
+            next_run = job.run_at + timedelta(seconds=job.interval_seconds)
+            job.run_at = next_run if next_run > now else now + timedelta(seconds=job.interval_seconds)
+        else:
+            job.status = 'failed' if error else 'done'
+        db.session.commit()
+
+        if job.status == 'pending':
+            self.push(job.job_id, job.run_at)
+
+
+_scheduler = None
+
+
+def get_scheduler():
+    """The scheduler running in this process, or None"""
+    return _scheduler
+
+
+def add_job(name, payload=None, run_at=None, interval_seconds=None):
+    """
+    Add a job to the current session without committing, so it is persisted in
+    the same transaction as the change it follows up on (and not at all if that
+    change rolls back). Call push_job with it once the session is committed.
+
+    Args:
+        name: Registered handler name
+        payload: JSON-serializable arguments for the handler
+        run_at: When to run (defaults to now)
+        interval_seconds: Repeat every this many seconds after each run
+
+    Returns:
+        ScheduledJob: The pending job
+    """
+    job = ScheduledJob(
+        name=name,
+        payload=payload,
+        status='pending',
+        run_at=run_at or datetime.now(),
+        interval_seconds=interval_seconds,
+        attempts=0
+    )
+    db.session.add(job)
+    return job
+
+
+def push_job(job):
+    """
+    Queue a committed job in this process's scheduler, if one is running
+    (otherwise a scheduler in another process picks it up when it polls)
+    """
+    if _scheduler is not None:
+        _scheduler.push(job.job_id, job.run_at)
+
+
+def schedule_job(name, payload=None, run_at=None, interval_seconds=None):
+    """
+    Persist a job and queue it in this process's scheduler, if one is running.
+    Commits the current session; use add_job to persist a job together with
+    other changes.
+
+    Args:
+        name: Registered handler name
+        payload: JSON-serializable arguments for the handler
+        run_at: When to run (defaults to now)
+        interval_seconds: Repeat every this many seconds after each run
+
+    Returns:
+        ScheduledJob: The persisted job
+    """
+    job = add_job(name, payload, run_at, interval_seconds)
+    db.session.commit()
+    push_job(job)
+    return job
+
+
+def ensure_recurring_job(name, interval_seconds):
+    """
+    Create a recurring job unless one with that name is already scheduled.
+    Every process calls this at startup; when several insert the same job at
+    once, the unique index on recurring job names keeps the first and the
+    others roll back.
+    """
+    exists = db.session.query(ScheduledJob.job_id).filter(
+        ScheduledJob.name == name,
+        ScheduledJob.interval_seconds.isnot(None),
+        ScheduledJob.status.in_(['pending', 'running'])
+    ).first()
+    if exists:
+        return
+    try:
+        schedule_job(name, interval_seconds=interval_seconds)
+    except IntegrityError:
+        db.session.rollback()
+
+
+def init_scheduler(app):
+    """
+    Start the background scheduler with the recurring jobs (reminders, cleanup,
+    slot index rebuild).
+    Set SCHEDULER_ENABLED=0 to run without it, e.g. in one-off scripts.
+    """
+    global _scheduler
+    if os.environ.get('SCHEDULER_ENABLED', '1') == '0' or _scheduler is not None:
+        return _scheduler
+
+    _scheduler = JobScheduler(app, max_workers=int(os.environ.get('SCHEDULER_WORKERS', 4)))
+    with app.app_context():
+        ensure_recurring_job("send_reminders", interval_seconds=15 * 60)
+        ensure_recurring_job("cleanup", interval_seconds=24 * 60 * 60)
+        ensure_recurring_job("rebuild_slot_index", interval_seconds=60 * 60)
+    _scheduler.start()
+    return _scheduler
+
+
+@job_handler("cleanup")
+def cleanup_old_records(payload):
+    """Drop finished jobs, reminder ledger rows, waitlist entries and slot index days that can no longer matter"""
+    from models import AppointmentReminder, WaitlistEntry, DoctorSlotIndex
+
+    now = datetime.now()
+    keep_days = payload.get("keep_days", 7)
+    db.session.query(ScheduledJob).filter(
+        ScheduledJob.status.in_(['done', 'failed']),
+        ScheduledJob.finished_at < now - timedelta(days=keep_days)
+    ).delete(synchronize_session=False)
+    # A ledger row only prevents duplicates until its appointment has started
+    db.session.query(AppointmentReminder).filter(
+        AppointmentReminder.appointment_time < now - timedelta(days=1)
+    ).delete(synchronize_session=False)
+    # Waitlists of past days are finished, whatever state their entries are in
+    db.session.query(WaitlistEntry).filter(
+        WaitlistEntry.date < (now - timedelta(days=keep_days)).date()
+    ).delete(synchronize_session=False)
+    # Safety net for offers whose expiry job was lost, and acceptances lost with their worker
+    from services.waitlistService import WaitlistService
+    WaitlistService.release_stale_offers(now)
+    # Past days are never offered again; they are materialized anew if ever read
+    db.session.query(DoctorSlotIndex).filter(
+        DoctorSlotIndex.date < now.date()
+    ).delete(synchronize_session=False)
+    db.session.commit()
+
+
+class SchedulerController:
+    # Roles allowed to inspect the job queue
+    STAFF_ROLES = [UserRole.DOCTOR, UserRole.RECEPTIONIST, UserRole.NURSE]
+
+    @staticmethod
+    @jwt_required()
+    def get_jobs_overview():
+        """
+        Queue depth, per-job latency over the last 24 hours and recent failures
+
+        Latency is split into lag (run_at -> started_at, time spent waiting in the
+        queue) and duration (started_at -> finished_at).
+        """
+        current_user = get_current_user()
+        if not current_user:
+            return jsonify({"error": "User not found"}), 404
+        if current_user.role not in SchedulerController.STAFF_ROLES:
+            return jsonify({"error": "Unauthorized to view background jobs"}), 403
+
+        now = datetime.now()
+        by_status = dict(
+            db.session.query(ScheduledJob.status, func.count(ScheduledJob.job_id))
+            .group_by(ScheduledJob.status).all()
+        )
+        due = db.session.query(func.count(ScheduledJob.job_id)).filter(
+            ScheduledJob.status == 'pending',
+            ScheduledJob.run_at <= now
+        ).scalar()
+
+        latency = {}
+        recent = db.session.query(
+            ScheduledJob.name, ScheduledJob.run_at, ScheduledJob.started_at, ScheduledJob.finished_at
+        ).filter(
+            ScheduledJob.finished_at >= now - timedelta(days=1),
+            ScheduledJob.started_at.isnot(None)
+        ).order_by(ScheduledJob.finished_at.desc()).limit(1000).all()
+        for name, run_at, started_at, finished_at in recent:
+            # Recurring jobs have moved run_at on; their lag is not recoverable here
+            lag = max((started_at - run_at).total_seconds(), 0) if run_at <= started_at else None
+            duration = max((finished_at - started_at).total_seconds(), 0)
+            stats = latency.setdefault(name, {"runs": 0, "lags": [], "durations": []})
+            stats["runs"] += 1
+            stats["durations"].append(duration)
+            if lag is not None:
+                stats["lags"].append(lag)
+        for stats in latency.values():
+            lags, durations = stats.pop("lags"), stats.pop("durations")
+            stats["avg_lag_seconds"] = round(sum(lags) / len(lags), 3) if lags else None
+            stats["max_lag_seconds"] = round(max(lags), 3) if lags else None
+            stats["avg_duration_seconds"] = round(sum(durations) / len(durations), 3)
+            stats["max_duration_seconds"] = round(max(durations), 3)
+
+        failures = ScheduledJob.query.filter(
+            ScheduledJob.last_error.isnot(None)
+        ).order_by(ScheduledJob.finished_at.desc()).limit(10).all()
+
+        scheduler = get_scheduler()
+        return jsonify({
+            "queue": {
+                "pending": by_status.get('pending', 0),
+                "due": due,
+                "running": by_status.get('running', 0),
+                "failed": by_status.get('failed', 0),
+                "done": by_status.get('done', 0)
+            },
+            "this_process": scheduler.local_stats() if scheduler else None,
+            "latency": latency,
+            "recent_failures": [job.to_dict() for job in failures]
+        }), 200
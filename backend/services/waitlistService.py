@@ -0,0 +1,514 @@
+from flask import request, jsonify
+from flask_jwt_extended import jwt_required
+from datetime import datetime, timedelta
+from services.db import db
+from models import Appointment, Notification, UserRole, WaitlistEntry
+from services.requestCache import get_current_user, get_user, get_patient, get_doctor
+from services.appointmentService import AppointmentService
+from services.schedulerService import job_handler, schedule_job, add_job, push_job
+from sqlalchemy import func, update
+
+
+class WaitlistService:
+    """
+    Per-doctor, per-date waitlists and the backfill of freed slots.
+
+    When an appointment is cancelled or moved, a backfill_slot job offers the
+    freed slot to the head of that doctor's queue for the day. The slot is held
+    for the patient for HOLD_MINUTES: bookings by anyone else are refused until
+    the offer is accepted (and booked), declined, or runs out. A declined or
+    expired offer passes the slot to the next entry in the queue; when nobody is
+    left, the opening can be fanned out to other patients
+    (ReminderService.notify_availability).
+    """
+    HOLD_MINUTES = 30
+    # How long past its expiry an offer may still be in the middle of being
+    # accepted; an entry still 'accepting' after that was lost with its worker
+    ACCEPT_GRACE_MINUTES = 5
+    STAFF_ROLES = [UserRole.DOCTOR, UserRole.RECEPTIONIST, UserRole.NURSE]
+
+    @staticmethod
+    def queue_query(doctor_id, date):
+        """Active entries of a doctor's queue for a date, head first"""
+        return WaitlistEntry.query.filter(
+            WaitlistEntry.doctor_id == doctor_id,
+            WaitlistEntry.date == date,
+            WaitlistEntry.status.in_(WaitlistEntry.ACTIVE_STATUSES)
+        ).order_by(*WaitlistEntry.queue_order())
+
+    @staticmethod
+    def position(entry):
+        """1-based place of an active entry in its queue"""
+        ahead = db.session.query(func.count(WaitlistEntry.entry_id)).filter(
+            WaitlistEntry.doctor_id == entry.doctor_id,
+            WaitlistEntry.date == entry.date,
+            WaitlistEntry.status.in_(WaitlistEntry.ACTIVE_STATUSES),
+            WaitlistEntry.behind_condition(entry.priority, entry.requested_at, entry.entry_id, ahead=True)
+        ).scalar()
+        return ahead + 1
+
+    @staticmethod
+    def join(current_user, data):
+        """
+        Put a patient on a doctor's waitlist for a date.
+        Patients join for themselves; staff name the patient and may set a priority.
+
+        Args:
+            current_user: User making the request
+            data: {"doctor_id": int, "date": "YYYY-MM-DD", "patient_id": int (staff), "priority": int (staff)}
+
+        Returns:
+            tuple: (response dict, HTTP status)
+        """
+        if not current_user:
+            return {"error": "User not found"}, 404
+
+        if current_user.role == UserRole.PATIENT:
+            patient_id = current_user.user_id
+            priority = 0
+        elif current_user.role in WaitlistService.STAFF_ROLES:
+            patient_id = data.get('patient_id')
+            priority = data.get('priority', 0)
+            if not patient_id:
+                return {"error": "Missing patient_id for non-patient users"}, 400
+            if not isinstance(priority, int):
+                return {"error": "priority must be an integer"}, 400
+        else:
+            return {"error": "Unauthorized to join a waitlist"}, 403
+
+        doctor_id = data.get('doctor_id')
+        date_str = data.get('date')
+        if not doctor_id or not date_str:
+            return {"error": "Missing required fields: doctor_id, date"}, 400
+        try:
+            date = datetime.strptime(date_str, "%Y-%m-%d").date()
+        except ValueError:
+            return {"error": "Invalid date format. Use YYYY-MM-DD"}, 400
+        if date < datetime.now().date():
+            return {"error": "Cannot join the waitlist for a past date"}, 400
+
+        if not get_patient(patient_id):
+            return {"error": "Patient record not found"}, 404
+        if not get_doctor(doctor_id):
+            return {"error": "Doctor not found"}, 404
+
+        existing = WaitlistEntry.query.filter(
+            WaitlistEntry.patient_id == patient_id,
+            WaitlistEntry.doctor_id == doctor_id,
+            WaitlistEntry.date == date,
+            WaitlistEntry.status.in_(WaitlistEntry.ACTIVE_STATUSES)
+        ).first()
+        if existing:
+            return {"error": "Patient is already on this waitlist", "entry": existing.to_dict()}, 409
+
+        entry = WaitlistEntry(
+            patient_id=patient_id,
+            doctor_id=doctor_id,
+            date=date,
+            priority=priority,
+            requested_at=datetime.now(),
+            status='waiting'
+        )
+        db.session.add(entry)
+        db.session.commit()
+
+        return {
+            "message": "Added to the waitlist",
+            "entry": entry.to_dict(),
+            "position": WaitlistService.position(entry)
+        }, 201
+
+    @staticmethod
+    def offer_slot(doctor_id, slot_time, duration_minutes, after=None, exclude_patient_id=None, now=None):
+        """
+        Offer a free slot to the first waiting entry of the doctor's queue for that day.
+
+        Args:
+            doctor_id: The doctor with the opening
+            slot_time: Start of the freed slot
+            duration_minutes: Length of the freed slot
+            after: Entry whose offer lapsed; only entries behind it are considered
+            exclude_patient_id: Patient who freed the slot
+            now: Reference time (defaults to the current time)
+
+        Returns:
+            WaitlistEntry or None: The entry now holding the slot
+        """
+        now = now or datetime.now()
+        slot_end = slot_time + timedelta(minutes=duration_minutes)
+        if slot_time <= now:
+            return None
+        # Taken again already, or still held (e.g. this job is a retry)
+        if Appointment.find_conflict(db.session, doctor_id, slot_time, slot_end):
+            return None
+        if WaitlistEntry.find_hold(db.session, doctor_id, slot_time, slot_end, now=now):
+            return None
+
+        candidates = WaitlistEntry.query.filter(
+            WaitlistEntry.doctor_id == doctor_id,
+            WaitlistEntry.date == slot_time.date(),
+            WaitlistEntry.status == 'waiting'
+        )
+        if after is not None:
+            candidates = candidates.filter(
+                WaitlistEntry.behind_condition(after.priority, after.requested_at, after.entry_id)
+            )
+        if exclude_patient_id:
+            candidates = candidates.filter(WaitlistEntry.patient_id != exclude_patient_id)
+
+        expires_at = now + timedelta(minutes=WaitlistService.HOLD_MINUTES)
+        for entry in candidates.order_by(*WaitlistEntry.queue_order()).limit(10).all():
+            # Claim the entry; another worker may be offering it a different slot
+            claimed = db.session.execute(
+                update(WaitlistEntry)
+                .where(WaitlistEntry.entry_id == entry.entry_id, WaitlistEntry.status == 'waiting')
+                .values(
+                    status='offered',
+                    offered_slot=slot_time,
+                    offered_duration_minutes=duration_minutes,
+                    offer_expires_at=expires_at
+                )
+            ).rowcount
+            if not claimed:
+                continue
+
+            doctor = get_user(doctor_id)
+            db.session.add(Notification(
+                user_id=entry.patient_id,
+                message=(
+                    f"A slot opened up with Dr. {doctor.first_name} {doctor.last_name} on "
+                    f"{slot_time.strftime('%Y-%m-%d at %H:%M')}. It is held for you until "
+                    f"{expires_at.strftime('%H:%M')}; accept waitlist entry {entry.entry_id} to book it."
+                ),
+                scheduled_time=now,
+                is_read=False,
+                status="waitlist_offer"
+            ))
+            # The expiry job is stored with the offer, so an offer never outlives its hold
+            expiry = add_job("expire_waitlist_offer", {
+                "entry_id": entry.entry_id,
+                "slot_time": slot_time.strftime("%Y-%m-%d %H:%M")
+            }, run_at=expires_at)
+            db.session.commit()
+            push_job(expiry)
+            db.session.refresh(entry)
+            return entry
+
+        db.session.commit()
+        return None
+
+    @staticmethod
+    def backfill(doctor_id, slot_time, duration_minutes, after=None, exclude_patient_id=None, fan_out=False):
+        """
+        Offer a freed slot to the waitlist, or announce it when nobody is waiting.
+
+        Returns:
+            WaitlistEntry or None: The entry now holding the slot
+        """
+        entry = WaitlistService.offer_slot(doctor_id, slot_time, duration_minutes,
+                                           after=after, exclude_patient_id=exclude_patient_id)
+        if entry is None and fan_out:
+            from services.reminderService import ReminderService
+            ReminderService.notify_availability(doctor_id, slot_time, exclude_patient_id=exclude_patient_id)
+        return entry
+
+    @staticmethod
+    def release_offer(entry, status='waiting'):
+        """
+        End an entry's offer and pass the slot on to the next entry in the queue.
+        The entry is only changed if it is still in the status it was read in, so
+        an acceptance or release that got there first is never undone.
+
+        Args:
+            entry: Entry holding an offer
+            status: New status of the entry ('waiting' keeps its place for later openings)
+
+        Returns:
+            bool: Whether the offer was released
+        """
+        slot_time, duration_minutes = entry.offered_slot, entry.offered_duration_minutes
+        released = db.session.execute(
+            update(WaitlistEntry)
+            .where(WaitlistEntry.entry_id == entry.entry_id, WaitlistEntry.status == entry.status)
+            .values(status=status, offered_slot=None, offered_duration_minutes=None, offer_expires_at=None)
+        ).rowcount
+        db.session.commit()
+        if not released:
+            return False
+        WaitlistService.backfill(entry.doctor_id, slot_time, duration_minutes, after=entry, fan_out=True)
+        return True
+
+    @staticmethod
+    def release_stale_offer(entry, now=None):
+        """
+        Release an offer that has run out. An entry still 'accepting' is given
+        ACCEPT_GRACE_MINUTES past the expiry to finish its booking first.
+
+        Returns:
+            datetime or None: When to look again if the entry is still in its grace period
+        """
+        now = now or datetime.now()
+        if entry.status not in WaitlistEntry.HOLD_STATUSES or entry.offer_expires_at > now:
+            return None
+        if entry.status == 'accepting':
+            give_up_at = entry.offer_expires_at + timedelta(minutes=WaitlistService.ACCEPT_GRACE_MINUTES)
+            if give_up_at > now:
+                return give_up_at
+        WaitlistService.release_offer(entry)
+        return None
+
+    @staticmethod
+    def release_stale_offers(now=None):
+        """
+        Release every offer that has run out, including entries left 'accepting'
+        by a worker that died while booking them.
+
+        Returns:
+            int: Number of entries looked at
+        """
+        now = now or datetime.now()
+        grace = timedelta(minutes=WaitlistService.ACCEPT_GRACE_MINUTES)
+        stale = WaitlistEntry.query.filter(
+            ((WaitlistEntry.status == 'offered') & (WaitlistEntry.offer_expires_at <= now))
+            | ((WaitlistEntry.status == 'accepting') & (WaitlistEntry.offer_expires_at <= now - grace))
+        ).all()
+        for entry in stale:
+            WaitlistService.release_stale_offer(entry, now)
+        return len(stale)
+
+    @staticmethod
+    def accept(current_user, entry_id):
+        """
+        Book the slot offered to a waitlist entry.
+
+        Args:
+            current_user: The patient of the entry
+            entry_id: ID of the entry
+
+        Returns:
+            tuple: (response dict, HTTP status)
+        """
+        if not current_user:
+            return {"error": "User not found"}, 404
+        entry = db.session.get(WaitlistEntry, entry_id)
+        if not entry:
+            return {"error": "Waitlist entry not found"}, 404
+        if entry.patient_id != current_user.user_id:
+            return {"error": "Unauthorized to accept this offer"}, 403
+        if entry.status != 'offered':
+            return {"error": "This waitlist entry has no open offer"}, 409
+        now = datetime.now()
+        if entry.offer_expires_at <= now:
+            return {"error": "The offer has expired"}, 410
+
+        # Claim the offer; of two concurrent acceptances only one gets past this
+        claimed = db.session.execute(
+            update(WaitlistEntry)
+            .where(
+                WaitlistEntry.entry_id == entry_id,
+                WaitlistEntry.status == 'offered',
+                WaitlistEntry.offer_expires_at > now
+            )
+            .values(status='accepting')
+        ).rowcount
+        db.session.commit()
+        if not claimed:
+            return {"error": "This waitlist entry has no open offer"}, 409
+
+        # Only the claimed entry is moved on, and only out of 'accepting'
+        finish = update(WaitlistEntry).where(
+            WaitlistEntry.entry_id == entry_id,
+            WaitlistEntry.status == 'accepting'
+        )
+        try:
+            result, status = AppointmentService.book(current_user, {
+                "doctor_id": entry.doctor_id,
+                "date_time": entry.offered_slot.strftime("%Y-%m-%d-%H"),
+                "duration_minutes": entry.offered_duration_minutes,
+                "appointment_type": "regular"
+            })
+        except Exception:
+            db.session.rollback()
+            db.session.execute(finish.values(status='offered'))
+            db.session.commit()
+            db.session.refresh(entry)
+            WaitlistService.release_stale_offer(entry)
+            raise
+
+        if status == 201:
+            db.session.execute(finish.values(
+                status='booked',
+                appointment_id=result["appointment_id"],
+                offer_expires_at=None
+            ))
+        elif status == 409:
+            # The slot was taken despite the hold (e.g. booked straight into the database)
+            db.session.execute(finish.values(
+                status='waiting',
+                offered_slot=None,
+                offered_duration_minutes=None,
+                offer_expires_at=None
+            ))
+        else:
+            # The offer stays open for another try, unless it ran out meanwhile
+            db.session.execute(finish.values(status='offered'))
+        db.session.commit()
+
+        if status not in (201, 409):
+            db.session.refresh(entry)
+            WaitlistService.release_stale_offer(entry)
+        if status != 201:
+            return result, status
+        db.session.refresh(entry)
+        return {**result, "entry": entry.to_dict()}, 201
+
+    @staticmethod
+    def decline(current_user, entry_id):
+        """
+        Turn down an offered slot; the entry keeps its place for later openings.
+
+        Returns:
+            tuple: (response dict, HTTP status)
+        """
+        if not current_user:
+            return {"error": "User not found"}, 404
+        entry = db.session.get(WaitlistEntry, entry_id)
+        if not entry:
+            return {"error": "Waitlist entry not found"}, 404
+        if entry.patient_id != current_user.user_id:
+            return {"error": "Unauthorized to decline this offer"}, 403
+        if entry.status != 'offered':
+            return {"error": "This waitlist entry has no open offer"}, 409
+
+        if not WaitlistService.release_offer(entry):
+            return {"error": "This waitlist entry has no open offer"}, 409
+        return {"message": "Offer declined", "entry": entry.to_dict()}, 200
+
+    @staticmethod
+    def leave(current_user, entry_id):
+        """
+        Remove an entry from its queue (the patient, or staff on their behalf).
+
+        Returns:
+            tuple: (response dict, HTTP status)
+        """
+        if not current_user:
+            return {"error": "User not found"}, 404
+        entry = db.session.get(WaitlistEntry, entry_id)
+        if not entry:
+            return {"error": "Waitlist entry not found"}, 404
+        if entry.patient_id != current_user.user_id and current_user.role not in WaitlistService.STAFF_ROLES:
+            return {"error": "Unauthorized to remove this waitlist entry"}, 403
+        if entry.status not in WaitlistEntry.ACTIVE_STATUSES:
+            return {"error": "This waitlist entry is no longer active"}, 409
+        if entry.status == 'accepting':
+            return {"error": "The offer of this waitlist entry is being accepted"}, 409
+
+        if entry.status == 'offered':
+            if not WaitlistService.release_offer(entry, status='cancelled'):
+                return {"error": "The offer of this waitlist entry changed, try again"}, 409
+        else:
+            entry.status = 'cancelled'
+            db.session.commit()
+        return {"message": "Removed from the waitlist", "entry": entry.to_dict()}, 200
+
+
+@job_handler("backfill_slot")
+def backfill_slot_job(payload):
+    WaitlistService.backfill(
+        payload["doctor_id"],
+        datetime.strptime(payload["slot_time"], "%Y-%m-%d %H:%M"),
+        payload.get("duration_minutes", Appointment.DEFAULT_DURATION_MINUTES),
+        exclude_patient_id=payload.get("exclude_patient_id"),
+        fan_out=payload.get("fan_out", False)
+    )
+
+
+@job_handler("expire_waitlist_offer")
+def expire_waitlist_offer_job(payload):
+    entry = db.session.get(WaitlistEntry, payload["entry_id"])
+    slot_time = datetime.strptime(payload["slot_time"], "%Y-%m-%d %H:%M")
+    # Only the offer this job was scheduled for
+    if entry is None or entry.offered_slot != slot_time:
+        return
+    retry_at = WaitlistService.release_stale_offer(entry)
+    if retry_at is not None:
+        # An acceptance may still be booking the slot; check again after its grace period
+        schedule_job("expire_waitlist_offer", payload, run_at=retry_at)
+
+
+class WaitlistController:
+    @staticmethod
+    @jwt_required()
+    def join_waitlist():
+        """
+        Join a doctor's waitlist for a date
+
+        Request body:
+        {
+            "doctor_id": int,
+            "date": "YYYY-MM-DD",
+            "patient_id": int,  (staff only)
+            "priority": int  (staff only; higher is served first)
+        }
+        """
+        result, status = WaitlistService.join(get_current_user(), request.get_json() or {})
+        return jsonify(result), status
+
+    @staticmethod
+    @jwt_required()
+    def get_waitlist():
+        """
+        Patients get their active entries with their place in each queue;
+        staff get the queue of ?doctor_id=&date=YYYY-MM-DD
+        """
+        current_user = get_current_user()
+        if not current_user:
+            return jsonify({"error": "User not found"}), 404
+
+        if current_user.role in WaitlistService.STAFF_ROLES:
+            doctor_id = request.args.get('doctor_id', type=int)
+            date_str = request.args.get('date')
+            if not doctor_id or not date_str:
+                return jsonify({"error": "Missing query parameters: doctor_id, date"}), 400
+            try:
+                date = datetime.strptime(date_str, "%Y-%m-%d").date()
+            except ValueError:
+                return jsonify({"error": "Invalid date format. Use YYYY-MM-DD"}), 400
+            entries = WaitlistService.queue_query(doctor_id, date).all()
+            return jsonify({
+                "doctor_id": doctor_id,
+                "date": date_str,
+                "queue": [entry.to_dict() for entry in entries],
+                "count": len(entries)
+            }), 200
+
+        entries = WaitlistEntry.query.filter(
+            WaitlistEntry.patient_id == current_user.user_id,
+            WaitlistEntry.status.in_(WaitlistEntry.ACTIVE_STATUSES)
+        ).order_by(WaitlistEntry.date).all()
+        return jsonify({
+            "entries": [{**entry.to_dict(), "position": WaitlistService.position(entry)} for entry in entries],
+            "count": len(entries)
+        }), 200
+
+    @staticmethod
+    @jwt_required()
+    def accept_offer(entry_id):
+        """Book the slot held for a waitlist entry"""
+        result, status = WaitlistService.accept(get_current_user(), entry_id)
+        return jsonify(result), status
+
+    @staticmethod
+    @jwt_required()
+    def decline_offer(entry_id):
+        """Pass the slot held for a waitlist entry on to the next patient"""
+        result, status = WaitlistService.decline(get_current_user(), entry_id)
+        return jsonify(result), status
+
+    @staticmethod
+    @jwt_required()
+    def leave_waitlist(entry_id):
+        """Leave a waitlist"""
+        result, status = WaitlistService.leave(get_current_user(), entry_id)
+        return jsonify(result), status